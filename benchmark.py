@@ -0,0 +1,650 @@
+"""Per-frame cost benchmarks for Dodge the Tejecks.
+
+Runs without a window (SDL dummy drivers) and prints milliseconds per frame
+for the old and new version of each rendering path.
+
+    python benchmark.py              # run everything
+    python benchmark.py background   # run one benchmark
+"""
+import base64
+import contextlib
+import io
+import json
+import math
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+# No window or sound card needed
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+import script
+
+FRAMES = 600
+
+
+def time_per_frame(draw_frame, frames=FRAMES):
+    """Call draw_frame() repeatedly and return the average cost in milliseconds."""
+    draw_frame()  # Warm up (fills any caches)
+    start = time.perf_counter()
+    for _ in range(frames):
+        draw_frame()
+    return (time.perf_counter() - start) * 1000 / frames
+
+
+def report(name, before_ms, after_ms):
+    speedup = before_ms / after_ms if after_ms > 0 else float("inf")
+    print(f"{name:<28} before {before_ms:8.3f} ms   after {after_ms:8.3f} ms   x{speedup:.1f}")
+
+
+def bench_background():
+    """Gradient background: 160 draw.rect calls vs one blit of the cached Surface."""
+    screen = script.screen
+    for style in script.GRADIENT_STYLES:
+        before = time_per_frame(lambda: script.render_gradient(screen, style))
+        after = time_per_frame(lambda: screen.blit(script.get_background(style), (0, 0)))
+        report(f"background[{style}]", before, after)
+
+
+def make_enemies(count, seed=1):
+    """A screen full of spinning enemies spread over the play area."""
+    random.seed(seed)
+    script.seed_streams(seed)  # Sizes, spins and particle spreads come from the game's own streams
+    enemies = script.EntityStore()
+    for i in range(count):
+        enemy = script.Enemy(enemies, random.randint(50, script.SCREEN_WIDTH - 50))
+        enemy.y = random.randint(0, script.SCREEN_HEIGHT)
+    return enemies
+
+
+def bench_rotation():
+    """Enemy spin: transform.rotate every frame vs cached pre-rotated frames."""
+    screen = script.screen
+    enemies = make_enemies(40)
+
+    def rotate_every_frame():
+        for enemy in enemies:
+            enemy.angle += enemy.spin_speed
+            rotated = pygame.transform.rotate(script.get_scaled_sprite(enemy.image, enemy.size), enemy.angle)
+            screen.blit(rotated, rotated.get_rect(center=(enemy.x, enemy.y)))
+
+    def cached_frames():
+        for enemy in enemies:
+            enemy.angle += enemy.spin_speed
+            enemy.draw(screen)
+
+    def wave(draw_enemy, speed):
+        """Enemies spawning and falling through the screen, as in an Easy/Hard run."""
+        random.seed(3)
+        script.seed_streams(3)
+        store = script.EntityStore()
+        spent = 0.0
+        for _ in range(FRAMES * 5):
+            if script.spawn_random.random() < 0.07:
+                script.Enemy(store, script.spawn_random.randint(50, script.SCREEN_WIDTH - 50))
+            store.step(speed)
+            start = time.perf_counter()
+            for enemy in store:
+                draw_enemy(enemy)
+            spent += time.perf_counter() - start
+        return spent * 1000 / (FRAMES * 5)
+
+    def rotate_enemy(enemy):
+        rotated = pygame.transform.rotate(script.get_scaled_sprite(enemy.image, enemy.size), enemy.angle)
+        screen.blit(rotated, rotated.get_rect(center=(enemy.x, enemy.y)))
+
+    before = time_per_frame(rotate_every_frame)
+    for angle_step in (3, 5, 10):
+        script.rotation_cache = script.RotationCache(angle_step)
+        report(f"rotation[40, {angle_step} deg]", before, time_per_frame(cached_frames))
+        print("    " + script.rotation_cache.report())
+    for speed in (3, 8):
+        before = wave(rotate_enemy, speed)
+        for angle_step in (3, 5, 10):
+            script.rotation_cache = script.RotationCache(angle_step)
+            report(f"rotation[wave {speed}, {angle_step} deg]", before, wave(lambda enemy: enemy.draw(screen), speed))
+            print("    " + script.rotation_cache.report())
+    script.rotation_cache = script.RotationCache()
+
+
+def bench_text():
+    """HUD text: font.render every frame vs cached labels and digit glyphs."""
+    screen = script.screen
+    font, small = script.FONT, script.SMALL_FONT
+    frame = [0]
+
+    def hud_lines():
+        frame[0] += 1
+        score = frame[0] // 30  # Score ticks up about twice a second
+        return [
+            (f"Score: {score}", font, script.WHITE, 15, 15),
+            (f"Total: {12000 + score}", small, (200, 200, 200), 15, 45),
+            (f"Ammo: {frame[0] // 15 % 30}/30", small, script.GREEN, 15, 95),
+            (f"Destroyed: {score // 4}", small, script.ORANGE, 640, 610),
+            ("Press B to return", font, script.BLACK, 300, 600),
+        ]
+
+    def render_every_frame():
+        for text, f, color, x, y in hud_lines():
+            screen.blit(f.render(text, True, color), (x, y))
+
+    def cached_glyphs():
+        for text, f, color, x, y in hud_lines():
+            script.draw_counter(text, f, color, x, y)
+
+    report("text[HUD]", time_per_frame(render_every_frame), time_per_frame(cached_glyphs))
+
+
+def bench_powerups():
+    """Power-ups: two circles and a font render each vs one blit of the baked icon."""
+    screen = script.screen
+    random.seed(2)
+    script.seed_streams(2)
+    types = list(script.PowerUp.TYPES)
+    store = script.EntityStore()
+    power_ups = [script.PowerUp(store, random.randint(50, 750), random.randint(0, 600), random.choice(types))
+                 for _ in range(20)]
+
+    def draw_primitives():
+        for power in power_ups:
+            power.bob_offset += 0.1
+            draw_y = power.y + math.sin(power.bob_offset) * 5
+            script.draw_powerup_icon(screen, power.type, int(power.x), int(draw_y), power.size)
+
+    def draw_icons():
+        for power in power_ups:
+            power.bob_offset += 0.1
+            power.draw(screen)
+
+    report("powerups[20 on screen]", time_per_frame(draw_primitives), time_per_frame(draw_icons))
+
+
+def bench_collision():
+    """Laser/enemy hits: every laser against every enemy vs spatial hash queries."""
+    enemies = make_enemies(60, seed=3)
+    store = script.EntityStore()
+    lasers = [script.Laser(store, random.randint(0, script.SCREEN_WIDTH), random.randint(0, script.SCREEN_HEIGHT))
+              for _ in range(25)]  # Five volleys of triple shot plus double shot
+    grid = script.SpatialHash()
+
+    def scan_lists():
+        for laser in lasers:
+            laser_rect = laser.get_rect()
+            for enemy in list(enemies):
+                if laser_rect.colliderect(enemy.get_rect()):
+                    break
+
+    def query_grid():
+        grid.rebuild(enemies)
+        for laser in lasers:
+            grid.query(laser.get_rect())
+
+    report("collision[25 lasers, 60 enemies]", time_per_frame(scan_lists), time_per_frame(query_grid))
+    print(f"    {grid.tests / (FRAMES + 1) / len(lasers):.1f} rect tests per laser (was {len(enemies)})")
+
+
+class ListEnemy:
+    """The old per-object enemy: every number in its own __dict__."""
+    def __init__(self, x):
+        self.x = x
+        self.y = -50
+        self.prev_y = self.y
+        self.image = random.choice(script.enemy_images)
+        self.size = random.randint(script.ENEMY_MIN_SIZE, script.ENEMY_MAX_SIZE)
+        self.scaled_image = script.get_scaled_sprite(self.image, self.size)
+        self.rotation = random.uniform(-30, 30)
+        self.spin_speed = random.uniform(-2, 2)
+        self.angle = 0
+
+    def update(self, speed):
+        self.prev_y = self.y
+        self.y += speed
+        self.angle += self.spin_speed
+
+    def is_off_screen(self):
+        return self.y > script.SCREEN_HEIGHT + self.size
+
+
+def bytes_per_entity(spawn):
+    """Bytes allocated per entity by spawn(), which returns a container of them."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = spawn()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / len(kept)
+
+
+def bench_entities():
+    """Dense wave: per-object update + list.remove vs one EntityStore.step() batch."""
+    count = 300
+
+    def respawn_list(enemies):
+        while len(enemies) < count:
+            enemies.append(ListEnemy(random.randint(50, 750)))
+
+    def respawn_store(enemies):
+        while len(enemies) < count:
+            script.Enemy(enemies, random.randint(50, 750))
+
+    random.seed(4)
+    script.seed_streams(4)
+    old = []
+    respawn_list(old)
+
+    def update_list():
+        for enemy in old[:]:
+            enemy.update(12)
+            if enemy.is_off_screen():
+                old.remove(enemy)
+        respawn_list(old)
+
+    store = script.EntityStore()
+    respawn_store(store)
+
+    def update_store():
+        store.step(12)
+        respawn_store(store)
+
+    report(f"entities[{count} enemies]", time_per_frame(update_list), time_per_frame(update_store))
+
+    # What other systems pay to read an enemy (drawing, collisions, the digest)
+    def read_list():
+        for enemy in old:
+            enemy.x, enemy.y, enemy.prev_y, enemy.size
+
+    def read_store():
+        for enemy in store:
+            enemy.x, enemy.y, enemy.prev_y, enemy.size
+
+    report(f"entity reads[{count} enemies]", time_per_frame(read_list), time_per_frame(read_store))
+
+    # Bytes allocated per live enemy (the shared sprite surfaces aren't counted)
+    def spawn_store():
+        enemies = script.EntityStore()
+        for _ in range(1000):
+            script.Enemy(enemies, 100)
+        return enemies
+
+    old_bytes = bytes_per_entity(lambda: [ListEnemy(100) for _ in range(1000)])
+    new_bytes = bytes_per_entity(spawn_store)
+    print(f"    memory per enemy: before {old_bytes:.0f} bytes   after {new_bytes:.0f} bytes")
+
+
+class ObjectParticle:
+    """The old particle: one object per spark, updated and drawn one at a time."""
+    def __init__(self, x, y, color):
+        self.x = x
+        self.y = y
+        self.color = color
+        angle = random.uniform(0, 2 * math.pi)
+        speed = random.uniform(2, 6)
+        self.vx = math.cos(angle) * speed
+        self.vy = math.sin(angle) * speed
+        self.lifetime = 30
+        self.size = random.randint(3, 8)
+
+    def update(self):
+        self.x += self.vx
+        self.y += self.vy
+        self.vy += 0.2
+        self.lifetime -= 1
+        self.size = max(1, int(self.size * 0.95))
+
+    def draw(self, surface):
+        pygame.draw.circle(surface, self.color, (int(self.x), int(self.y)), self.size)
+
+
+def bench_particles():
+    """Explosion bursts: Particle objects + draw.circle vs the ring buffer + one blits() call."""
+    screen = script.screen
+    colors = [script.RED, script.ORANGE, script.YELLOW, script.CYAN]
+    burst = 30  # One player death / bomb burst every few frames keeps ~300 sparks alive
+    frame = [0]
+
+    def burst_at():
+        frame[0] += 1
+        return frame[0] % 3 == 0, 100 + frame[0] * 37 % 600, 100 + frame[0] * 53 % 400, colors[frame[0] % 4]
+
+    random.seed(5)
+    script.seed_streams(5)
+    old = []
+
+    def update_objects():
+        spawn, x, y, color = burst_at()
+        if spawn:
+            for _ in range(burst):
+                old.append(ObjectParticle(x, y, color))
+        for particle in old[:]:
+            particle.update()
+            if particle.lifetime <= 0:
+                old.remove(particle)
+        for particle in old:
+            particle.draw(screen)
+
+    random.seed(5)
+    script.seed_streams(5)
+    frame[0] = 0
+    before = time_per_frame(update_objects)
+    live = len(old)
+
+    script.PARTICLE_BUDGET = 10 ** 6  # Same number of sparks as the old version
+    particles = script.ParticleSystem(400)
+
+    def update_ring():
+        spawn, x, y, color = burst_at()
+        if spawn:
+            particles.emit(x, y, color, burst)
+        particles.update()
+        particles.draw(screen)
+
+    random.seed(5)
+    script.seed_streams(5)
+    frame[0] = 0
+    after = time_per_frame(update_ring)
+    report(f"particles[~{live} live]", before, after)
+
+
+class DictEntity:
+    """Stand-in for the original entity classes: every field in a per-instance __dict__."""
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+def bench_memory():
+    """Bytes per live entity: the original __dict__ objects vs __slots__ objects."""
+    count = 1000
+    rng = random.random  # Distinct float objects, like real positions
+
+    def dict_laser():
+        return DictEntity(x=rng() * 800, y=rng() * 600, prev_y=rng() * 600, color=script.RED, speed=15,
+                          width=4, height=20, double=False, active=True)
+
+    def dict_fire():
+        return DictEntity(x=rng() * 800, y=rng() * 600, vx=rng(), vy=rng(), size=15, lifetime=300, angle=rng())
+
+    def dict_powerup():
+        return DictEntity(x=rng() * 800, y=rng() * 600, type="coin", size=25, bob_offset=rng(), collected=False)
+
+    def dict_explosion():
+        return DictEntity(x=rng() * 800, y=rng() * 600, radius=10, max_radius=80, growth_speed=8,
+                          active=True, alpha=255)
+
+    def spawn_store(make):
+        def spawn():
+            store = script.EntityStore()
+            for _ in range(count):
+                make(store).get_rect()  # Includes the cached Rect
+            return store
+        return spawn
+
+    def spawn_particles():
+        script.PARTICLE_BUDGET = 10 ** 6
+        particles = script.ParticleSystem(count)
+        particles.emit(400, 300, script.ORANGE, count)
+        return particles
+
+    rows = [
+        ("Enemy", lambda: [ListEnemy(100) for _ in range(count)],
+         spawn_store(lambda store: script.Enemy(store, 100))),
+        ("Laser", lambda: [dict_laser() for _ in range(count)],
+         spawn_store(lambda store: script.Laser(store, rng() * 800, rng() * 600))),
+        ("Fire", lambda: [dict_fire() for _ in range(count)],
+         spawn_store(lambda store: script.Fire(store, 400, 100, rng() * 800, 600))),
+        ("PowerUp", lambda: [dict_powerup() for _ in range(count)],
+         spawn_store(lambda store: script.PowerUp(store, rng() * 800, 0, "coin"))),
+        ("Explosion", lambda: [dict_explosion() for _ in range(count)],
+         lambda: [script.Explosion(rng() * 800, rng() * 600) for _ in range(count)]),
+        ("Particle", lambda: [ObjectParticle(400, 300, script.ORANGE) for _ in range(count)], spawn_particles),
+    ]
+    random.seed(6)
+    script.seed_streams(6)
+    for name, before, after in rows:
+        old_bytes = bytes_per_entity(before)
+        new_bytes = bytes_per_entity(after)
+        print(f"memory[{name}]{'':<{20 - len(name)}} before {old_bytes:6.0f} bytes   after {new_bytes:6.0f} bytes")
+
+
+def bench_headless():
+    """Whole simulation, nothing drawn: sim ticks per second with the dodge bot playing."""
+    for level in ("easy", "creator", "boss"):
+        ticks = seconds = 0
+        for seed in range(5):
+            result = script.run_headless(script.make_mode(level), max_ticks=20 * 60 * script.SIM_HZ, seed=seed)
+            ticks += result["ticks"]
+            seconds += result["seconds"]
+        print(f"headless[{level}]{'':<{18 - len(level)}} {ticks / seconds:8.0f} sim FPS over {ticks} ticks "
+              f"({ticks / seconds / script.SIM_HZ:.0f}x real time)")
+
+
+def bench_verify(users=120):
+    """Score verification: a leaderboard of recorded bot runs served over HTTP, re-simulated in one process vs a pool."""
+    levels = ("easy", "hard", "creator", "boss")
+    leaderboard = {}
+    for i in range(users):
+        result = script.run_headless(script.make_mode(levels[i % len(levels)]), max_ticks=30 * script.SIM_HZ,
+                                     inputs=script.sweep_bot, seed=i, record=True)
+        claimed = result["score"] + 500 if i % 10 == 0 else result["score"]  # Every tenth one inflated
+        if claimed:
+            leaderboard[f"player{i}"] = {"high_score": claimed, "upgrades": dict(script.player_upgrades),
+                                         "high_score_run": base64.b64encode(result["replay"]).decode("ascii")}
+    server = script.serve_leaderboard(leaderboard)
+    try:
+        submissions = script.submissions_from_leaderboard(
+            script.fetch_leaderboard(f"http://127.0.0.1:{server.server_address[1]}/"))
+    finally:
+        server.shutdown()
+    for workers in (1, max(2, os.cpu_count() or 1)):
+        verdicts, stats = script.verify_submissions(submissions, workers)
+        print(f"verify[{workers} workers]{'':<{10 - len(str(workers))}} {stats['runs_per_second']:8.1f} runs/s "
+              f"{stats['ticks_per_second']:8.0f} sim ticks/s   {stats['rejected']} of {stats['runs']} rejected")
+
+
+def bench_sync(syncs=5):
+    """Cloud sync against the stand-in server: whole-document GET+PUT vs ETag + changed records only."""
+    import asyncio
+    storage_set, script.storage_set = script.storage_set, lambda key, value: True  # Keep the benchmark's players out of the real save file
+
+    async def old_sync():
+        status, text, _ = await script.cloud_request("GET", script.cloud_url())
+        script.leaderboard_data.update(json.loads(text))
+        await script.cloud_request("PUT", script.cloud_url(), json.dumps(script.leaderboard_data))
+
+    async def run(sync, players, patch=True):
+        server = script.serve_leaderboard({f"player{i}": {"version": 1, "points": i, "high_score": i,
+                                                          "best_scores": {"Easy": i, "Medium": i // 2},
+                                                          "upgrades": {"shooting": i % 3}}
+                                           for i in range(players)}, patch=patch)
+        script.cloud_url = lambda: f"http://127.0.0.1:{server.server_address[1]}/"
+        script.cloud_etag = None
+        script.cloud_patch_supported = True
+        script.cloud_document = {}
+        script.leaderboard_data = {}
+        script.local_storage = script.FileStorage()  # storage_set is stubbed out: an index in memory only
+        script.current_username = "bench"
+        script.save_progress()
+        await sync()  # First sync downloads everything either way
+        script.cloud_traffic.clear()
+        start = time.perf_counter()
+        for _ in range(syncs):
+            script.points += 10  # Only this player changed
+            script.save_progress()
+            await sync()
+        ms = (time.perf_counter() - start) * 1000 / syncs
+        server.shutdown()
+        return ms, script.cloud_traffic["sent"] // syncs, script.cloud_traffic["received"] // syncs
+
+    for players in (100, 1000, 10000):
+        for name, sync, patch in (("GET+PUT", old_sync, True), ("delta", script.sync_to_cloud, True),
+                                  ("delta, no PATCH", script.sync_to_cloud, False)):
+            with contextlib.redirect_stdout(io.StringIO()):  # The game logs every save and request
+                ms, sent, received = asyncio.run(run(sync, players, patch))
+                script.local_saves.flush()  # Local saves are stubbed out above; just empty the queue
+            label = f"sync[{players} players, {name}]"
+            print(f"{label:<40} {ms:7.2f} ms/sync   sent {sent:8d} B   received {received:8d} B")
+    script.storage_set = storage_set
+
+
+def bench_saves(players=10000, saves=10):
+    """save_progress: a burst of saves written in place vs queued and written once behind the frame loop
+    (just the changed player's record and the index)."""
+    import asyncio
+    import tempfile
+    script.leaderboard_data = {f"player{i}": {"version": 1, "points": i, "high_score": i,
+                                              "best_scores": {"Easy": i, "Medium": i // 2},
+                                              "upgrades": {"shooting": i % 3}} for i in range(players)}
+    script.local_storage = script.FileStorage()
+    script.local_storage.index = {username: script.index_entry(record) for username, record in script.leaderboard_data.items()}
+    script.current_username = "bench"
+
+    class WriteNow:
+        """What save_progress used to do: encode and write the whole leaderboard on every save."""
+        def mark(self, username=None):
+            script.storage_set("dodge_leaderboard", json.dumps(script.leaderboard_data))
+            script.storage_set("dodge_lastuser", script.current_username)
+
+    async def burst(save):
+        """Saves spread over frames; returns the longest frame and how long the frames spent saving."""
+        frames = []
+        saving = 0.0
+        frame = 0
+        end = None
+        while end is None or time.perf_counter() < end:  # Keep going until the queued write is out
+            if frame == saves:
+                end = time.perf_counter() + script.SAVE_DELAY + 0.5
+            start = time.perf_counter()
+            if frame < saves:
+                script.points += 1
+                save()
+            saving += time.perf_counter() - start if frame < saves else 0.0
+            await asyncio.sleep(1 / 240)
+            frames.append(time.perf_counter() - start)
+            frame += 1
+        return max(frames) * 1000, saving * 1000 / saves
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as scratch, contextlib.redirect_stdout(io.StringIO()):
+        os.chdir(scratch)  # storage_set writes to the working directory
+        try:
+            queue, script.local_saves = script.local_saves, WriteNow()
+            old = asyncio.run(burst(script.save_progress))
+            script.local_saves = queue
+            writes = queue.writes
+            new = asyncio.run(burst(script.save_progress))
+            writes = queue.writes - writes
+            queue.flush()
+        finally:
+            os.chdir(cwd)
+    print(f"saves[{players} players]          before {old[1]:8.3f} ms   after {new[1]:8.3f} ms   "
+          f"x{old[1] / new[1]:.0f} per save")
+    print(f"    longest frame: before {old[0]:.1f} ms   after {new[0]:.1f} ms;   "
+          f"{saves} saves -> {saves} writes before, {writes} after")
+
+
+def bench_storage(players=10000, repeats=5):
+    """Local storage backends: one leaderboard blob (before), per-player files and SQLite.
+
+    Timed: signing in (opening storage and reading one player's record), a
+    leaderboard page with the player's rank right after their score
+    changed, and saving that one record.
+    """
+    import tempfile
+    run = base64.b64encode(bytes(range(256)) * 6).decode("ascii")  # About the size of a high score replay
+    legacy = {f"player{i}": {"version": 1, "points": i, "high_score": i, "current_level": "Easy",
+                             "best_scores": {"Easy": i, "Medium": i // 2}, "upgrades": {"shooting": i % 3},
+                             "high_score_run": run} for i in range(players)}
+
+    class Blob:
+        """What there was before: every record in one file, sorted in Python."""
+        def load(self):
+            self.records = json.loads(script.storage_get(script.LEGACY_LEADERBOARD_KEY))
+            return len(self.records)
+
+        def record(self, username):
+            return self.records.get(username)
+
+        def top(self, offset=0, limit=None):
+            return sorted(self.records.items(), key=lambda x: x[1].get("points", 0), reverse=True)[offset:offset + limit]
+
+        def rank(self, username):
+            return 1 + sum(record.get("points", 0) > self.records[username]["points"] for record in self.records.values())
+
+        def write(self, records, last_user=None):
+            self.records.update(records)
+            script.storage_set(script.LEGACY_LEADERBOARD_KEY, json.dumps(self.records))
+
+    def measure(make):
+        def sign_in():
+            fresh = make()
+            fresh.load()
+            fresh.record("player7")
+        storage = make()
+        sign_in_ms = time_per_frame(sign_in, repeats)
+        storage.load()
+        page = write = 0.0
+        for i in range(repeats):
+            record = {**storage.record("player7"), "points": players + i}
+            start = time.perf_counter()
+            storage.write({"player7": record}, "player7")
+            middle = time.perf_counter()
+            storage.top(0, 10)
+            storage.rank("player7")
+            write += middle - start
+            page += time.perf_counter() - middle
+        return sign_in_ms, page * 1000 / repeats, write * 1000 / repeats
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as scratch, contextlib.redirect_stdout(io.StringIO()):
+        os.chdir(scratch)
+        try:
+            script.storage_set(script.LEGACY_LEADERBOARD_KEY, json.dumps(legacy))
+            results = {"blob (before)": measure(Blob)}
+            start = time.perf_counter()
+            script.FileStorage().load()  # Migrates the blob
+            migrate = time.perf_counter() - start
+            results["files"] = measure(script.FileStorage)
+            start = time.perf_counter()
+            script.SQLiteStorage("bench.db").load()  # Imports the files
+            migrate_db = time.perf_counter() - start
+            results["sqlite"] = measure(lambda: script.SQLiteStorage("bench.db"))
+        finally:
+            os.chdir(cwd)
+    for name, (sign_in, page, write) in results.items():
+        label = f"storage[{players} players, {name}]"
+        print(f"{label:<38} sign-in {sign_in:8.2f} ms   page+rank {page:7.2f} ms   save one {write:7.2f} ms")
+    print(f"    one-off migration: blob to files {migrate:.2f} s, files to sqlite {migrate_db:.2f} s")
+
+
+BENCHMARKS = {
+    "background": bench_background,
+    "rotation": bench_rotation,
+    "text": bench_text,
+    "powerups": bench_powerups,
+    "collision": bench_collision,
+    "entities": bench_entities,
+    "particles": bench_particles,
+    "memory": bench_memory,
+    "headless": bench_headless,
+    "verify": bench_verify,
+    "sync": bench_sync,
+    "saves": bench_saves,
+    "storage": bench_storage,
+}
+
+
+def main(names):
+    for name in names or BENCHMARKS:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark: {name} (choose from {', '.join(BENCHMARKS)})")
+            return 1
+        BENCHMARKS[name]()
+    pygame.quit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -8,6 +8,6 @@ from script import main
 if sys.platform == "emscripten":
     # Running in browser via Pygbag
     asyncio.ensure_future(main())
-else:
-    # Running on desktop
+elif __name__ == "__main__":
+    # Running on desktop (not when imported by a verification worker process)
     asyncio.run(main())
@@ -3,8 +3,20 @@ import random
 import sys
 import json
 import asyncio
+import atexit
+import base64
+import itertools
 import math
+import os
 import platform
+import re
+import struct
+import threading
+import time
+import weakref
+import zlib
+from array import array
+from collections import Counter, OrderedDict, deque
 
 # Cloud leaderboard using jsonblob.com (FREE, no API key needed!)
 # This enables live cross-device leaderboard!
@@ -18,93 +30,259 @@ def is_browser():
     """Check if running in browser environment."""
     return sys.platform == "emscripten"
 
-async def cloud_save(data):
-    """Save leaderboard data to cloud (jsonblob.com via CORS proxy)."""
+CLOUD_TIMEOUT = 10  # Seconds before a cloud request is given up on
+
+class CloudStatus:
+    """What the cloud requests are up to, for screens to show.
+
+    state is "idle", "loading", "saving" or "offline" (the last request
+    failed; error says why). notice is a lasting caveat shown while idle.
+    """
+    __slots__ = ("state", "error", "active", "started", "notice")
+
+    def __init__(self):
+        self.state = "idle"
+        self.error = ""
+        self.notice = ""
+        self.active = 0  # Requests in flight
+        self.started = 0.0
+
+    def begin(self, state):
+        if not self.active:
+            self.started = time.perf_counter()
+        self.active += 1
+        self.state = state
+
+    def end(self, error=None):
+        self.active -= 1
+        if error:
+            self.state = "offline"
+            self.error = error
+        elif not self.active:
+            self.state = "idle"
+            self.error = ""
+
+    def describe(self):
+        """One line for the screen, or "" when there is nothing to say."""
+        if self.active:
+            action = "Saving to" if self.state == "saving" else "Syncing with"
+            return f"{action} cloud... {int(time.perf_counter() - self.started)}s"
+        if self.state == "offline":
+            return f"Cloud offline ({self.error})"
+        return self.notice
+
+cloud_status = CloudStatus()
+
+def cloud_url():
+    base_url = f"https://jsonblob.com/api/jsonBlob/{JSONBLOB_ID}"
+    # Browsers need the CORS proxy; desktop goes direct
+    return CORS_PROXY + base_url if is_browser() else base_url
+
+cloud_traffic = Counter()  # Requests made and bytes sent/received, for the sync benchmark
+
+async def cloud_request(method, url, body=None, timeout=CLOUD_TIMEOUT, headers=None):
+    """Send an HTTP request without holding up the frame loop.
+
+    Returns (status, response text, response headers with lowercase names).
+    Every status comes back, errors included. In the browser it is a JS
+    fetch() polled between frames; on desktop, urllib in a worker thread.
+    Raises TimeoutError after timeout seconds and OSError on network errors.
+    Cancelling the awaiting task abandons the request (and aborts it in the
+    browser).
+    """
+    headers = {"Accept": "application/json", **(headers or {})}
+    if body is not None:
+        headers.setdefault("Content-Type", "application/json")
+    if is_browser():
+        status, text, response_headers = await browser_fetch(method, url, body, timeout, headers)
+    else:
+        status, text, response_headers = await asyncio.wait_for(
+            asyncio.to_thread(urllib_request, method, url, body, timeout, headers), timeout + 1)
+    cloud_traffic["requests"] += 1
+    cloud_traffic["sent"] += len(body.encode("utf-8")) if body else 0
+    cloud_traffic["received"] += len(text.encode("utf-8"))
+    return status, text, response_headers
+
+def urllib_request(method, url, body, timeout, headers):
+    """Blocking request, run on a worker thread by cloud_request()."""
+    import urllib.error
+    import urllib.request
+    req = urllib.request.Request(url, data=None if body is None else body.encode('utf-8'), method=method)
+    for name, value in headers.items():
+        req.add_header(name, value)
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            return response.status, response.read().decode('utf-8'), {k.lower(): v for k, v in response.headers.items()}
+    except urllib.error.HTTPError as e:  # 304, 412, 405... are answers, not failures
+        return e.code, e.read().decode('utf-8', 'replace'), {k.lower(): v for k, v in e.headers.items()}
+
+browser_request_ids = itertools.count()
+
+async def browser_fetch(method, url, body, timeout, headers):
+    """fetch() in the page; the promise fills in window.cloudRequests[id], which is checked between frames."""
+    import platform
+    request = f"window.cloudRequests[{next(browser_request_ids)}]"
+    options = {"method": method, "headers": headers, "cache": "no-store"}  # ETags are handled here, not by the browser cache
+    if body is not None:
+        options["body"] = body
+    platform.window.eval(f'''
+        (function() {{
+            window.cloudRequests = window.cloudRequests || {{}};
+            var controller = new AbortController();
+            var request = {request} = {{done: false, status: 0, text: "", etag: "", error: "", controller: controller}};
+            var options = {json.dumps(options)};
+            options.signal = controller.signal;
+            var timer = setTimeout(function() {{ request.timedOut = true; controller.abort(); }}, {int(timeout * 1000)});
+            fetch({json.dumps(url)}, options)
+                .then(function(response) {{
+                    request.status = response.status;
+                    request.etag = response.headers.get("ETag") || "";
+                    return response.text();
+                }})
+                .then(function(text) {{ request.text = text; }})
+                .catch(function(e) {{ request.error = request.timedOut ? "timeout" : String(e); }})
+                .finally(function() {{ clearTimeout(timer); request.done = true; }});
+        }})()
+    ''')
+    try:
+        while not platform.window.eval(f"{request}.done"):
+            await asyncio.sleep(0.02)  # Frames keep running while the browser waits
+        result = json.loads(platform.window.eval(
+            f"JSON.stringify({{status: {request}.status, text: {request}.text, etag: {request}.etag, error: {request}.error}})"))
+    except asyncio.CancelledError:
+        platform.window.eval(f"{request}.controller.abort()")
+        raise
+    finally:
+        platform.window.eval(f"delete {request}")
+    if result["error"] == "timeout":
+        raise TimeoutError(f"no answer in {timeout} s")
+    if result["error"]:
+        raise OSError(result["error"])
+    return result["status"], result["text"], {"etag": result["etag"]} if result["etag"] else {}
+
+def describe_cloud_error(error):
+    if isinstance(error, TimeoutError):
+        return "timed out"
+    return (str(error) or type(error).__name__)[:40]
+
+cloud_etag = None  # ETag of the cloud document as last merged here
+# Cleared once the server refuses PATCH (jsonblob does); then whole-document PUTs.
+# Browsers start with PUT: a PATCH refused there (or its CORS preflight) is only a network error.
+cloud_patch_supported = not is_browser()
+cloud_conditions_supported = True  # Cleared if the browser keeps refusing If-Match / If-None-Match through the proxy
+cloud_condition_refusals = 0  # Conditional requests in a row that only went through without their condition
+CLOUD_CONDITION_STRIKES = 3  # ...before conditions are dropped (one network error is not a refusal)
+cloud_document = {}  # The cloud document as last loaded (plus what was saved since), for whole-document PUTs
+
+async def conditional_request(method, url, body=None, headers=None, condition=None):
+    """cloud_request() with an If-Match / If-None-Match condition.
+
+    In the browser a proxy that won't allow the header fails the CORS
+    preflight, which looks like any other network error. Such a request is
+    sent again without the condition; after CLOUD_CONDITION_STRIKES of
+    those in a row, conditions are dropped (and cloud_status says so) until
+    cloud_load() next succeeds.
+    """
+    global cloud_conditions_supported, cloud_condition_refusals
+    if not condition or not cloud_conditions_supported:
+        return await cloud_request(method, url, body, headers=headers)
+    try:
+        result = await cloud_request(method, url, body, headers={**(headers or {}), **condition})
+    except TimeoutError:
+        raise
+    except OSError:
+        if not is_browser():
+            raise
+    else:
+        cloud_condition_refusals = 0
+        return result
+    result = await cloud_request(method, url, body, headers=headers)  # Still failing: the network is down
+    cloud_condition_refusals += 1
+    if cloud_condition_refusals >= CLOUD_CONDITION_STRIKES:
+        cloud_conditions_supported = False
+        cloud_status.notice = "Cloud: saving without conflict checks"
+    return result
+
+async def cloud_save(records):
+    """Upload changed leaderboard records. Returns "saved", "conflict" or "failed".
+
+    Only `records` are sent, as a JSON merge patch. Where the server refuses
+    PATCH, and always in the browser, the whole document is PUT instead (as
+    last loaded, with `records` in it). Either way the upload is
+    conditional on the document being the one last loaded (If-Match), so
+    changes made elsewhere meanwhile come back as a "conflict" instead of
+    being overwritten: load, merge and try again. Browsers that can't send
+    If-Match through the proxy save unconditionally, right after a load.
+    """
+    global cloud_etag, cloud_patch_supported
     if not CLOUD_ENABLED:
-        return False
+        return "failed"
+    cloud_status.begin("saving")
+    error = None
     try:
-        base_url = f"https://jsonblob.com/api/jsonBlob/{JSONBLOB_ID}"
-        json_data = json.dumps(data)
-
-        if is_browser():
-            # Use CORS proxy for browser requests
-            import platform
-            proxy_url = CORS_PROXY + base_url
-            escaped_data = json_data.replace("\\", "\\\\").replace("'", "\\'").replace("\n", "\\n").replace("\r", "")
-            js_code = f'''
-                (function() {{
-                    try {{
-                        var xhr = new XMLHttpRequest();
-                        xhr.open("PUT", "{proxy_url}", false);
-                        xhr.setRequestHeader("Content-Type", "application/json");
-                        xhr.send('{escaped_data}');
-                        console.log("Cloud save via proxy, status: " + xhr.status);
-                        return xhr.status === 200;
-                    }} catch(e) {{
-                        console.log("Cloud save error: " + e);
-                        return false;
-                    }}
-                }})()
-            '''
-            result = platform.window.eval(js_code)
-            print(f"Cloud save result: {result}")
-            return result
-        else:
-            # Use urllib for desktop (no proxy needed)
-            import urllib.request
-            req = urllib.request.Request(base_url, data=json_data.encode('utf-8'), method='PUT')
-            req.add_header('Content-Type', 'application/json')
-            with urllib.request.urlopen(req, timeout=10) as response:
-                return response.status == 200
+        condition = {"If-Match": cloud_etag} if cloud_etag else None
+        if cloud_patch_supported:
+            status, _, response_headers = await conditional_request(
+                "PATCH", cloud_url(), json.dumps(records),
+                headers={"Content-Type": "application/merge-patch+json"}, condition=condition)
+            if status in (400, 405, 415, 501):
+                print(f"Cloud PATCH refused (HTTP {status}), sending whole documents from now on")
+                cloud_patch_supported = False
+        if not cloud_patch_supported:
+            status, _, response_headers = await conditional_request(
+                "PUT", cloud_url(), json.dumps({**cloud_document, **records}), condition=condition)
+        print(f"Cloud save ({len(records)} records), status: {status}")
+        if status in (200, 204):
+            # Nothing else changed in between (If-Match held), so the new version is the one merged here
+            cloud_etag = response_headers.get("etag") if cloud_etag and cloud_conditions_supported else None
+            cloud_document.update(records)
+            return "saved"
+        if status == 412:
+            return "conflict"
+        error = f"HTTP {status}"
     except Exception as e:
         print(f"Cloud save error: {e}")
-    return False
+        error = describe_cloud_error(e)
+    finally:
+        cloud_status.end(error)
+    return "failed"
 
 async def cloud_load():
-    """Load leaderboard data from cloud (jsonblob.com via CORS proxy)."""
+    """Load leaderboard data from cloud (jsonblob.com, via the CORS proxy in browsers).
+
+    Asks for the document only if it changed since the last load (ETag /
+    If-None-Match) and returns {} when it has not. None if the load failed.
+    """
+    global cloud_etag, cloud_document, cloud_conditions_supported
     if not CLOUD_ENABLED:
         return None
+    cloud_status.begin("loading")
+    error = None
     try:
-        base_url = f"https://jsonblob.com/api/jsonBlob/{JSONBLOB_ID}"
-
-        if is_browser():
-            # Use CORS proxy for browser requests
-            import platform
-            proxy_url = CORS_PROXY + base_url
-            js_code = f'''
-                (function() {{
-                    try {{
-                        var xhr = new XMLHttpRequest();
-                        xhr.open("GET", "{proxy_url}", false);
-                        xhr.send();
-                        console.log("Cloud load via proxy, status: " + xhr.status);
-                        if (xhr.status === 200) {{
-                            return xhr.responseText;
-                        }}
-                    }} catch(e) {{
-                        console.log("Cloud load error: " + e);
-                    }}
-                    return null;
-                }})()
-            '''
-            result = platform.window.eval(js_code)
-            if result:
-                data = json.loads(result)
-                if isinstance(data, dict):
-                    print(f"Cloud load: got {len(data)} users")
-                    return data
+        condition = {"If-None-Match": cloud_etag} if cloud_etag else None
+        status, text, response_headers = await conditional_request("GET", cloud_url(), condition=condition)
+        if status in (200, 304) and not cloud_conditions_supported:
+            # Try conditions again from the next request; a refusing proxy drops them after one more strike
+            cloud_conditions_supported = True
+            cloud_status.notice = ""
+        if status == 304:
+            print("Cloud load: unchanged")
+            return {}
+        if status == 200:
+            data = json.loads(text)
+            if isinstance(data, dict):
+                cloud_etag = response_headers.get("etag")
+                cloud_document = data
+                print(f"Cloud load: got {len(data)} users")
+                return data
+            error = "not a leaderboard"
         else:
-            # Use urllib for desktop (no proxy needed)
-            import urllib.request
-            req = urllib.request.Request(base_url)
-            req.add_header('Accept', 'application/json')
-            with urllib.request.urlopen(req, timeout=10) as response:
-                data = json.loads(response.read().decode('utf-8'))
-                if isinstance(data, dict):
-                    print(f"Cloud load: got {len(data)} users")
-                    return data
+            error = f"HTTP {status}"
     except Exception as e:
         print(f"Cloud load error: {e}")
+        error = describe_cloud_error(e)
+    finally:
+        cloud_status.end(error)
     return None
 
 def storage_set(key, value):
@@ -120,7 +298,9 @@ def storage_set(key, value):
             else:
                 print("No platform.window available!")
         else:
-            filename = f"{key}.json" if "leaderboard" in key else f"{key}.txt"
+            filename = storage_path(key)
+            if os.path.dirname(filename):
+                os.makedirs(os.path.dirname(filename), exist_ok=True)
             with open(filename, "w") as f:
                 f.write(value)
             return True
@@ -140,13 +320,334 @@ def storage_get(key):
             else:
                 print("No platform.window available!")
         else:
-            filename = f"{key}.json" if "leaderboard" in key else f"{key}.txt"
-            with open(filename, "r") as f:
+            with open(storage_path(key), "r") as f:
                 return f.read()
     except Exception as e:
         print(f"storage_get error: {e}")
     return None
 
+def storage_remove(key):
+    """Delete from localStorage (browser) or file (desktop)."""
+    try:
+        if is_browser():
+            import platform
+            if hasattr(platform, 'window'):
+                platform.window.localStorage.removeItem(key)
+                return True
+        else:
+            os.remove(storage_path(key))
+            return True
+    except Exception as e:
+        print(f"storage_remove error: {e}")
+    return False
+
+# Storage layout: one key per player, plus an index with the few fields the
+# leaderboard needs, so nothing has to read or write everyone's records at once
+LEGACY_LEADERBOARD_KEY = "dodge_leaderboard"  # Every record in one blob (older saves)
+INDEX_KEY = "dodge_index"
+USER_KEY_PREFIX = "dodge_user_"
+INDEX_FIELDS = ("version", "points", "current_level", "best_scores")
+
+def user_key(username):
+    """Storage key of a player's record. The checksum keeps names that differ
+    only in case or punctuation apart (file names may not)."""
+    safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in username)
+    return f"{USER_KEY_PREFIX}{safe}_{zlib.crc32(username.encode('utf-8')):08x}"
+
+def storage_path(key):
+    """Desktop file for a storage key; player records go in dodge_users/."""
+    if key.startswith(USER_KEY_PREFIX):
+        return os.path.join("dodge_users", f"{key[len(USER_KEY_PREFIX):]}.json")
+    return f"{key}.txt" if key == "dodge_lastuser" else f"{key}.json"
+
+def index_entry(record):
+    """A record's entry in the index."""
+    return {field: record[field] for field in INDEX_FIELDS if field in record}
+
+# Local storage backends. Both answer:
+#   load() -> number of players (opening, creating or migrating as needed)
+#   record(username) -> the full record, entry(username) -> its index_entry() (None if no such player)
+#   versions() -> {username: (version, points)}, count(), last_user()
+#   top(offset, limit) -> [(username, entry)], most points first; rank(username) -> 1 for the top player
+#   write(records, last_user=None): store a batch of records (and who signed in last)
+#   revision: goes up with every write, so screens know when what they read is out of date
+STORAGE_BACKEND = "sqlite"  # Desktop: "sqlite" or "files" (browsers always use localStorage)
+SQLITE_PATH = "dodge.db"
+
+class FileStorage:
+    """Keys as files (desktop) or localStorage items (browser).
+
+    Each record has its own key (user_key()) and INDEX_KEY holds every
+    player's index_entry(). The index is kept in memory; leaderboard
+    queries sort it, once per change.
+    """
+    __slots__ = ("index", "ranking", "legacy", "revision")
+
+    def __init__(self):
+        self.revision = 0
+        self.index = {}
+        self.ranking = None  # (index it was built from, players by points, rank by username)
+        self.legacy = {}  # Records of an old blob that could not be migrated
+
+    def load(self):
+        try:
+            data = storage_get(INDEX_KEY)
+            self.index = json.loads(data) if data else self.migrate()
+        except Exception as e:
+            print(f"Load failed: {e}")
+            self.index = {}
+        return len(self.index)
+
+    def migrate(self):
+        """Split a save from before per-player keys into records and an index.
+
+        The old blob is removed only once everything is written; until then
+        it is migrated again on the next start, and its records are read
+        from memory.
+        """
+        data = storage_get(LEGACY_LEADERBOARD_KEY)
+        if not data:
+            return {}
+        legacy = json.loads(data)
+        index = {username: index_entry(record) for username, record in legacy.items()}
+        if (all(storage_set(user_key(username), json.dumps(record)) for username, record in legacy.items())
+                and storage_set(INDEX_KEY, encode_leaderboard(index))):
+            storage_remove(LEGACY_LEADERBOARD_KEY)
+            print(f"Migrated {len(legacy)} users to per-player storage")
+        else:
+            self.legacy = legacy
+        return index
+
+    def record(self, username):
+        if username in self.legacy:
+            return self.legacy[username]
+        if username not in self.index:
+            return None
+        data = storage_get(user_key(username))
+        return json.loads(data) if data else None
+
+    def entry(self, username):
+        return self.index.get(username)
+
+    def versions(self):
+        return {username: (entry.get("version", 0), entry.get("points", 0)) for username, entry in self.index.items()}
+
+    def count(self):
+        return len(self.index)
+
+    def last_user(self):
+        return storage_get("dodge_lastuser")
+
+    def sorted(self):
+        index = self.index
+        if self.ranking is None or self.ranking[0] is not index:
+            players = sorted(index.items(), key=lambda x: x[1].get("points", 0), reverse=True)
+            self.ranking = (index, players, {username: rank for rank, (username, _) in enumerate(players, 1)})
+        return self.ranking
+
+    def top(self, offset=0, limit=None):
+        return self.sorted()[1][offset:None if limit is None else offset + limit]
+
+    def rank(self, username):
+        return self.sorted()[2].get(username)
+
+    def write(self, records, last_user=None):
+        index = {**self.index, **{username: index_entry(record) for username, record in records.items()}}
+        self.store(encode_shards(records, index), index, last_user)
+
+    async def write_sliced(self, records, last_user=None):
+        """write(), encoding a few milliseconds per frame (for browsers: no threads there)."""
+        index = {**self.index, **{username: index_entry(record) for username, record in records.items()}}
+        self.store(await encode_shards_sliced(records, index), index, last_user)
+
+    def store(self, shards, index, last_user):
+        for key, text in shards.items():
+            storage_set(key, text)
+        if last_user is not None:
+            storage_set("dodge_lastuser", last_user)
+        self.index = index  # Replaced, not changed in place: the frame loop may be reading the old one
+        self.revision += 1
+
+# Record fields with columns of their own in the users table; best_scores
+# and upgrades have tables of their own, and the rest is kept as JSON
+SQLITE_COLUMNS = ("version", "points", "high_score", "current_level", "updated")
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    version INTEGER,
+    points INTEGER NOT NULL,
+    high_score INTEGER,
+    current_level TEXT,
+    updated INTEGER,
+    extra TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS users_by_points ON users (points DESC);
+CREATE TABLE IF NOT EXISTS best_scores (
+    username TEXT NOT NULL,
+    level TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    PRIMARY KEY (username, level)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS upgrades (
+    username TEXT NOT NULL,
+    upgrade TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    PRIMARY KEY (username, upgrade)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+class SQLiteStorage:
+    """Desktop storage in one SQLite database.
+
+    Players are rows of a users table indexed by points, so leaderboard
+    pages and ranks are queries (ties go to whoever was saved first, as
+    with the file index). A batch of records is written in one
+    transaction. The database runs in WAL mode, so the frame loop reads on
+    its own connection while the save thread writes.
+    """
+    __slots__ = ("path", "reader", "writer", "revision")
+
+    def __init__(self, path):
+        self.revision = 0
+        self.path = path
+        self.reader = None
+        self.writer = None
+
+    def load(self):
+        if self.writer is None:
+            import sqlite3
+            self.writer = sqlite3.connect(self.path, check_same_thread=False)
+            self.writer.execute("PRAGMA journal_mode=WAL")
+            self.writer.execute("PRAGMA synchronous=NORMAL")  # With WAL: commits are safe from crashes, if not power cuts
+            self.writer.executescript(SQLITE_SCHEMA)
+            self.reader = sqlite3.connect(self.path, check_same_thread=False)
+            if not self.count():
+                self.import_files()
+        return self.count()
+
+    def import_files(self):
+        """Take in the players saved as files before there was a database (either layout)."""
+        files = FileStorage()
+        if files.load():
+            records = {username: files.record(username) or entry for username, entry in files.index.items()}
+            self.write(records, files.last_user())
+            print(f"Imported {len(records)} users into {self.path}")
+
+    def scores(self, table, usernames):
+        """{username: {level or upgrade: value}} from best_scores or upgrades."""
+        found = {username: {} for username in usernames}
+        names = list(found)
+        for start in range(0, len(names), 500):  # Stay under SQLite's limit on parameters
+            chunk = names[start:start + 500]
+            for username, key, value in self.reader.execute(
+                    f"SELECT * FROM {table} WHERE username IN ({', '.join('?' * len(chunk))})", chunk):
+                found[username][key] = value
+        return found
+
+    def record(self, username):
+        row = self.reader.execute(
+            "SELECT version, points, high_score, current_level, updated, extra FROM users WHERE username = ?",
+            (username,)).fetchone()
+        if row is None:
+            return None
+        record = json.loads(row[-1])
+        record.update((field, value) for field, value in zip(SQLITE_COLUMNS, row) if value is not None)
+        record["best_scores"] = self.scores("best_scores", [username])[username]
+        record["upgrades"] = self.scores("upgrades", [username])[username]
+        return record
+
+    def entries(self, rows):
+        """[(username, index entry)] for (username, version, points, current_level) rows."""
+        best = self.scores("best_scores", [row[0] for row in rows])
+        entries = []
+        for username, *values in rows:
+            entry = {field: value for field, value in zip(INDEX_FIELDS, values) if value is not None}
+            entry["best_scores"] = best[username]
+            entries.append((username, entry))
+        return entries
+
+    def entry(self, username):
+        rows = self.reader.execute(
+            "SELECT username, version, points, current_level FROM users WHERE username = ?", (username,)).fetchall()
+        return self.entries(rows)[0][1] if rows else None
+
+    def versions(self):
+        return {username: (version or 0, points)
+                for username, version, points in self.reader.execute("SELECT username, version, points FROM users")}
+
+    def count(self):
+        return self.reader.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def last_user(self):
+        row = self.reader.execute("SELECT value FROM settings WHERE key = 'last_user'").fetchone()
+        return row[0] if row else None
+
+    def top(self, offset=0, limit=None):
+        rows = self.reader.execute(
+            "SELECT username, version, points, current_level FROM users ORDER BY points DESC, rowid LIMIT ? OFFSET ?",
+            (-1 if limit is None else limit, offset)).fetchall()
+        return self.entries(rows)
+
+    def rank(self, username):
+        row = self.reader.execute("SELECT points, rowid FROM users WHERE username = ?", (username,)).fetchone()
+        if row is None:
+            return None
+        ahead = self.reader.execute(
+            "SELECT (SELECT COUNT(*) FROM users WHERE points > ?1)"
+            " + (SELECT COUNT(*) FROM users WHERE points = ?1 AND rowid < ?2)", row).fetchone()[0]
+        return ahead + 1
+
+    def write(self, records, last_user=None):
+        users = []
+        best_scores = []
+        upgrades = []
+        for username, record in records.items():
+            extra = {field: value for field, value in record.items()
+                     if field not in SQLITE_COLUMNS and field not in ("best_scores", "upgrades")}
+            users.append((username, record.get("version"), record.get("points", 0), record.get("high_score"),
+                          record.get("current_level"), record.get("updated"), json.dumps(extra)))
+            best_scores.extend((username, level, score) for level, score in record.get("best_scores", {}).items())
+            upgrades.extend((username, upgrade, level) for upgrade, level in record.get("upgrades", {}).items())
+        removed = [(username,) for username in records]
+        with self.writer:  # One transaction: all of it or (on error) none of it
+            self.writer.executemany(
+                "INSERT INTO users (username, version, points, high_score, current_level, updated, extra)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (username) DO UPDATE SET"
+                " version = excluded.version, points = excluded.points, high_score = excluded.high_score,"
+                " current_level = excluded.current_level, updated = excluded.updated, extra = excluded.extra",
+                users)
+            self.writer.executemany("DELETE FROM best_scores WHERE username = ?", removed)
+            self.writer.executemany("INSERT INTO best_scores VALUES (?, ?, ?)", best_scores)
+            self.writer.executemany("DELETE FROM upgrades WHERE username = ?", removed)
+            self.writer.executemany("INSERT INTO upgrades VALUES (?, ?, ?)", upgrades)
+            if last_user is not None:
+                self.writer.execute("INSERT OR REPLACE INTO settings VALUES ('last_user', ?)", (last_user,))
+        self.revision += 1  # Committed: the reader sees it from now on
+
+def make_storage():
+    """The storage backend for this platform and STORAGE_BACKEND."""
+    if STORAGE_BACKEND == "sqlite" and not is_browser():
+        import importlib.util
+        if importlib.util.find_spec("_sqlite3"):  # sqlite3's C half, left out of some Python builds
+            return SQLiteStorage(SQLITE_PATH)
+        print("No sqlite3 here, saving to files")
+    return FileStorage()
+
+local_storage = make_storage()
+
+# Headless runs (python main.py --headless, --replay=FILE or --verify=URL) need no window or sound card
+HEADLESS = any(arg == "--headless" or arg.startswith(("--headless=", "--replay=", "--verify=")) for arg in sys.argv)
+if HEADLESS:
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+
+# python main.py --debug prints asset, cache and entity cap reports
+DEBUG = "--debug" in sys.argv
+
 # Initialize Pygame
 pygame.init()
 pygame.mixer.init()
@@ -165,6 +666,7 @@ YELLOW = (255, 255, 0)
 PURPLE = (150, 0, 255)
 CYAN = (0, 255, 255)
 ORANGE = (255, 165, 0)
+COLORKEY = (255, 0, 255)  # Transparent color of every colorkeyed sprite and layer (never drawn by the game)
 
 # Fonts
 FONT = pygame.font.Font(None, 30)
@@ -175,19 +677,63 @@ SMALL_FONT = pygame.font.Font(None, 24)
 screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
 pygame.display.set_caption("Dodge the Tejecks")
 
+# Asset loader - every image file is decoded once and converted to the display format
+loaded_images = {}  # path -> converted Surface
+asset_stats = {}  # path -> (decode ms, file bytes, surface bytes)
+
+def load_image(path):
+    """Load an image once, convert it to the display pixel format and cache it by path."""
+    image = loaded_images.get(path)
+    if image is not None:
+        return image
+
+    start = time.perf_counter()
+    raw = pygame.image.load(path)
+    # Keep per-pixel transparency for images that have it (PNGs), drop it otherwise
+    if raw.get_flags() & pygame.SRCALPHA:
+        image = raw.convert_alpha()
+    else:
+        image = raw.convert()
+    decode_ms = (time.perf_counter() - start) * 1000
+
+    try:
+        file_bytes = os.path.getsize(path)
+    except OSError:
+        file_bytes = 0
+    asset_stats[path] = (decode_ms, file_bytes, surface_bytes(image))
+    loaded_images[path] = image
+    return image
+
+def asset_report():
+    """Decode time and memory for every loaded image, and for the sprite bank."""
+    lines = ["Assets loaded:"]
+    for path, (decode_ms, file_bytes, image_bytes) in asset_stats.items():
+        lines.append(f"  {path:<20} {decode_ms:6.1f} ms  file {file_bytes / 1024:7.1f} KB  surface {image_bytes / 1024:7.1f} KB")
+    total_ms = sum(stat[0] for stat in asset_stats.values())
+    total_bytes = sum(stat[2] for stat in asset_stats.values())
+    lines.append(f"  {len(asset_stats)} images, {total_ms:.1f} ms, {total_bytes / 1024:.0f} KB in memory")
+    bank_bytes = sum(surface_bytes(sprite) for sprite in sprite_bank.values())
+    lines.append(f"Sprite bank: {len(sprite_bank)} sprites, {bank_bytes / 1024:.0f} KB")
+    return "\n".join(lines)
+
+def surface_bytes(surface):
+    """Approximate pixel memory used by a Surface."""
+    return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
 # Game variables
 points = 0
 high_score = 0
+high_score_run = None  # Replay (base64) of the run that set high_score, checked by verify_submissions()
 current_username = ""  # Current player's username
 current_level = "Easy"  # Track current level being played
-leaderboard_data = {}  # All players' data
+leaderboard_data = {}  # Full records of the players loaded or changed this session (the rest are in local_storage)
 shop_items = {
-    "EMDR Tejeck": {"cost": 0, "image": pygame.image.load("emdr_tejeck.png"), "purchased": True},
-    "BabyTejeck": {"cost": 200, "image": pygame.image.load("babytejeck.jpeg"), "purchased": False},
-    "Amelia": {"cost": 250, "image": pygame.image.load("amelia.jpeg"), "purchased": False},
-    "Evan": {"cost": 300, "image": pygame.image.load("me.jpeg"), "purchased": False},
-    "Mei": {"cost": 350, "image": pygame.image.load("babes.jpeg"), "purchased": False},
-    "Alv": {"cost": 400, "image": pygame.image.load("alvin.jpeg"), "purchased": False},
+    "EMDR Tejeck": {"cost": 0, "image": load_image("emdr_tejeck.png"), "purchased": True},
+    "BabyTejeck": {"cost": 200, "image": load_image("babytejeck.jpeg"), "purchased": False},
+    "Amelia": {"cost": 250, "image": load_image("amelia.jpeg"), "purchased": False},
+    "Evan": {"cost": 300, "image": load_image("me.jpeg"), "purchased": False},
+    "Mei": {"cost": 350, "image": load_image("babes.jpeg"), "purchased": False},
+    "Alv": {"cost": 400, "image": load_image("alvin.jpeg"), "purchased": False},
 }
 equipped_item = "EMDR Tejeck"
 selected_item = 0
@@ -215,68 +761,340 @@ def get_powerup_duration(powerup_type):
     upgrade_key = f"{powerup_type}_duration"
     if upgrade_key in player_upgrades:
         level = player_upgrades[upgrade_key]
-        return duration_upgrade_values[level] * 60  # Convert to frames (60 FPS)
-    return 5 * 60  # Default 5 seconds
+        return duration_upgrade_values[level] * SIM_HZ  # Convert to simulation ticks
+    return 5 * SIM_HZ  # Default 5 seconds
 
 def get_shooting_level():
     """Get current shooting level (0=single, 1=double, 2=triple)."""
     return player_upgrades.get("shooting", 0)
 
+# Random streams, one per subsystem. Effects run once per display frame, so
+# they get their own stream and never shift what spawns; a whole game then
+# plays out the same from one run seed and the player's inputs.
+spawn_random = random.Random()   # Enemies and power-ups: what falls, where and how big
+effect_random = random.Random()  # Particles, screen shake, fireworks, background
+boss_random = random.Random()    # Where the boss heads next
+
+def seed_streams(seed=None):
+    """Seed every stream from one run seed (a fresh one if None) and return that seed."""
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(63)
+    for name, stream in (("spawn", spawn_random), ("effects", effect_random), ("boss", boss_random)):
+        stream.seed(f"{seed}:{name}")  # String seeds hash the same in every process
+    return seed
+
 # Load all enemy images
 enemy_images = [
-    pygame.image.load("adeline.jpeg"),
-    pygame.image.load("alvin.jpeg"),
-    pygame.image.load("amelia.jpeg"),
-    pygame.image.load("babes.jpeg"),
-    pygame.image.load("babytejeck.jpeg"),
-    pygame.image.load("me.jpeg"),
+    load_image("adeline.jpeg"),
+    load_image("alvin.jpeg"),
+    load_image("amelia.jpeg"),
+    load_image("babes.jpeg"),
+    load_image("babytejeck.jpeg"),
+    load_image("me.jpeg"),
 ]
 
 # Load boss image
 try:
-    boss_image = pygame.image.load("tejeck_boss.jpg")
+    boss_image = load_image("tejeck_boss.jpg")
 except:
-    boss_image = pygame.image.load("babytejeck.jpeg")  # Fallback
+    boss_image = load_image("babytejeck.jpeg")  # Fallback
+
+# Enemy sizes (square, in pixels)
+ENEMY_MIN_SIZE = 25
+ENEMY_MAX_SIZE = 60
+
+# Shared bank of pre-scaled sprites: one Surface per (image, size), reused by every enemy
+sprite_bank = {}
+
+def get_scaled_sprite(image, size):
+    """Get image scaled to size x size, scaling it only the first time it's asked for."""
+    key = (image, size)
+    sprite = sprite_bank.get(key)
+    if sprite is None:
+        sprite = pygame.transform.scale(image, (size, size))
+        sprite_bank[key] = sprite
+    return sprite
+
+def build_sprite_bank():
+    """Pre-scale every enemy image at every enemy size (avoids scaling during waves)."""
+    for image in enemy_images:
+        for size in range(ENEMY_MIN_SIZE, ENEMY_MAX_SIZE + 1):
+            get_scaled_sprite(image, size)
+
+# Rotation cache settings (smaller step = smoother spin but more memory)
+ROTATION_ANGLE_STEP = 5  # Degrees between cached frames
+ROTATION_CACHE_MAX_BYTES = 8 * 1024 * 1024  # All sprites together; the least recently drawn ones go first
+
+def rotation_set_bytes(size, angle_step):
+    """Memory for every cached frame of one size x size sprite."""
+    blank = pygame.Surface((size, size), 0, 32)
+    steps = max(1, round(360 / angle_step))
+    return sum(surface_bytes(pygame.transform.rotate(blank, step * 360 / steps)) for step in range(steps))
+
+class RotationCache:
+    """Shared cache of pre-rotated sprites keyed by (image, size, quantized angle).
+
+    Sprites are drawn at their own size. Each (image, size) keeps its frames
+    together, up to sprite_max_bytes (by default a whole turn of the biggest
+    enemy, so no enemy loses frames it still needs); once the cache is over
+    max_bytes, the least recently drawn sprites are dropped.
+    """
+    def __init__(self, angle_step=ROTATION_ANGLE_STEP, max_bytes=ROTATION_CACHE_MAX_BYTES, sprite_max_bytes=None):
+        self.angle_step = angle_step
+        self.max_bytes = max_bytes
+        if sprite_max_bytes is None:
+            sprite_max_bytes = rotation_set_bytes(ENEMY_MAX_SIZE, angle_step)
+        self.sprite_max_bytes = sprite_max_bytes
+        self.sprites = OrderedDict()  # (image, size) -> [{angle step: Surface}, bytes], least recently drawn first
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, image, size, angle):
+        """Get the image scaled to size x size and rotated to the nearest cached angle."""
+        key = (image, size)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            sprite = self.sprites[key] = [{}, 0]
+        else:
+            self.sprites.move_to_end(key)
+        frames = sprite[0]
+        steps = max(1, round(360 / self.angle_step))
+        step = round(angle / self.angle_step) % steps
+
+        rotated = frames.get(step)
+        if rotated is not None:
+            self.hits += 1
+            return rotated
+
+        self.misses += 1
+        rotated = pygame.transform.rotate(get_scaled_sprite(image, size), step * 360 / steps)
+        frames[step] = rotated
+        added = surface_bytes(rotated)
+        sprite[1] += added
+        self.bytes_used += added
+
+        # A sprite over its own cap drops its oldest frames...
+        while sprite[1] > self.sprite_max_bytes and len(frames) > 1:
+            old = frames.pop(next(iter(frames)))
+            freed = surface_bytes(old)
+            sprite[1] -= freed
+            self.bytes_used -= freed
+            self.evictions += 1
+        # ...and a cache over its budget drops the least recently drawn sprites
+        while self.bytes_used > self.max_bytes and len(self.sprites) > 1:
+            _, (old_frames, freed) = self.sprites.popitem(last=False)
+            self.bytes_used -= freed
+            self.evictions += len(old_frames)
+        return rotated
+
+    def clear(self):
+        self.sprites.clear()
+        self.bytes_used = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "angle_step": self.angle_step,
+            "sprites": len(self.sprites),
+            "frames": sum(len(frames) for frames, _ in self.sprites.values()),
+            "bytes": self.bytes_used,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def report(self):
+        s = self.stats()
+        return (f"Rotation cache: step {s['angle_step']} deg, {s['sprites']} sprites, {s['frames']} frames, "
+                f"{s['bytes'] / 1024:.0f} KB, hit rate {s['hit_rate']:.1%}, "
+                f"{s['evictions']} evictions")
+
+rotation_cache = RotationCache()
+
+# Most entities of each kind on screen at once; when full, adding one evicts another
+ENTITY_CAPS = {
+    "endless": {"enemies": 100, "power_ups": 20, "lasers": 60, "explosions": 100, "particles": 400},
+    "boss": {"enemies": 30, "lasers": 20, "fires": 50, "explosions": 10, "particles": 100},
+}
+entity_cap_hits = Counter()  # Container name -> entities evicted because it was full
+
+def cap_report():
+    if not entity_cap_hits:
+        return "Entity caps: never hit"
+    return "Entity caps hit: " + ", ".join(f"{name} {hits}" for name, hits in entity_cap_hits.most_common())
+
+# Moving entities are __slots__ objects, moved a whole class at a time
+class EntityStore:
+    """Live enemies, lasers, fires or power-ups, moved together once a tick.
+
+    Entities stay in spawn order in one list. step() hands them to their
+    class's step_all(), which moves the whole batch in one loop instead of
+    calling a method per entity, and drops the ones it reports as gone.
+
+    With a capacity, adding to a full store first evicts the oldest entity, or
+    with evict="offscreen" the oldest one outside the screen if there is one.
+
+    Positions stay on the entities rather than in array columns: without
+    NumPy the batch loop is Python either way, and every read through a
+    column index measured several times slower than an attribute.
+    """
+    def __init__(self, capacity=None, evict="oldest", name=None):
+        self.capacity = capacity
+        self.evict_offscreen = evict == "offscreen"
+        self.name = name
+        self.entities = []
+        self.kinds = Counter()  # Entity class -> how many of them are in the store
+
+    def __len__(self):
+        return len(self.entities)
+
+    def __iter__(self):
+        # Snapshot, so entities can be removed while looping
+        return iter(self.entities[:])
+
+    def __contains__(self, entity):
+        return entity in self.entities
+
+    def add(self, entity):
+        """Start tracking an entity (entities call this from __init__, once their values are set)."""
+        if self.capacity is not None and len(self.entities) >= self.capacity:
+            self.evict()
+        if getattr(entity, "rect", None) is None:
+            entity.rect = pygame.Rect(0, 0, 0, 0)  # Kept for life, moved by get_rect()
+        self.entities.append(entity)
+        self.kinds[type(entity)] += 1
+
+    def remove(self, entity):
+        """Stop tracking entity."""
+        self.entities.remove(entity)
+        self.forget(entity)
+
+    def forget(self, entity):
+        """Bookkeeping for an entity that has left the list."""
+        kind = type(entity)
+        self.kinds[kind] -= 1
+        if not self.kinds[kind]:
+            del self.kinds[kind]
+
+    def clear(self):
+        self.entities.clear()
+        self.kinds.clear()
+
+    def evict(self):
+        """Make room in a full store, counting the hit in entity_cap_hits."""
+        oldest = self.entities[0]
+        if self.evict_offscreen:
+            oldest = next((entity for entity in self.entities
+                           if not (0 <= entity.x <= SCREEN_WIDTH and 0 <= entity.y <= SCREEN_HEIGHT)), oldest)
+        entity_cap_hits[self.name] += 1
+        self.remove(oldest)
+
+    def step(self, speed=0.0):
+        """Move every entity one tick and drop the ones that left; returns how many left.
+
+        speed is the level's falling speed, for the classes that fall with it.
+        """
+        if len(self.kinds) == 1:
+            gone = next(iter(self.kinds)).step_all(self.entities, speed)
+        else:
+            gone = []
+            for kind in self.kinds:
+                gone += kind.step_all([entity for entity in self.entities if type(entity) is kind], speed)
+        if gone:
+            left = set(gone)
+            self.entities[:] = [entity for entity in self.entities if entity not in left]  # One pass, not a remove() each
+            for entity in gone:
+                self.forget(entity)
+        return len(gone)
+
+class BoundedQueue:
+    """Entities in spawn order, dropping the oldest when full."""
+    __slots__ = ("items", "capacity", "name")
+
+    def __init__(self, capacity, name):
+        self.items = deque()
+        self.capacity = capacity
+        self.name = name
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(list(self.items))  # Snapshot, so entities can be removed while looping
+
+    def append(self, entity):
+        if len(self.items) >= self.capacity:
+            entity_cap_hits[self.name] += 1
+            self.items.popleft()
+        self.items.append(entity)
+
+    def remove(self, entity):
+        self.items.remove(entity)
+
+    def clear(self):
+        self.items.clear()
+
+class StoredEntity:
+    """Base for entities kept in an EntityStore: position, size and collision Rect."""
+    __slots__ = ("x", "y", "prev_y", "size", "rect")
 
 # Enemy class for falling characters with random sizes
-class Enemy:
-    def __init__(self, x):
+class Enemy(StoredEntity):
+    __slots__ = ("image", "spin_speed", "angle")
+
+    def __init__(self, store, x):
         self.x = x
         self.y = -50
-        self.image = random.choice(enemy_images)
-        self.size = random.randint(25, 60)  # Random size from small to big
-        self.scaled_image = pygame.transform.scale(self.image, (self.size, self.size))
-        self.rotation = random.uniform(-30, 30)  # Slight random rotation
-        self.spin_speed = random.uniform(-2, 2)  # Spinning animation
+        self.prev_y = self.y  # Position at the previous tick, for interpolated drawing
+        self.image = spawn_random.choice(enemy_images)
+        self.size = spawn_random.randint(ENEMY_MIN_SIZE, ENEMY_MAX_SIZE)  # Random size from small to big
+        self.spin_speed = spawn_random.uniform(-2, 2)  # Spinning animation
         self.angle = 0
-
-    def update(self, speed):
-        self.y += speed
-        self.angle += self.spin_speed
-
-    def draw(self, surface, shake_x=0, shake_y=0):
-        # Rotate the image for fun spinning effect
-        rotated = pygame.transform.rotate(self.scaled_image, self.angle)
-        rect = rotated.get_rect(center=(self.x + shake_x, self.y + shake_y))
+        store.add(self)
+
+    @staticmethod
+    def step_all(enemies, speed):
+        """Move a batch of enemies; returns the ones now fully below the screen."""
+        gone = []
+        for enemy in enemies:
+            enemy.prev_y = y = enemy.y
+            enemy.y = y = y + speed
+            enemy.angle += enemy.spin_speed
+            if y > SCREEN_HEIGHT + enemy.size:
+                gone.append(enemy)
+        return gone
+
+    def draw(self, surface, shake_x=0, shake_y=0, alpha=1.0):
+        # Spinning effect using pre-rotated frames from the shared cache
+        rotated = rotation_cache.get(self.image, self.size, self.angle)
+        y = lerp(self.prev_y, self.y, alpha)
+        rect = rotated.get_rect(center=(self.x + shake_x, y + shake_y))
         surface.blit(rotated, rect)
 
     def get_rect(self):
-        half = self.size // 2
-        return pygame.Rect(self.x - half, self.y - half, self.size, self.size)
-
-    def is_off_screen(self):
-        return self.y > SCREEN_HEIGHT + self.size
+        size = self.size
+        half = size // 2
+        self.rect.update(self.x - half, self.y - half, size, size)
+        return self.rect
 
 # Boss class for the FINAL VIRTUAL EMDR TEJECK BOSS
 class Boss:
+    __slots__ = ("size", "x", "y", "prev_x", "target_x", "health", "max_health", "image", "angle",
+                 "spin_speed", "move_timer", "fire_timer", "fire_rate", "phase", "hit_flash", "rect")
+
     def __init__(self):
         self.size = 150  # Big boss!
         self.x = SCREEN_WIDTH // 2
         self.y = 100
+        self.prev_x = self.x
         self.target_x = SCREEN_WIDTH // 2
         self.health = 100
         self.max_health = 100
-        self.image = pygame.transform.scale(boss_image, (self.size, self.size))
+        self.image = boss_image  # Scaled once, rotated every frame (see draw)
         self.angle = 0
         self.spin_speed = 1
         self.move_timer = 0
@@ -284,12 +1102,14 @@ class Boss:
         self.fire_rate = 60  # Frames between fire shots
         self.phase = 1  # Boss phases get harder
         self.hit_flash = 0
+        self.rect = pygame.Rect(0, 0, 0, 0)  # Moved by get_rect()
 
     def update(self):
         # Spin animation
         self.angle += self.spin_speed
 
         # Move towards target
+        self.prev_x = self.x
         if abs(self.x - self.target_x) > 5:
             if self.x < self.target_x:
                 self.x += 3
@@ -300,7 +1120,7 @@ class Boss:
         self.move_timer += 1
         if self.move_timer > 90:
             self.move_timer = 0
-            self.target_x = random.randint(100, SCREEN_WIDTH - 100)
+            self.target_x = boss_random.randint(100, SCREEN_WIDTH - 100)
 
         # Update phase based on health
         if self.health < 30:
@@ -325,10 +1145,12 @@ class Boss:
             return True
         return False
 
-    def draw(self, surface):
-        # Draw boss with rotation (ball-shaped spinning)
-        rotated = pygame.transform.rotate(self.image, self.angle)
-        rect = rotated.get_rect(center=(self.x, self.y))
+    def draw(self, surface, alpha=1.0):
+        # Draw boss with rotation (ball-shaped spinning). Rotated at its exact angle:
+        # a whole turn of cached frames would take 10+ MB to save one rotate a frame
+        rotated = pygame.transform.rotate(get_scaled_sprite(self.image, self.size), self.angle)
+        x = lerp(self.prev_x, self.x, alpha)
+        rect = rotated.get_rect(center=(x, self.y))
 
         # Draw boss
         surface.blit(rotated, rect)
@@ -336,8 +1158,8 @@ class Boss:
         # Flash effect when hit (simple red ring)
         if self.hit_flash > 0:
             # Draw red rings around boss when hit
-            pygame.draw.circle(surface, RED, (int(self.x), int(self.y)), self.size // 2 + 10, 4)
-            pygame.draw.circle(surface, ORANGE, (int(self.x), int(self.y)), self.size // 2 + 5, 3)
+            pygame.draw.circle(surface, RED, (int(x), int(self.y)), self.size // 2 + 10, 4)
+            pygame.draw.circle(surface, ORANGE, (int(x), int(self.y)), self.size // 2 + 5, 3)
 
         # Draw health bar
         bar_width = 200
@@ -355,16 +1177,17 @@ class Boss:
         pygame.draw.rect(surface, WHITE, (bar_x - 2, bar_y - 2, bar_width + 4, bar_height + 4), 2, border_radius=5)
 
         # Boss name
-        name_text = FONT.render("FINAL VIRTUAL EMDR TEJECK BOSS", True, RED)
+        name_text = render_text("FINAL VIRTUAL EMDR TEJECK BOSS", FONT, RED)
         surface.blit(name_text, (SCREEN_WIDTH // 2 - name_text.get_width() // 2, bar_y + 25))
 
         # Phase indicator
-        phase_text = SMALL_FONT.render(f"Phase {self.phase}", True, PURPLE)
+        phase_text = render_text(f"Phase {self.phase}", SMALL_FONT, PURPLE)
         surface.blit(phase_text, (SCREEN_WIDTH // 2 - phase_text.get_width() // 2, bar_y + 50))
 
     def get_rect(self):
         half = self.size // 2
-        return pygame.Rect(self.x - half, self.y - half, self.size, self.size)
+        self.rect.update(self.x - half, self.y - half, self.size, self.size)
+        return self.rect
 
     def take_damage(self, amount):
         self.health -= amount
@@ -372,10 +1195,14 @@ class Boss:
         return self.health <= 0
 
 # Fire projectile class for boss attacks
-class Fire:
-    def __init__(self, x, y, target_x, target_y, speed=8):
+class Fire(StoredEntity):
+    __slots__ = ("prev_x", "vx", "vy", "lifetime", "angle")
+
+    def __init__(self, store, x, y, target_x, target_y, speed=8):
         self.x = x
         self.y = y
+        self.prev_x = x
+        self.prev_y = y
         # Calculate direction towards target
         dx = target_x - x
         dy = target_y - y
@@ -389,40 +1216,233 @@ class Fire:
         self.size = 15
         self.lifetime = 300
         self.angle = 0
-
-    def update(self):
-        self.x += self.vx
-        self.y += self.vy
-        self.angle += 10
-        self.lifetime -= 1
-
-    def draw(self, surface):
+        store.add(self)
+
+    @staticmethod
+    def step_all(fires, speed):
+        """Move a batch of fires; returns the burnt-out ones and those more than 50px off screen."""
+        gone = []
+        for fire in fires:
+            fire.prev_x = x = fire.x
+            fire.prev_y = y = fire.y
+            fire.x = x = x + fire.vx
+            fire.y = y = y + fire.vy
+            fire.angle += 10
+            fire.lifetime -= 1
+            if (fire.lifetime <= 0 or x < -50 or x > SCREEN_WIDTH + 50 or
+                    y < -50 or y > SCREEN_HEIGHT + 50):
+                gone.append(fire)
+        return gone
+
+    def draw(self, surface, alpha=1.0):
+        x = lerp(self.prev_x, self.x, alpha)
+        y = lerp(self.prev_y, self.y, alpha)
         # Draw fire as animated flame
         colors = [RED, ORANGE, YELLOW]
         for i, color in enumerate(colors):
             size = self.size - i * 3
             if size > 0:
                 offset = math.sin(self.angle * 0.1 + i) * 3
-                pygame.draw.circle(surface, color, (int(self.x + offset), int(self.y)), size)
+                pygame.draw.circle(surface, color, (int(x + offset), int(y)), size)
 
         # Fire trail
         for i in range(3):
-            trail_x = self.x - self.vx * (i + 1) * 0.5
-            trail_y = self.y - self.vy * (i + 1) * 0.5
+            trail_x = x - self.vx * (i + 1) * 0.5
+            trail_y = y - self.vy * (i + 1) * 0.5
             trail_size = self.size - i * 4
             if trail_size > 0:
                 pygame.draw.circle(surface, ORANGE, (int(trail_x), int(trail_y)), trail_size)
 
     def get_rect(self):
-        return pygame.Rect(self.x - self.size, self.y - self.size, self.size * 2, self.size * 2)
-
-    def is_dead(self):
-        return (self.lifetime <= 0 or
-                self.x < -50 or self.x > SCREEN_WIDTH + 50 or
-                self.y < -50 or self.y > SCREEN_HEIGHT + 50)
+        size = self.size
+        self.rect.update(self.x - size, self.y - size, size * 2, size * 2)
+        return self.rect
+
+# Collision broadphase
+COLLISION_CELL_SIZE = 64  # Pixels per grid cell (about the biggest enemy)
+
+class SpatialHash:
+    """Uniform grid that finds what a rect overlaps without testing every object.
+
+    rebuild() buckets the objects by the cells their rect covers (once per
+    tick, after they move). query() only looks at the cells under the given
+    rect and returns the objects that really collide, in the order they were
+    added, so "first hit wins" logic behaves exactly like a plain list scan.
+    """
+    def __init__(self, cell_size=COLLISION_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.entries = {}  # object -> (insertion order, rect)
+        self.added = 0
+        self.tests = 0  # Rect-vs-rect tests done (for benchmarks)
+
+    def clear(self):
+        self.cells.clear()
+        self.entries.clear()
+        self.added = 0
+
+    def rebuild(self, objects):
+        """Replace the grid contents with objects (anything with get_rect())."""
+        self.clear()
+        for obj in objects:
+            self.insert(obj, obj.get_rect())
+
+    def cell_range(self, rect):
+        size = self.cell_size
+        return (range(rect.left // size, (rect.right - 1) // size + 1),
+                range(rect.top // size, (rect.bottom - 1) // size + 1))
+
+    def insert(self, obj, rect):
+        self.entries[obj] = (self.added, rect)
+        self.added += 1
+        cols, rows = self.cell_range(rect)
+        for cx in cols:
+            for cy in rows:
+                self.cells.setdefault((cx, cy), []).append(obj)
+
+    def remove(self, obj):
+        """Forget obj (its cell slots are skipped until the next rebuild)."""
+        self.entries.pop(obj, None)
+
+    def query(self, rect):
+        """Objects whose rect collides with rect (a pygame.Rect), in insertion order."""
+        seen = set()
+        hits = []
+        cols, rows = self.cell_range(rect)
+        for cx in cols:
+            for cy in rows:
+                for obj in self.cells.get((cx, cy), ()):
+                    if obj in seen:
+                        continue
+                    seen.add(obj)
+                    entry = self.entries.get(obj)
+                    if entry is None:
+                        continue
+                    self.tests += 1
+                    if rect.colliderect(entry[1]):
+                        hits.append((entry[0], obj))
+        hits.sort(key=lambda hit: hit[0])
+        return [obj for _, obj in hits]
+
+# Frame pacing
+TARGET_FPS = 60
+IDLE_FPS = 15  # Frame rate of a screen nobody is touching
+IDLE_AFTER = 5.0  # Seconds without input before a screen may go idle
+INPUT_EVENTS = [
+    pygame.QUIT, pygame.KEYDOWN, pygame.KEYUP, pygame.TEXTINPUT,
+    pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.MOUSEMOTION,
+    pygame.FINGERDOWN, pygame.FINGERUP, pygame.FINGERMOTION,
+]
 
-# Clock for controlling FPS
-clock = pygame.time.Clock()
+class FrameScheduler:
+    """Paces every screen loop without blocking the asyncio event loop.
+
+    Instead of sleeping inside clock.tick(), next_frame() awaits the rest of the
+    frame so background tasks (cloud sync) keep running. Screens that say they
+    aren't busy drop to IDLE_FPS once the player hasn't touched anything for
+    IDLE_AFTER seconds, and jump back to TARGET_FPS on the next input.
+    """
+    def __init__(self, fps=TARGET_FPS, idle_fps=IDLE_FPS, idle_after=IDLE_AFTER):
+        self.fps = fps
+        self.idle_fps = idle_fps
+        self.idle_after = idle_after
+        self.last_frame = time.perf_counter()
+        self.last_input = self.last_frame
+        self.ticks = 1.0  # Length of the last frame in 60 FPS frames
+        self.idle = False
+
+    def wake(self):
+        """Note player input (leaves idle mode)."""
+        self.last_input = time.perf_counter()
+
+    def events(self):
+        """Get pending events (like pygame.event.get), waking up on input."""
+        events = pygame.event.get()
+        for event in events:
+            if event.type in INPUT_EVENTS:
+                self.wake()
+                break
+        return events
+
+    async def next_frame(self, busy=True):
+        """Wait until the next frame is due, yielding to other tasks meanwhile.
+
+        Pass busy=False on screens where nothing important is animating so they
+        may go idle. Returns the length of the frame in 60 FPS ticks.
+        """
+        start = self.last_frame
+        self.idle = not busy and time.perf_counter() - self.last_input > self.idle_after
+        frame_time = 1 / (self.idle_fps if self.idle else self.fps)
+        deadline = start + frame_time
+
+        await asyncio.sleep(0)  # Always let other tasks run
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            if self.idle:
+                # Wake up early on input, checking every normal frame
+                if pygame.event.peek(INPUT_EVENTS):
+                    self.wake()
+                    break
+                remaining = min(remaining, 1 / self.fps)
+            await asyncio.sleep(remaining)
+
+        now = time.perf_counter()
+        # Keep a steady cadence, but don't try to catch up after a long stall
+        self.last_frame = deadline if now - deadline < frame_time else now
+        self.ticks = min((now - start) * TARGET_FPS, 6.0)
+        return self.ticks
+
+frame_scheduler = FrameScheduler()
+
+def set_render_rate(fps):
+    """Cap how often the screen is redrawn. Game speed is unaffected."""
+    frame_scheduler.fps = min(RENDER_RATES, key=lambda rate: abs(rate - fps))
+
+# Fixed-timestep simulation
+SIM_HZ = 60  # Game logic always ticks at this rate, whatever the display does
+MAX_SIM_STEPS = 5  # Most ticks run per frame; past this the game slows down instead of freezing
+RENDER_RATES = (30, 60, 120, 144)
+
+def lerp(a, b, t):
+    """Linear interpolation from a (t=0) to b (t=1)."""
+    return a + (b - a) * t
+
+class SimClock:
+    """Accumulator that decouples the game logic from the render rate.
+
+    Each frame, steps() says how many fixed ticks to run for the real time that
+    passed (0 at high refresh rates, 2 at 30 FPS). alpha is how far the frame
+    falls between the last two ticks, so entities can draw at lerp(prev, now).
+    """
+    def __init__(self, hz=SIM_HZ, max_steps=MAX_SIM_STEPS):
+        self.dt = 1 / hz
+        self.max_steps = max_steps
+        self.dropped = 0  # Ticks skipped after long stalls
+        self.reset()
+
+    def reset(self):
+        """Start counting from now (after pausing or loading)."""
+        self.last_time = time.perf_counter()
+        self.accumulator = 0.0
+        self.alpha = 1.0
+
+    def steps(self):
+        """Number of ticks due since the last call."""
+        now = time.perf_counter()
+        self.accumulator += now - self.last_time
+        self.last_time = now
+
+        steps = int(self.accumulator / self.dt)
+        if steps > self.max_steps:
+            self.dropped += steps - self.max_steps
+            steps = self.max_steps
+            self.accumulator = self.accumulator % self.dt
+        else:
+            self.accumulator -= steps * self.dt
+        self.alpha = self.accumulator / self.dt
+        return steps
 
 # Sound generation functions (works with Pygbag)
 def generate_sound(frequency, duration_ms, volume=0.3):
@@ -455,85 +1475,218 @@ def play_sound(sound):
     except:
         pass
 
-# Particle class for visual effects
-class Particle:
-    def __init__(self, x, y, color, velocity=None, lifetime=30):
-        self.x = x
-        self.y = y
-        self.color = color
-        self.lifetime = lifetime
-        self.max_lifetime = lifetime
-        if velocity:
-            self.vx, self.vy = velocity
-        else:
-            angle = random.uniform(0, 2 * math.pi)
-            speed = random.uniform(2, 6)
-            self.vx = math.cos(angle) * speed
-            self.vy = math.sin(angle) * speed
-        self.size = random.randint(3, 8)
-
-    def update(self):
-        self.x += self.vx
-        self.y += self.vy
-        self.vy += 0.2  # Gravity
-        self.lifetime -= 1
-        self.size = max(1, int(self.size * 0.95))
-
-    def draw(self, surface):
-        alpha = int(255 * (self.lifetime / self.max_lifetime))
-        color = (*self.color[:3], alpha) if len(self.color) == 4 else self.color
-        pygame.draw.circle(surface, self.color, (int(self.x), int(self.y)), self.size)
-
-    def is_dead(self):
-        return self.lifetime <= 0
+# Particle engine
+PARTICLE_BUDGET = 600  # Live particles across every system; bursts thin out as it fills
+particle_sprites = {}  # (color, radius) -> pre-rendered circle
+particle_systems = weakref.WeakSet()  # Systems in use (for the budget)
+
+def get_particle_sprite(color, radius):
+    """A circle as drawn by pygame.draw.circle, baked once per color and radius."""
+    key = (color, radius)
+    sprite = particle_sprites.get(key)
+    if sprite is None:
+        sprite = pygame.Surface((radius * 2, radius * 2)).convert()
+        sprite.fill(COLORKEY)
+        pygame.draw.circle(sprite, color, (radius, radius), radius)
+        sprite.set_colorkey(COLORKEY, pygame.RLEACCEL)
+        particle_sprites[key] = sprite
+    return sprite
+
+def live_particles():
+    return sum(len(system) for system in particle_systems)
+
+class ParticleSystem:
+    """Fixed-capacity ring buffer of particles.
+
+    A particle never changes after it is emitted: it keeps its start position,
+    velocity, birth time and lifetime in array columns, plus the list of
+    sprites it shrinks through. Motion under constant gravity has a closed
+    form, so update() only moves the clock on, and draw() works out every
+    position for the current (or an interpolated) time while building one
+    Surface.blits() batch. When the
+    ring is full the oldest particle is overwritten, and emit() thins bursts
+    out as the global PARTICLE_BUDGET fills up.
+    """
+    __slots__ = ("capacity", "gravity", "shrink", "name", "x", "y", "vx", "vy", "born", "life", "frames",
+                 "head", "tail", "tick", "looks", "thinned", "__weakref__")
+
+    def __init__(self, capacity, gravity=0.2, shrink=0.95, name="particles"):
+        self.capacity = capacity
+        self.gravity = gravity
+        self.shrink = shrink
+        self.name = name
+        self.x = array("f", bytes(4 * capacity))
+        self.y = array("f", bytes(4 * capacity))
+        self.vx = array("f", bytes(4 * capacity))
+        self.vy = array("f", bytes(4 * capacity))
+        self.born = array("d", bytes(8 * capacity))
+        self.life = array("f", bytes(4 * capacity))
+        self.frames = [None] * capacity  # (sprite, radius) for each tick of age
+        self.head = 0  # Particles emitted so far (next one goes in slot head % capacity)
+        self.tail = 0  # Oldest particle that may still be alive
+        self.tick = 0.0
+        self.looks = {}  # (color, start size) -> frames
+        self.thinned = 0  # Particles skipped because of the budget
+        particle_systems.add(self)
+
+    def __len__(self):
+        return self.head - self.tail
+
+    def clear(self):
+        self.tail = self.head
+
+    def emit(self, x, y, color, count=1, velocity=None, lifetime=30, size=None):
+        """Add count particles at (x, y). color may be a list to pick from per particle.
+
+        Without a velocity each one flies off in a random direction.
+        """
+        load = live_particles() / PARTICLE_BUDGET
+        if load > 0.5:
+            wanted = count
+            count = max(1, round(count * max(0.0, 1 - load) * 2))
+            self.thinned += wanted - count
+
+        for _ in range(count):
+            particle_color = effect_random.choice(color) if isinstance(color, list) else color
+            if velocity:
+                vx, vy = velocity
+            else:
+                angle = effect_random.uniform(0, 2 * math.pi)
+                speed = effect_random.uniform(2, 6)
+                vx = math.cos(angle) * speed
+                vy = math.sin(angle) * speed
+            slot = self.head % self.capacity
+            self.x[slot] = x
+            self.y[slot] = y
+            self.vx[slot] = vx
+            self.vy[slot] = vy
+            self.born[slot] = self.tick
+            self.life[slot] = lifetime
+            self.frames[slot] = self.frames_for(particle_color, size if size is not None else effect_random.randint(3, 8))
+            self.head += 1
+        # Overwritten particles are gone
+        oldest = self.head - self.capacity
+        if oldest > self.tail:
+            entity_cap_hits[self.name] += oldest - self.tail
+            self.tail = oldest
+
+    def update(self, ticks=1):
+        """Advance time and drop expired particles from the tail."""
+        self.tick += ticks
+        born, life, capacity = self.born, self.life, self.capacity
+        while self.tail < self.head:
+            slot = self.tail % capacity
+            if self.tick - born[slot] < life[slot]:
+                break
+            self.tail += 1
+
+    def frames_for(self, color, start):
+        """Sprite and radius after each tick for a particle that started at size start."""
+        key = (color, start)
+        frames = self.looks.get(key)
+        if frames is None:
+            sizes = [start]
+            while self.shrink and sizes[-1] > 1:
+                sizes.append(max(1, int(sizes[-1] * self.shrink)))
+            frames = [(get_particle_sprite(color, size), size) for size in sizes]
+            self.looks[key] = frames
+        return frames
+
+    def segments(self):
+        """Slot ranges holding live particles, oldest first (two when the ring wraps)."""
+        start = self.tail % self.capacity
+        end = start + len(self)
+        if end <= self.capacity:
+            return [(start, end)]
+        return [(start, self.capacity), (0, end - self.capacity)]
+
+    def draw(self, surface, alpha=1.0, rects=False):
+        """Draw live particles alpha of the way from the previous tick to this one.
+
+        Returns the drawn rects when rects=True.
+        """
+        now = self.tick - (1 - alpha)
+        half_gravity = self.gravity / 2
+        sequence = []
+        append = sequence.append
+        for start, end in self.segments():
+            for x, y, vx, vy, born, life, frames in zip(
+                    self.x[start:end], self.y[start:end], self.vx[start:end], self.vy[start:end],
+                    self.born[start:end], self.life[start:end], self.frames[start:end]):
+                age = now - born
+                if age >= life:
+                    continue
+                if age < 0:
+                    age = 0.0
+                sprite, radius = frames[int(age)] if age < len(frames) else frames[-1]
+                # Same as stepping x += vx; y += vy; vy += gravity age times
+                x += vx * age
+                y += vy * age + half_gravity * age * (age - 1)
+                append((sprite, (int(x) - radius, int(y) - radius)))
+        return surface.blits(sequence, rects)
 
 # Laser class for shooting
-class Laser:
-    def __init__(self, x, y, color=RED, speed=15, width=4, double=False):
+class Laser(StoredEntity):
+    __slots__ = ("color", "speed", "width", "height", "double", "active")
+
+    def __init__(self, store, x, y, color=RED, speed=15, width=4, double=False):
         self.x = x
         self.y = y
+        self.prev_y = y
+        self.size = 0
         self.color = color
         self.speed = speed
         self.width = width
         self.height = 20
         self.double = double
         self.active = True
-
-    def update(self):
-        self.y -= self.speed
-
-    def draw(self, surface):
+        store.add(self)
+
+    @staticmethod
+    def step_all(lasers, speed):
+        """Move a batch of lasers up; returns the ones now fully above the screen."""
+        gone = []
+        for laser in lasers:
+            laser.prev_y = y = laser.y
+            laser.y = y = y - laser.speed
+            if y < -laser.height:
+                gone.append(laser)
+        return gone
+
+    def draw(self, surface, alpha=1.0):
+        y = lerp(self.prev_y, self.y, alpha)
         # Main laser beam
-        pygame.draw.rect(surface, self.color, (self.x - self.width // 2, self.y, self.width, self.height))
+        pygame.draw.rect(surface, self.color, (self.x - self.width // 2, y, self.width, self.height))
         # Glow effect
-        pygame.draw.rect(surface, WHITE, (self.x - self.width // 4, self.y + 2, self.width // 2, self.height - 4))
+        pygame.draw.rect(surface, WHITE, (self.x - self.width // 4, y + 2, self.width // 2, self.height - 4))
         # Trail effect
         for i in range(3):
             alpha_color = (self.color[0], self.color[1], self.color[2])
-            trail_y = self.y + self.height + i * 8
+            trail_y = y + self.height + i * 8
             trail_width = self.width - i
             if trail_width > 0:
                 pygame.draw.rect(surface, alpha_color, (self.x - trail_width // 2, trail_y, trail_width, 6))
 
     def get_rect(self):
-        return pygame.Rect(self.x - self.width // 2, self.y, self.width, self.height)
-
-    def is_off_screen(self):
-        return self.y < -self.height
+        self.rect.update(self.x - self.width // 2, self.y, self.width, self.height)
+        return self.rect
 
 # Explosion class for bomb effect
 class Explosion:
-    def __init__(self, x, y):
+    __slots__ = ("x", "y", "color", "radius", "max_radius", "growth_speed", "active", "alpha")
+
+    def __init__(self, x, y, color=ORANGE):
         self.x = x
         self.y = y
+        self.color = color  # Outer ring
         self.radius = 10
         self.max_radius = 80
         self.growth_speed = 8
         self.active = True
         self.alpha = 255
 
-    def update(self):
-        self.radius += self.growth_speed
+    def update(self, ticks=1):
+        self.radius += self.growth_speed * ticks
         self.alpha = max(0, 255 - (self.radius / self.max_radius) * 255)
         if self.radius >= self.max_radius:
             self.active = False
@@ -541,14 +1694,15 @@ class Explosion:
     def draw(self, surface):
         if self.active:
             # Outer ring
-            pygame.draw.circle(surface, ORANGE, (int(self.x), int(self.y)), int(self.radius), 4)
+            pygame.draw.circle(surface, self.color, (int(self.x), int(self.y)), int(self.radius), 4)
             # Inner ring
             pygame.draw.circle(surface, YELLOW, (int(self.x), int(self.y)), int(self.radius * 0.7), 3)
             # Core
             pygame.draw.circle(surface, WHITE, (int(self.x), int(self.y)), int(self.radius * 0.3))
 
 # Power-up class
-class PowerUp:
+class PowerUp(StoredEntity):
+    __slots__ = ("prev_x", "type", "bob_offset", "collected")
     TYPES = {
         'coin': {'color': YELLOW, 'symbol': '$', 'duration': 0},
         'shield': {'color': CYAN, 'symbol': 'S', 'duration': 300},
@@ -561,50 +1715,90 @@ class PowerUp:
         'ammo': {'color': (200, 200, 200), 'symbol': 'A', 'duration': 0},
     }
 
-    def __init__(self, x, y, power_type):
+    def __init__(self, store, x, y, power_type):
         self.x = x
         self.y = y
+        self.prev_x = x
+        self.prev_y = y
         self.type = power_type
         self.size = 25
-        self.bob_offset = random.uniform(0, 2 * math.pi)
+        self.bob_offset = spawn_random.uniform(0, 2 * math.pi)
         self.collected = False
-
-    def update(self, speed):
-        self.y += speed * 0.5
-        self.bob_offset += 0.1
-
-    def draw(self, surface, shake_x=0, shake_y=0):
+        store.add(self)
+
+    @staticmethod
+    def step_all(power_ups, speed):
+        """Move a batch of power-ups (half the enemy speed, bobbing); returns the ones below the screen."""
+        gone = []
+        fall = speed * 0.5
+        for power in power_ups:
+            power.prev_x = power.x
+            power.prev_y = y = power.y
+            power.y = y = y + fall
+            power.bob_offset += 0.1
+            if y > SCREEN_HEIGHT + power.size:
+                gone.append(power)
+        return gone
+
+    def draw(self, surface, shake_x=0, shake_y=0, alpha=1.0):
         # Bobbing animation
         bob = math.sin(self.bob_offset) * 5
-        draw_y = self.y + bob + shake_y
-        draw_x = self.x + shake_x
-
-        info = self.TYPES[self.type]
-        # Outer glow
-        pygame.draw.circle(surface, info['color'], (int(draw_x), int(draw_y)), self.size + 5, 2)
-        # Inner circle
-        pygame.draw.circle(surface, info['color'], (int(draw_x), int(draw_y)), self.size)
-        # Symbol
-        text = SMALL_FONT.render(info['symbol'], True, BLACK)
-        text_rect = text.get_rect(center=(draw_x, draw_y))
-        surface.blit(text, text_rect)
+        draw_y = lerp(self.prev_y, self.y, alpha) + bob + shake_y
+        draw_x = lerp(self.prev_x, self.x, alpha) + shake_x
 
-    def get_rect(self):
-        return pygame.Rect(self.x - self.size, self.y - self.size, self.size * 2, self.size * 2)
+        # Pre-baked icon, one blit
+        icon = get_powerup_icon(self.type, self.size)
+        half = icon.get_width() // 2
+        surface.blit(icon, (int(draw_x) - half, int(draw_y) - half))
 
-    def is_off_screen(self):
-        return self.y > SCREEN_HEIGHT + self.size
+    def get_rect(self):
+        size = self.size
+        self.rect.update(self.x - size, self.y - size, size * 2, size * 2)
+        return self.rect
+
+def draw_powerup_icon(surface, power_type, x, y, size):
+    """Draw a power-up icon from primitives (used to bake the cached icons)."""
+    info = PowerUp.TYPES[power_type]
+    # Outer glow
+    pygame.draw.circle(surface, info['color'], (x, y), size + 5, 2)
+    # Inner circle
+    pygame.draw.circle(surface, info['color'], (x, y), size)
+    # Symbol
+    text = SMALL_FONT.render(info['symbol'], True, BLACK)
+    surface.blit(text, text.get_rect(center=(x, y)))
+
+# Baked power-up icons, one per (type, size)
+powerup_icons = {}
+
+def get_powerup_icon(power_type, size):
+    """Get the pre-rendered icon for a power-up type, baking it on first use."""
+    key = (power_type, size)
+    icon = powerup_icons.get(key)
+    if icon is None:
+        half = size + 5  # Outer glow radius
+        # Colorkey instead of per-pixel alpha: the circles have hard edges and
+        # colorkey blits are much cheaper than alpha blending
+        icon = pygame.Surface((half * 2 + 1, half * 2 + 1)).convert()
+        icon.fill(COLORKEY)
+        draw_powerup_icon(icon, power_type, half, half, size)
+        icon.set_colorkey(COLORKEY, pygame.RLEACCEL)
+        powerup_icons[key] = icon
+    return icon
 
 # Screen shake variables
 screen_shake = 0
 shake_intensity = 0
 
-def apply_screen_shake():
+def update_screen_shake():
+    """Wind the shake down by one simulation tick."""
     global screen_shake, shake_intensity
     if screen_shake > 0:
         screen_shake -= 1
         shake_intensity *= 0.9
-        return random.randint(-int(shake_intensity), int(shake_intensity)), random.randint(-int(shake_intensity), int(shake_intensity))
+
+def apply_screen_shake():
+    if screen_shake > 0:
+        return effect_random.randint(-int(shake_intensity), int(shake_intensity)), effect_random.randint(-int(shake_intensity), int(shake_intensity))
     return 0, 0
 
 def trigger_screen_shake(intensity=10, duration=10):
@@ -613,38 +1807,146 @@ def trigger_screen_shake(intensity=10, duration=10):
     shake_intensity = intensity
 
 # Background animation
-bg_particles = []
-def update_background():
-    global bg_particles
+BG_PARTICLE_COLOR = (200, 200, 255)
+background_particles = ParticleSystem(256, gravity=0, shrink=None, name="background particles")  # Float up at a steady size
+def update_background(ticks=1):
+    """Move the background particles. ticks = frame length in 60 FPS frames."""
     # Add new background particles occasionally
-    if random.random() < 0.1:
-        bg_particles.append({
-            'x': random.randint(0, SCREEN_WIDTH),
-            'y': SCREEN_HEIGHT + 10,
-            'speed': random.uniform(0.5, 2),
-            'size': random.randint(2, 5),
-            'alpha': random.randint(50, 150)
-        })
-
-    # Update particles
-    for p in bg_particles[:]:
-        p['y'] -= p['speed']
-        if p['y'] < -10:
-            bg_particles.remove(p)
-
-def draw_background(surface, game_active=False):
-    # Gradient background
-    for y in range(0, SCREEN_HEIGHT, 4):
-        ratio = y / SCREEN_HEIGHT
-        if game_active:
-            color = (int(240 - 40 * ratio), int(248 - 40 * ratio), 255)
-        else:
-            color = (int(250 - 20 * ratio), int(250 - 20 * ratio), 255)
-        pygame.draw.rect(surface, color, (0, y, SCREEN_WIDTH, 4))
+    if effect_random.random() < 0.1 * ticks:
+        speed = effect_random.uniform(0.5, 2)
+        background_particles.emit(effect_random.randint(0, SCREEN_WIDTH), SCREEN_HEIGHT + 10, BG_PARTICLE_COLOR,
+                                  velocity=(0, -speed), lifetime=(SCREEN_HEIGHT + 20) / speed,
+                                  size=effect_random.randint(2, 5))
+    background_particles.update(ticks)
+
+# Gradient colors for each background style (ratio goes 0 at top -> 1 at bottom)
+GRADIENT_STYLES = {
+    "menu": lambda ratio: (int(250 - 20 * ratio), int(250 - 20 * ratio), 255),
+    "game": lambda ratio: (int(240 - 40 * ratio), int(248 - 40 * ratio), 255),
+    "boss": lambda ratio: (int(80 + 40 * ratio), int(20 + 20 * ratio), int(40 + 30 * ratio)),
+    "victory": lambda ratio: (int(255 - 50 * ratio), int(215 - 50 * ratio), int(0 + 50 * ratio)),
+}
+
+# Pre-rendered gradients, rebuilt whenever the window size changes
+background_cache = {}
+background_cache_size = None
+
+def render_gradient(surface, style):
+    """Paint a gradient style onto a surface in 4px bands (slow, used to build the cache)."""
+    width, height = surface.get_size()
+    color_at = GRADIENT_STYLES[style]
+    for y in range(0, height, 4):
+        pygame.draw.rect(surface, color_at(y / height), (0, y, width, 4))
+
+def get_background(style):
+    """Get the cached gradient Surface for a style, rendering it on first use."""
+    global background_cache_size
+    size = pygame.display.get_surface().get_size()
+    if size != background_cache_size:
+        # Window was resized - throw away gradients rendered for the old size
+        background_cache.clear()
+        background_cache_size = size
+
+    if style not in background_cache:
+        gradient = pygame.Surface(size).convert()
+        render_gradient(gradient, style)
+        background_cache[style] = gradient
+    return background_cache[style]
+
+def draw_background(surface, game_active=False, style=None):
+    # Gradient background (one blit of the pre-rendered gradient)
+    if style is None:
+        style = "game" if game_active else "menu"
+    surface.blit(get_background(style), (0, 0))
 
     # Draw floating particles
-    for p in bg_particles:
-        pygame.draw.circle(surface, (200, 200, 255), (int(p['x']), int(p['y'])), p['size'])
+    background_particles.draw(surface)
+
+# Count of frames pushed to the window (lets the dirty-rect renderer notice other screens drawing)
+frames_presented = 0
+
+def flip_display(rects=None):
+    """Push the frame to the window: the whole screen, or only the given rects."""
+    global frames_presented
+    frames_presented += 1
+    if rects is None:
+        pygame.display.flip()
+    else:
+        pygame.display.update(rects)
+
+
+class DirtyRenderer:
+    """Dirty-rectangle renderer for menus and other mostly static screens.
+
+    The screen's static content (gradient, text, boxes) is only redrawn when its
+    state changes. In between, only the floating background particles and any
+    animated sprites are redrawn, and only their rectangles are pushed to the
+    window with pygame.display.update(rects).
+
+    Usage in a screen loop:
+
+        if renderer.begin(state):   # state = tuple of everything the static content shows
+            ... draw static content onto screen ...
+        renderer.present(sprites)   # sprites = [(surface, pos), ...] that move every frame
+    """
+    def __init__(self, style="menu"):
+        self.style = style
+        self.state = None
+        self.redraw = True
+        self.scenery = None     # Snapshot of gradient + static content
+        self.foreground = None  # Static content only, gradient keyed out
+        self.old_rects = []
+        self.last_frame = -1
+        self.size = None
+
+    def invalidate(self):
+        """Force a full redraw on the next frame."""
+        self.state = None
+
+    def begin(self, state):
+        """Start a frame. Returns True if the static content has to be drawn again."""
+        size = screen.get_size()
+        if state != self.state or self.last_frame != frames_presented or size != self.size:
+            # State changed, window resized, or another screen drew over us
+            self.state = state
+            self.size = size
+            self.redraw = True
+            screen.blit(get_background(self.style), (0, 0))
+        return self.redraw
+
+    def capture(self):
+        """Snapshot the freshly drawn static content."""
+        self.scenery = screen.copy()
+        # Everything that still matches the plain gradient is background; key it out
+        # so particles can be drawn behind the text and boxes
+        same = pygame.mask.from_threshold(self.scenery, (0, 0, 0, 255), (1, 1, 1, 255),
+                                          get_background(self.style))
+        self.foreground = self.scenery.copy()
+        same.to_surface(self.foreground, setcolor=COLORKEY, unsetcolor=None)  # COLORKEY: no static content here
+        self.foreground.set_colorkey(COLORKEY)
+
+    def present(self, sprites=()):
+        """Draw the moving parts and push the changed regions to the window."""
+        if self.redraw:
+            self.capture()
+        else:
+            # Erase last frame's particles and sprites
+            for rect in self.old_rects:
+                screen.blit(self.scenery, rect, rect)
+
+        new_rects = background_particles.draw(screen, rects=True)
+        # Keep the particles behind static content
+        screen.blits([(self.foreground, rect, rect) for rect in new_rects], False)
+        for image, pos in sprites:
+            new_rects.append(screen.blit(image, pos))
+
+        if self.redraw:
+            flip_display()
+        else:
+            flip_display(self.old_rects + new_rects)
+        self.old_rects = new_rects
+        self.redraw = False
+        self.last_frame = frames_presented
 
 # Level unlock requirements: score needed in previous level to unlock next
 # Easy is always unlocked, others require score in previous level
@@ -682,77 +1984,324 @@ def is_level_unlocked(level_name):
     required_score = level_unlock_requirements[level_name]
     return best_scores[prev_level] >= required_score
 
-# Flag to track if cloud sync is pending
-cloud_sync_pending = False
+# Users whose records changed here since they were last uploaded
+dirty_users = set()
+cloud_sync_running = False  # One sync at a time
+cloud_tasks = set()  # Background cloud jobs, referenced until they finish
+
+def start_cloud_task(coro):
+    """Run a cloud job in the background; cancel() the returned task to abandon it."""
+    task = asyncio.create_task(coro)
+    cloud_tasks.add(task)
+    task.add_done_callback(cloud_tasks.discard)
+    return task
+
+# Local saves are written behind: save_progress() only updates the record in
+# memory and marks it, and one write goes out once a burst of saves settles
+SAVE_DELAY = 1.0  # Seconds without another save before writing
+SAVE_MAX_DELAY = 5.0  # ...but nothing waits longer than this
+SAVE_SLICE = 0.002  # Browser: seconds of encoding per frame
+
+def encode_leaderboard(snapshot):
+    """json.dumps(snapshot), built one record at a time.
+
+    Same text as json.dumps, but a thread doing this lets go of the GIL
+    between records instead of holding it for the whole document.
+    """
+    return "{" + ", ".join(f"{json.dumps(username)}: {json.dumps(record)}" for username, record in snapshot.items()) + "}"
+
+async def encode_leaderboard_sliced(snapshot):
+    """encode_leaderboard() a few milliseconds per frame, for browsers (no threads there)."""
+    parts = []
+    deadline = time.perf_counter() + SAVE_SLICE
+    for username, record in snapshot.items():
+        parts.append(f"{json.dumps(username)}: {json.dumps(record)}")
+        if time.perf_counter() > deadline:
+            await asyncio.sleep(0)
+            deadline = time.perf_counter() + SAVE_SLICE
+    return "{" + ", ".join(parts) + "}"
+
+def encode_shards(records, index):
+    """Storage key -> JSON text for the given records and the index."""
+    shards = {user_key(username): json.dumps(record) for username, record in records.items()}
+    shards[INDEX_KEY] = encode_leaderboard(index)
+    return shards
+
+async def encode_shards_sliced(records, index):
+    """encode_shards() a few milliseconds per frame, for browsers."""
+    shards = {}
+    deadline = time.perf_counter() + SAVE_SLICE
+    for username, record in records.items():
+        shards[user_key(username)] = json.dumps(record)
+        if time.perf_counter() > deadline:
+            await asyncio.sleep(0)
+            deadline = time.perf_counter() + SAVE_SLICE
+    shards[INDEX_KEY] = await encode_leaderboard_sliced(index)
+    return shards
+
+# Browser: records staged with SaveQueue.stage() are written by the page itself
+# when the tab is hidden or closed, since the frame loop (and the queue) may
+# never run again after that
+PAGE_SAVES_SCRIPT = """
+window.dodgeSaves = window.dodgeSaves || (function() {
+    var saves = {records: {}, index: {}, lastUser: null};
+    function flush() {
+        var keys = Object.keys(saves.records);
+        if (!keys.length) return;
+        keys.forEach(function(key) { localStorage.setItem(key, saves.records[key]); });
+        var index = JSON.parse(localStorage.getItem(%(index)s) || "{}");
+        Object.assign(index, saves.index);
+        localStorage.setItem(%(index)s, JSON.stringify(index));
+        if (saves.lastUser !== null) localStorage.setItem("dodge_lastuser", saves.lastUser);
+        saves = {records: {}, index: {}, lastUser: null};
+    }
+    window.addEventListener("pagehide", flush);
+    document.addEventListener("visibilitychange", function() {
+        if (document.visibilityState === "hidden") flush();
+    });
+    return {
+        stage: function(key, username, record, entry) {
+            saves.records[key] = JSON.stringify(record);
+            saves.index[username] = entry;
+            saves.lastUser = username;
+        },
+        clear: function() { saves = {records: {}, index: {}, lastUser: null}; }
+    };
+})();
+""" % {"index": json.dumps(INDEX_KEY)}
+
+class SaveQueue:
+    """Write-behind persistence for changed records in leaderboard_data.
+
+    mark(username) notes that a player's record changed (and starts the
+    writer task). The writer waits for the burst of saves to settle, takes
+    a snapshot of the changed records (records are replaced, never changed
+    in place, so a shallow copy is enough) and has local_storage write
+    them as one batch on a worker thread, or encoded in slices between
+    frames in the browser. flush() writes right away, for quitting.
+    Snapshots are numbered so an older one never overwrites a record a
+    newer one wrote. Browsers never quit through flush(), so the records
+    that matter are also stage()d in the page, which writes them if the
+    tab is hidden or closed first.
+    """
+    __slots__ = ("dirty_since", "last_mark", "marks", "users", "task", "taken", "stored", "writes", "lock",
+                 "page_ready")
+
+    def __init__(self):
+        self.dirty_since = None  # When the oldest unwritten save happened
+        self.last_mark = 0.0
+        self.marks = 0  # Saves since the last snapshot
+        self.users = set()  # Players whose records changed since the last snapshot
+        self.task = None
+        self.taken = 0  # Number of the last snapshot taken
+        self.stored = {}  # Username (None: the last user) -> number of the snapshot last written for it
+        self.writes = 0
+        self.lock = threading.Lock()
+        self.page_ready = False  # PAGE_SAVES_SCRIPT installed
+
+    def mark(self, username=None):
+        now = time.perf_counter()
+        if self.dirty_since is None:
+            self.dirty_since = now
+        self.last_mark = now
+        self.marks += 1
+        if username:
+            self.users.add(username)
+        if self.task is None or self.task.done():
+            try:
+                self.task = asyncio.get_running_loop().create_task(self.run())
+            except RuntimeError:
+                self.flush()  # No event loop running (scripts, tools): write now
+
+    def take(self):
+        """Snapshot what is to be written and start a new burst."""
+        self.taken += 1
+        records = {username: leaderboard_data[username] for username in self.users if username in leaderboard_data}
+        snapshot = (self.taken, records, current_username, self.marks)
+        self.users = set()
+        self.dirty_since = None
+        self.marks = 0
+        return snapshot
+
+    async def run(self):
+        while self.dirty_since is not None:
+            due = min(self.last_mark + SAVE_DELAY, self.dirty_since + SAVE_MAX_DELAY)
+            wait = due - time.perf_counter()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            number, records, username, marks = self.take()
+            if is_browser():
+                records, last_user = self.fresh(number, records, username)
+                await local_storage.write_sliced(records, last_user)
+                self.wrote(username, records, marks)
+                if self.dirty_since is None and self.page_ready:
+                    import platform
+                    platform.window.eval("window.dodgeSaves.clear()")  # All written, nothing newer staged
+            else:
+                await asyncio.to_thread(self.write, number, records, username, marks)
+
+    def stage(self, username):
+        """Browser: have the page write username's record if the tab is hidden or closed before the queue does."""
+        import platform
+        if not self.page_ready:
+            platform.window.eval(PAGE_SAVES_SCRIPT)
+            self.page_ready = True
+        record = leaderboard_data[username]
+        platform.window.eval(f"window.dodgeSaves.stage({json.dumps(user_key(username))}, {json.dumps(username)}, "
+                             f"{json.dumps(record)}, {json.dumps(index_entry(record))})")
+
+    def fresh(self, number, records, username):
+        """What of snapshot `number` no newer snapshot has written: (records, last user or None)."""
+        records = {name: record for name, record in records.items() if self.stored.get(name, 0) < number}
+        self.stored.update(dict.fromkeys(records, number))
+        if self.stored.get(None, 0) > number:
+            return records, None
+        self.stored[None] = number
+        return records, username
+
+    def write(self, number, records, username, marks):
+        with self.lock:
+            records, last_user = self.fresh(number, records, username)
+            local_storage.write(records, last_user)
+        self.wrote(username, records, marks)
+
+    def wrote(self, username, records, marks):
+        self.writes += 1
+        print(f"Saved locally: {username}, {len(records)} records ({marks} saves in one write)")
+
+    def flush(self):
+        """Write anything not yet written, now."""
+        if self.dirty_since is not None:
+            self.write(*self.take())
+
+local_saves = SaveQueue()
+atexit.register(local_saves.flush)  # Backstop for exits that skip quit_game()
+
+def quit_game():
+    """Write any save still queued, then close the window and exit."""
+    local_saves.flush()
+    pygame.quit()
+    sys.exit()
 
 def save_progress():
-    """Save current user's progress to leaderboard (local + queue cloud sync)."""
-    global high_score, leaderboard_data, cloud_sync_pending
+    """Save current user's progress to leaderboard (local + queue cloud sync).
+
+    Cheap enough for any frame: the record is updated in memory and the
+    write to storage is queued on local_saves.
+    """
+    global high_score
 
     if not current_username:
         return  # Don't save if no username
 
-    # Update leaderboard data for current user
+    # Update leaderboard data for current user; the version tells syncs which copy is newer
+    previous = load_user_record(current_username) or {}
     leaderboard_data[current_username] = {
+        "version": previous.get("version", 0) + 1,
+        "updated": int(time.time()),
         "points": points,
         "high_score": high_score,
         "purchased_items": {item: data["purchased"] for item, data in shop_items.items()},
         "best_scores": best_scores.copy(),
         "current_level": current_level,
         "upgrades": player_upgrades.copy(),
+        "high_score_run": high_score_run,
     }
 
-    # Save to local storage
-    json_data = json.dumps(leaderboard_data)
-    storage_set("dodge_leaderboard", json_data)
-    storage_set("dodge_lastuser", current_username)
-    print(f"Saved locally: {current_username} with {points} points")
-
-    # Mark cloud sync as pending
-    cloud_sync_pending = True
+    # Save to local storage, once this burst of saves is over (or when the tab is closed)
+    local_saves.mark(current_username)
+    if is_browser():
+        local_saves.stage(current_username)
+
+    # Queue the record for the next cloud sync
+    dirty_users.add(current_username)
+
+def is_newer_record(record, local):
+    """Whether record beats local (version, points): by version when both have one,
+    by points when either side is from before versions."""
+    version, record_points = record.get("version", 0), record.get("points", 0)
+    if version and local[0]:
+        return (version, record_points) > local
+    return record_points > local[1]
+
+def merge_cloud_records(cloud_data):
+    """Take in every cloud record newer than ours (see is_newer_record()).
+    The signed-in player's own record is never replaced. Returns how many were taken.
+    """
+    taken = 0
+    stored = local_storage.versions() if cloud_data else {}
+    for username, record in cloud_data.items():
+        local = leaderboard_data.get(username)
+        local = stored.get(username) if local is None else (local.get("version", 0), local.get("points", 0))
+        if local is None or (username != current_username and is_newer_record(record, local)):
+            leaderboard_data[username] = record
+            local_saves.mark(username)  # Stored with the next local save
+            taken += 1
+    return taken
 
 async def sync_to_cloud():
-    """Sync leaderboard to cloud if pending."""
-    global cloud_sync_pending
-    if cloud_sync_pending and CLOUD_ENABLED:
-        try:
-            # First load latest from cloud to merge
+    """Send the records changed here and take in the ones changed elsewhere.
+
+    The download is skipped when the cloud document has not changed since
+    the last sync (ETag), and only dirty users' records are uploaded.
+    """
+    global cloud_sync_running
+    if not dirty_users or not CLOUD_ENABLED or cloud_sync_running:
+        return
+    cloud_sync_running = True
+    sending = {}
+    try:
+        for attempt in range(3):  # Retried when someone else saved in between
             cloud_data = await cloud_load()
-            if cloud_data:
-                # Merge: keep higher scores for each user
-                for username, data in cloud_data.items():
-                    if username not in leaderboard_data:
-                        leaderboard_data[username] = data
-                    elif data.get("points", 0) > leaderboard_data[username].get("points", 0):
-                        # Cloud has higher score, but keep local user's current session
-                        if username != current_username:
-                            leaderboard_data[username] = data
-
-            # Now save merged data to cloud
-            await cloud_save(leaderboard_data)
-            cloud_sync_pending = False
-            print("Cloud sync complete!")
-        except Exception as e:
-            print(f"Cloud sync error: {e}")
+            if cloud_data is None:
+                return
+            merge_cloud_records(cloud_data)
+
+            sending = {username: leaderboard_data[username] for username in dirty_users if username in leaderboard_data}
+            dirty_users.clear()  # Progress saved while this is in flight makes them dirty again
+            result = await cloud_save(sending)
+            if result == "saved":
+                print(f"Cloud sync complete! ({len(sending)} of {local_storage.count()} records sent)")
+                sending = {}
+                return
+            dirty_users.update(sending)
+            sending = {}
+            if result == "failed":
+                return
+    except Exception as e:
+        print(f"Cloud sync error: {e}")
+    finally:
+        dirty_users.update(sending)  # Not uploaded (failed or cancelled): try again next time
+        cloud_sync_running = False
 
 def load_leaderboard():
-    """Load all users' data from local storage."""
-    global leaderboard_data
+    """Open local storage (records are read per player, when needed)."""
+    global local_storage
     try:
-        data = storage_get("dodge_leaderboard")
-        if data:
-            leaderboard_data = json.loads(data)
-            print(f"Loaded {len(leaderboard_data)} users from local")
-        else:
-            leaderboard_data = {}
-            print("No saved data, starting fresh")
+        count = local_storage.load()
     except Exception as e:
         print(f"Load failed: {e}")
-        leaderboard_data = {}
+        if not isinstance(local_storage, SQLiteStorage):
+            return
+        local_storage = FileStorage()  # Database unusable (read-only folder, damaged file): files it is
+        count = local_storage.load()
+    if count:
+        print(f"Loaded {count} users from local")
+    else:
+        print("No saved data, starting fresh")
+
+def load_user_record(username):
+    """A player's full record, from memory or local_storage. None if there is none."""
+    record = leaderboard_data.get(username)
+    if record is None:
+        record = local_storage.record(username)
+        if record is not None:
+            leaderboard_data[username] = record
+    return record
 
 async def load_leaderboard_from_cloud():
     """Load and merge leaderboard from cloud."""
-    global leaderboard_data
     if not CLOUD_ENABLED:
         return
 
@@ -760,28 +2309,22 @@ async def load_leaderboard_from_cloud():
         print("Fetching leaderboard from cloud...")
         cloud_data = await cloud_load()
         if cloud_data:
-            # Merge cloud data with local data
-            for username, data in cloud_data.items():
-                if username not in leaderboard_data:
-                    leaderboard_data[username] = data
-                elif username != current_username:
-                    # For other users, take the higher score
-                    if data.get("points", 0) > leaderboard_data[username].get("points", 0):
-                        leaderboard_data[username] = data
-            print(f"Merged cloud data: now {len(leaderboard_data)} users")
+            taken = merge_cloud_records(cloud_data)
+            print(f"Merged cloud data: {taken} newer records, now {local_storage.count()} users")
     except Exception as e:
         print(f"Cloud load failed: {e}")
 
 def load_user_progress(username):
-    """Load a specific user's progress from leaderboard data."""
-    global points, high_score, best_scores, current_username, player_upgrades
+    """Load a specific user's progress (reading only their record)."""
+    global points, high_score, high_score_run, best_scores, current_username, player_upgrades
 
     current_username = username
 
-    if username in leaderboard_data:
-        user_data = leaderboard_data[username]
+    user_data = load_user_record(username)
+    if user_data is not None:
         points = user_data.get("points", 0)
         high_score = user_data.get("high_score", 0)
+        high_score_run = user_data.get("high_score_run")
 
         # Load purchased items
         purchased = user_data.get("purchased_items", {})
@@ -801,6 +2344,7 @@ def load_user_progress(username):
         # New user - reset to defaults
         points = 0
         high_score = 0
+        high_score_run = None
         for item in shop_items:
             shop_items[item]["purchased"] = (item == "EMDR Tejeck")  # EMDR is free/default
         for level in best_scores:
@@ -809,24 +2353,79 @@ def load_user_progress(username):
         for upgrade_key in player_upgrades:
             player_upgrades[upgrade_key] = 0
 
-def get_sorted_leaderboard():
-    """Get leaderboard sorted by total points (descending)."""
-    sorted_users = sorted(
-        leaderboard_data.items(),
-        key=lambda x: x[1].get("points", 0),
-        reverse=True
-    )
-    return sorted_users
+def get_sorted_leaderboard(offset=0, count=None):
+    """Get `count` leaderboard entries from `offset`, by total points (descending)."""
+    return local_storage.top(offset, count)
+
+# Text render cache - labels are rendered once instead of every frame
+TEXT_CACHE_SIZE = 256  # Max rendered strings kept
+
+# Splits "Ammo: 10/30" into ["Ammo: ", "1", "0", "/", "3", "0"]
+COUNTER_PARTS = re.compile(r"\d|\D+")
+
+class TextCache:
+    """LRU cache of rendered text Surfaces keyed by (font, text, color)."""
+    def __init__(self, max_entries=TEXT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.renders = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, text, font, color, compose=False):
+        """Get rendered text. With compose=True a miss is built from cached digit glyphs."""
+        key = (font, text, color)
+        render = self.renders.get(key)
+        if render is not None:
+            self.hits += 1
+            self.renders.move_to_end(key)
+            return render
+
+        self.misses += 1
+        if compose:
+            render = self.compose(text, font, color)
+        else:
+            render = font.render(text, True, color)
+        self.renders[key] = render
+        if len(self.renders) > self.max_entries:
+            self.renders.popitem(last=False)
+        return render
+
+    def compose(self, text, font, color):
+        """Stitch text together from cached label and digit glyphs (no font rendering)."""
+        parts = [self.render(part, font, color) for part in COUNTER_PARTS.findall(text)]
+        width = sum(part.get_width() for part in parts)
+        render = pygame.Surface((max(1, width), font.get_height()), pygame.SRCALPHA)
+        x = 0
+        for part in parts:
+            # MAX blend copies the glyph pixels exactly (glyphs never overlap)
+            render.blit(part, (x, 0), special_flags=pygame.BLEND_RGBA_MAX)
+            x += part.get_width()
+        return render
+
+text_cache = TextCache()
+
+def render_text(text, font, color):
+    """Render text through the shared cache."""
+    return text_cache.render(text, font, color)
 
 def draw_text(text, font, color, x, y):
-    render = font.render(text, True, color)
-    screen.blit(render, (x, y))
+    screen.blit(render_text(text, font, color), (x, y))
 
 def draw_text_centered(text, font, color, y):
-    render = font.render(text, True, color)
+    render = render_text(text, font, color)
     x = (SCREEN_WIDTH - render.get_width()) // 2
     screen.blit(render, (x, y))
 
+def draw_counter(text, font, color, x, y, surface=None):
+    """Draw text with changing numbers (HUD counters).
+
+    A new value is stitched together from cached label and digit glyphs,
+    so a changing score never triggers a full font render.
+    """
+    if surface is None:
+        surface = screen
+    surface.blit(text_cache.render(text, font, color, compose=True), (x, y))
+
 # Touch control button definitions
 TOUCH_BUTTON_SIZE = 60
 TOUCH_BUTTONS = {
@@ -835,8 +2434,8 @@ TOUCH_BUTTONS = {
     "pause": pygame.Rect(SCREEN_WIDTH - 50, 10, 40, 40),
 }
 
-def draw_touch_controls(surface):
-    """Draw touch control buttons for mobile play (auto-shoot enabled)."""
+def draw_move_buttons(surface):
+    """Draw the left/right touch buttons for mobile play (auto-shoot enabled)."""
     # Left button
     pygame.draw.rect(surface, (100, 100, 100), TOUCH_BUTTONS["left"], border_radius=10)
     pygame.draw.polygon(surface, WHITE, [
@@ -853,13 +2452,123 @@ def draw_touch_controls(surface):
         (TOUCH_BUTTONS["right"].x + 45, TOUCH_BUTTONS["right"].y + 30),
     ])
 
-    # Pause button
+def draw_pause_button(surface):
+    """Draw the touch pause button."""
     pygame.draw.rect(surface, (80, 80, 80), TOUCH_BUTTONS["pause"], border_radius=8)
     pause_x = TOUCH_BUTTONS["pause"].x + 12
     pause_y = TOUCH_BUTTONS["pause"].y + 10
     pygame.draw.rect(surface, WHITE, (pause_x, pause_y, 6, 20))
     pygame.draw.rect(surface, WHITE, (pause_x + 10, pause_y, 6, 20))
 
+# HUD layer - widgets are drawn onto one overlay and only redrawn when their values change
+class HudLayer:
+    """Overlay holding the HUD widgets.
+
+    Each widget has a fixed rect, a tuple of backing values and a draw function.
+    A widget is only redrawn when its values change; its pixels are then kept
+    in a small colorkeyed sprite, and all sprites are composited onto the
+    screen with a single blits() call per frame.
+    """
+    def __init__(self):
+        # Scratch surface the draw functions paint on, in screen coordinates
+        self.canvas = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+        self.canvas.fill(COLORKEY)
+        self.widgets = {}  # name -> (rect, values, sprite)
+        self.redraws = 0
+
+    def widget(self, name, rect, values, draw):
+        """Show a widget, calling draw(surface, *values) only if its values changed.
+
+        rect is the area the widget owns; anything drawn outside it is not shown.
+        """
+        old = self.widgets.get(name)
+        if old is not None and old[1] == values:
+            return
+        rect = pygame.Rect(rect)
+        self.canvas.fill(COLORKEY, rect)
+        draw(self.canvas, *values)
+
+        sprite = pygame.Surface(rect.size).convert()
+        sprite.blit(self.canvas, (0, 0), rect)
+        sprite.set_colorkey(COLORKEY, pygame.RLEACCEL)
+        self.widgets[name] = (rect, values, sprite)
+        self.redraws += 1
+
+    def hide(self, name):
+        """Remove a widget from the layer."""
+        self.widgets.pop(name, None)
+
+    def draw(self, surface):
+        surface.blits([(sprite, rect) for rect, _, sprite in self.widgets.values()], False)
+
+def draw_score_panel(surface, game_points, total, combo, laser_ammo, max_ammo):
+    """Score panel in the top left of the endless game."""
+    pygame.draw.rect(surface, (0, 0, 0, 100), (5, 5, 200, 115), border_radius=10)
+    pygame.draw.rect(surface, WHITE, (5, 5, 200, 115), 2, border_radius=10)
+    draw_counter(f"Score: {game_points}", FONT, WHITE, 15, 15, surface)
+    draw_counter(f"Total: {total}", SMALL_FONT, (200, 200, 200), 15, 45, surface)
+    if combo > 0:
+        draw_counter(f"Combo: x{combo + 1}", SMALL_FONT, YELLOW, 15, 70, surface)
+
+    # Ammo display
+    ammo_color = RED if laser_ammo <= 3 else (WHITE if laser_ammo < 10 else GREEN)
+    draw_counter(f"Ammo: {laser_ammo}/{max_ammo}", SMALL_FONT, ammo_color, 15, 95, surface)
+
+def draw_boss_panel(surface, game_points, laser_ammo, max_ammo, rapid_fire):
+    """Score panel in the bottom left of the boss fight."""
+    pygame.draw.rect(surface, (30, 30, 30), (5, SCREEN_HEIGHT - 80, 200, 75), border_radius=10)
+    draw_counter(f"Score: {game_points}", FONT, WHITE, 15, SCREEN_HEIGHT - 75, surface)
+    ammo_color = RED if laser_ammo <= 5 else GREEN
+    draw_counter(f"Ammo: {laser_ammo}/{max_ammo}", SMALL_FONT, ammo_color, 15, SCREEN_HEIGHT - 45, surface)
+    if rapid_fire:
+        surface.blit(render_text("Rapid!", SMALL_FONT, (255, 100, 100)), (120, SCREEN_HEIGHT - 75))
+
+def draw_lives_box(surface, box, icon_y, radius, shields, max_shields):
+    """Shield/lives box with one filled or empty icon per shield."""
+    border_radius = 10 if radius > 10 else 8
+    pygame.draw.rect(surface, (30, 30, 50), box, border_radius=border_radius)
+    pygame.draw.rect(surface, CYAN if shields > 0 else RED, box, 2, border_radius=border_radius)
+
+    for i in range(max_shields):
+        icon_x = box[0] + 20 + i * 32
+        if i < shields:
+            # Filled heart/shield icon
+            pygame.draw.circle(surface, CYAN, (icon_x, icon_y), radius)
+            pygame.draw.circle(surface, WHITE, (icon_x, icon_y), radius - 4)
+        else:
+            # Empty heart/shield icon
+            pygame.draw.circle(surface, (80, 80, 80), (icon_x, icon_y), radius, 2)
+
+def draw_destroyed_counter(surface, enemies_destroyed):
+    """Destroyed counter in the bottom right."""
+    # Not antialiased: it sits over the game rather than a panel, and the
+    # HUD layer has no per-pixel alpha to blend the text edges with
+    text = SMALL_FONT.render(f"Destroyed: {enemies_destroyed}", False, ORANGE)
+    surface.blit(text, (SCREEN_WIDTH - 150, SCREEN_HEIGHT - 30))
+
+# Active power-up pills: (label, color, text color)
+POWERUP_PILLS = [
+    ("Speed", GREEN, BLACK),
+    ("Slow", PURPLE, WHITE),
+    ("Magnet", ORANGE, BLACK),
+    ("Rapid", (255, 100, 100), WHITE),
+    ("Double", (100, 100, 255), WHITE),
+]
+
+def draw_powerup_pills(surface, *seconds_left):
+    """Stack of timers for active power-ups (0 = not active), one per POWERUP_PILLS entry."""
+    status_x = SCREEN_WIDTH - 120
+    status_y = 60  # Below the pause button
+    for (label, color, text_color), seconds in zip(POWERUP_PILLS, seconds_left):
+        if seconds > 0:
+            pygame.draw.rect(surface, color, (status_x, status_y, 110, 25), border_radius=5)
+            draw_counter(f"{label}: {seconds}s", SMALL_FONT, text_color, status_x + 5, status_y + 3, surface)
+            status_y += 30
+
+def seconds_left(ticks):
+    """Whole seconds shown for a power-up timer (0 when it's not active)."""
+    return ticks // SIM_HZ + 1 if ticks > 0 else 0
+
 def get_touch_input():
     """Get current touch/mouse button states (auto-shoot enabled)."""
     touch_state = {"left": False, "right": False, "pause": False}
@@ -874,78 +2583,103 @@ def get_touch_input():
 
     return touch_state
 
-async def username_entry_screen():
-    """Screen for entering username at game start."""
+async def username_entry_screen(cloud_task=None):
+    """Screen for entering username at game start.
+
+    cloud_task is the cloud leaderboard load started by main(); logging in
+    waits for it (without freezing the screen) so progress saved on another
+    device is picked up.
+    """
     global current_username
 
     username = ""
     max_length = 15
-    cursor_blink = 0
     error_message = ""
+    logging_in = False  # ENTER pressed, waiting for the cloud load
 
     # Check if there's a saved last user
     try:
-        last_user = storage_get("dodge_lastuser")
-        if last_user and last_user.strip() in leaderboard_data:
+        last_user = local_storage.last_user()
+        if last_user and local_storage.entry(last_user.strip()) is not None:
             username = last_user.strip()
     except:
         pass
 
-    while True:
-        cursor_blink += 1
-        update_background()
-        draw_background(screen, False)
-
-        # Title
-        draw_text_centered("DODGE THE TEJECKS", BIG_FONT, BLACK, 50)
-        draw_text_centered("Enter Your Name", FONT, BLUE, 120)
-
-        # Username input box
-        box_width = 300
-        box_height = 50
-        box_x = (SCREEN_WIDTH - box_width) // 2
-        box_y = 180
-
-        pygame.draw.rect(screen, WHITE, (box_x, box_y, box_width, box_height), border_radius=10)
-        pygame.draw.rect(screen, BLUE, (box_x, box_y, box_width, box_height), 3, border_radius=10)
-
-        # Display username with blinking cursor
-        cursor = "|" if (cursor_blink // 30) % 2 == 0 else ""
-        display_text = username + cursor
-        text_surface = FONT.render(display_text, True, BLACK)
-        text_x = box_x + 15
-        text_y = box_y + (box_height - text_surface.get_height()) // 2
-        screen.blit(text_surface, (text_x, text_y))
+    # Username input box
+    box_width = 300
+    box_height = 50
+    box_x = (SCREEN_WIDTH - box_width) // 2
+    box_y = 180
 
-        # Instructions
-        draw_text_centered("Type your name and press ENTER", SMALL_FONT, BLACK, 260)
-        draw_text_centered("Your progress will be saved automatically!", SMALL_FONT, GREEN, 290)
+    # Only the particles move; everything else is redrawn when it changes
+    renderer = DirtyRenderer()
 
-        # Error message
-        if error_message:
-            draw_text_centered(error_message, FONT, RED, 330)
-
-        # Show existing players hint
-        if leaderboard_data:
-            draw_text_centered(f"({len(leaderboard_data)} players registered)", SMALL_FONT, PURPLE, 370)
-
-        # Show keyboard hint for mobile
-        draw_text_centered("Tap here to type on mobile", SMALL_FONT, (100, 100, 100), SCREEN_HEIGHT - 80)
-
-        pygame.display.flip()
-
-        for event in pygame.event.get():
+    while True:
+        update_background(frame_scheduler.ticks)
+        cursor = "|" if (pygame.time.get_ticks() // 500) % 2 == 0 else ""
+        cloud_line = cloud_status.describe()
+
+        if logging_in and cloud_task.done():
+            current_username = username.strip()
+            load_user_progress(current_username)
+            save_progress()  # Save immediately to store last user
+            play_sound(sound_powerup)
+            return
+
+        players = local_storage.count()
+        if renderer.begin((username, cursor, error_message, players, cloud_line, logging_in)):
+            # Title
+            draw_text_centered("DODGE THE TEJECKS", BIG_FONT, BLACK, 50)
+            draw_text_centered("Enter Your Name", FONT, BLUE, 120)
+
+            pygame.draw.rect(screen, WHITE, (box_x, box_y, box_width, box_height), border_radius=10)
+            pygame.draw.rect(screen, BLUE, (box_x, box_y, box_width, box_height), 3, border_radius=10)
+
+            # Display username with blinking cursor
+            display_text = username + cursor
+            text_surface = render_text(display_text, FONT, BLACK)
+            text_x = box_x + 15
+            text_y = box_y + (box_height - text_surface.get_height()) // 2
+            screen.blit(text_surface, (text_x, text_y))
+
+            # Instructions
+            draw_text_centered("Type your name and press ENTER", SMALL_FONT, BLACK, 260)
+            draw_text_centered("Your progress will be saved automatically!", SMALL_FONT, GREEN, 290)
+
+            # Error message
+            if error_message:
+                draw_text_centered(error_message, FONT, RED, 330)
+
+            # Show existing players hint
+            if players:
+                draw_text_centered(f"({players} players registered)", SMALL_FONT, PURPLE, 370)
+
+            if logging_in:
+                draw_text_centered("Loading your progress...", FONT, BLUE, 410)
+            if cloud_line:
+                draw_text_centered(cloud_line, SMALL_FONT, ORANGE, 450)
+
+            # Show keyboard hint for mobile
+            draw_text_centered("Tap here to type on mobile", SMALL_FONT, (100, 100, 100), SCREEN_HEIGHT - 80)
+
+        renderer.present()
+
+        for event in frame_scheduler.events():
             if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
+                quit_game()
             elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_RETURN:
+                if logging_in:
+                    if event.key == pygame.K_ESCAPE:
+                        quit_game()
+                elif event.key == pygame.K_RETURN:
                     if len(username.strip()) >= 2:
-                        current_username = username.strip()
-                        load_user_progress(current_username)
-                        save_progress()  # Save immediately to store last user
-                        play_sound(sound_powerup)
-                        return
+                        if cloud_task is None or cloud_task.done():
+                            current_username = username.strip()
+                            load_user_progress(current_username)
+                            save_progress()  # Save immediately to store last user
+                            play_sound(sound_powerup)
+                            return
+                        logging_in = True
                     else:
                         error_message = "Name must be at least 2 characters!"
                         play_sound(sound_hit)
@@ -953,8 +2687,7 @@ async def username_entry_screen():
                     username = username[:-1]
                     error_message = ""
                 elif event.key == pygame.K_ESCAPE:
-                    pygame.quit()
-                    sys.exit()
+                    quit_game()
                 elif len(username) < max_length:
                     # Only allow alphanumeric and some special chars
                     if event.unicode.isalnum() or event.unicode in " _-":
@@ -965,136 +2698,143 @@ async def username_entry_screen():
                 if box_x <= event.pos[0] <= box_x + box_width and box_y <= event.pos[1] <= box_y + box_height:
                     pass  # Input box clicked
 
-        await asyncio.sleep(0)
-        clock.tick(60)
+        await frame_scheduler.next_frame(busy=False)
 
 async def leaderboard_screen():
     """Display the live leaderboard showing all players."""
     scroll_offset = 0
     max_display = 10
-    loading_cloud = True
-    cloud_loaded = False
 
     # Start loading from cloud in background
     async def load_cloud_data():
-        nonlocal cloud_loaded
         await load_leaderboard_from_cloud()
         await sync_to_cloud()
-        cloud_loaded = True
 
-    # Create task to load cloud data
-    cloud_task = asyncio.create_task(load_cloud_data())
+    # Create task to load cloud data (cancelled if the player leaves first)
+    cloud_task = start_cloud_task(load_cloud_data())
 
-    while True:
-        update_background()
-        draw_background(screen, False)
+    # Only the particles move; the table is redrawn when what it shows changes
+    renderer = DirtyRenderer()
+    page_read = None  # (storage, its revision, scroll offset) the page below was read at
 
-        # Title
-        draw_text_centered("LEADERBOARD", BIG_FONT, BLACK, 30)
-
-        # Show loading status
-        if not cloud_loaded:
-            draw_text_centered("Syncing with cloud...", SMALL_FONT, ORANGE, 55)
-
-        # Current player info
-        pygame.draw.rect(screen, (220, 240, 255), (20, 80, SCREEN_WIDTH - 40, 45), border_radius=10)
-        pygame.draw.rect(screen, BLUE, (20, 80, SCREEN_WIDTH - 40, 45), 2, border_radius=10)
-        draw_text(f"You: {current_username}", FONT, BLUE, 35, 90)
-        draw_text(f"Points: {points}", FONT, GREEN, SCREEN_WIDTH - 180, 90)
-
-        # Leaderboard header
-        header_y = 140
-        pygame.draw.rect(screen, (50, 50, 70), (20, header_y, SCREEN_WIDTH - 40, 35), border_radius=5)
-        draw_text("Rank", SMALL_FONT, WHITE, 35, header_y + 8)
-        draw_text("Player", SMALL_FONT, WHITE, 100, header_y + 8)
-        draw_text("Points", SMALL_FONT, WHITE, 350, header_y + 8)
-        draw_text("Best Level", SMALL_FONT, WHITE, 480, header_y + 8)
-        draw_text("Playing", SMALL_FONT, WHITE, 620, header_y + 8)
-
-        # Get sorted leaderboard
-        sorted_lb = get_sorted_leaderboard()
-
-        # Display leaderboard entries
-        entry_y = header_y + 45
-        for i, (username, data) in enumerate(sorted_lb[scroll_offset:scroll_offset + max_display]):
-            rank = scroll_offset + i + 1
-            row_y = entry_y + i * 40
-
-            # Highlight current user
-            if username == current_username:
-                pygame.draw.rect(screen, (200, 255, 200), (20, row_y - 5, SCREEN_WIDTH - 40, 38), border_radius=5)
-            elif i % 2 == 0:
-                pygame.draw.rect(screen, (240, 240, 250), (20, row_y - 5, SCREEN_WIDTH - 40, 38), border_radius=5)
-
-            # Rank with medal for top 3
-            if rank == 1:
-                draw_text("🥇", FONT, YELLOW, 35, row_y)
-            elif rank == 2:
-                draw_text("🥈", FONT, (192, 192, 192), 35, row_y)
-            elif rank == 3:
-                draw_text("🥉", FONT, (205, 127, 50), 35, row_y)
-            else:
-                draw_text(f"#{rank}", SMALL_FONT, BLACK, 35, row_y + 3)
-
-            # Player name (truncate if too long)
-            display_name = username[:12] + "..." if len(username) > 12 else username
-            name_color = BLUE if username == current_username else BLACK
-            draw_text(display_name, FONT, name_color, 100, row_y)
-
-            # Points
-            user_points = data.get("points", 0)
-            draw_text(f"{user_points:,}", FONT, GREEN, 350, row_y)
-
-            # Find highest unlocked level
-            user_best_scores = data.get("best_scores", {})
-            levels = ["Easy", "Medium", "Hard", "Impossible", "God Mode", "Creator Mode", "BOSS MODE"]
-            highest_level = "Easy"
-            for level in levels:
-                if user_best_scores.get(level, 0) > 0:
-                    highest_level = level
-
-            # Shorten level name for display
-            level_short = {
-                "Easy": "Easy", "Medium": "Med", "Hard": "Hard",
-                "Impossible": "Imp", "God Mode": "God",
-                "Creator Mode": "Creator", "BOSS MODE": "BOSS"
-            }
-            level_color = PURPLE if highest_level in ["God Mode", "Creator Mode", "BOSS MODE"] else BLACK
-            draw_text(level_short.get(highest_level, highest_level), SMALL_FONT, level_color, 480, row_y + 3)
-
-            # Current level playing
-            current = data.get("current_level", "Easy")
-            draw_text(level_short.get(current, current), SMALL_FONT, ORANGE, 620, row_y + 3)
-
-        # Scroll indicators
-        if scroll_offset > 0:
-            draw_text_centered("▲ UP for more", SMALL_FONT, BLACK, header_y + 45 + max_display * 40 + 10)
-        if scroll_offset + max_display < len(sorted_lb):
-            draw_text_centered("▼ DOWN for more", SMALL_FONT, BLACK, header_y + 45 + max_display * 40 + 30)
-
-        # Footer
-        total_players = len(leaderboard_data)
-        draw_text_centered(f"Total Players: {total_players}", SMALL_FONT, PURPLE, SCREEN_HEIGHT - 70)
-        draw_text_centered("Press B to return", FONT, BLACK, SCREEN_HEIGHT - 40)
-
-        pygame.display.flip()
-
-        for event in pygame.event.get():
+    while True:
+        update_background(frame_scheduler.ticks)
+
+        # Get the visible part of the leaderboard, again only after scrolling or a save
+        if page_read != (local_storage, local_storage.revision, scroll_offset):
+            page_read = (local_storage, local_storage.revision, scroll_offset)
+            page = get_sorted_leaderboard(scroll_offset, max_display)
+            total_players = local_storage.count()
+            your_rank = local_storage.rank(current_username)
+            visible_rows = tuple(
+                (username, data.get("points", 0), data.get("current_level"), tuple(data.get("best_scores", {}).items()))
+                for username, data in page
+            )
+
+        cloud_line = cloud_status.describe()
+
+        if renderer.begin((scroll_offset, cloud_line, current_username, points, your_rank, total_players, visible_rows)):
+            # Title
+            draw_text_centered("LEADERBOARD", BIG_FONT, BLACK, 30)
+
+            # Show loading status
+            if cloud_line:
+                draw_text_centered(cloud_line, SMALL_FONT, RED if cloud_status.state == "offline" else ORANGE, 55)
+
+            # Current player info
+            pygame.draw.rect(screen, (220, 240, 255), (20, 80, SCREEN_WIDTH - 40, 45), border_radius=10)
+            pygame.draw.rect(screen, BLUE, (20, 80, SCREEN_WIDTH - 40, 45), 2, border_radius=10)
+            draw_text(f"You: {current_username}" + (f"  (#{your_rank})" if your_rank else ""), FONT, BLUE, 35, 90)
+            draw_text(f"Points: {points}", FONT, GREEN, SCREEN_WIDTH - 180, 90)
+
+            # Leaderboard header
+            header_y = 140
+            pygame.draw.rect(screen, (50, 50, 70), (20, header_y, SCREEN_WIDTH - 40, 35), border_radius=5)
+            draw_text("Rank", SMALL_FONT, WHITE, 35, header_y + 8)
+            draw_text("Player", SMALL_FONT, WHITE, 100, header_y + 8)
+            draw_text("Points", SMALL_FONT, WHITE, 350, header_y + 8)
+            draw_text("Best Level", SMALL_FONT, WHITE, 480, header_y + 8)
+            draw_text("Playing", SMALL_FONT, WHITE, 620, header_y + 8)
+
+            # Display leaderboard entries
+            entry_y = header_y + 45
+            for i, (username, data) in enumerate(page):
+                rank = scroll_offset + i + 1
+                row_y = entry_y + i * 40
+
+                # Highlight current user
+                if username == current_username:
+                    pygame.draw.rect(screen, (200, 255, 200), (20, row_y - 5, SCREEN_WIDTH - 40, 38), border_radius=5)
+                elif i % 2 == 0:
+                    pygame.draw.rect(screen, (240, 240, 250), (20, row_y - 5, SCREEN_WIDTH - 40, 38), border_radius=5)
+
+                # Rank with medal for top 3
+                if rank == 1:
+                    draw_text("🥇", FONT, YELLOW, 35, row_y)
+                elif rank == 2:
+                    draw_text("🥈", FONT, (192, 192, 192), 35, row_y)
+                elif rank == 3:
+                    draw_text("🥉", FONT, (205, 127, 50), 35, row_y)
+                else:
+                    draw_text(f"#{rank}", SMALL_FONT, BLACK, 35, row_y + 3)
+
+                # Player name (truncate if too long)
+                display_name = username[:12] + "..." if len(username) > 12 else username
+                name_color = BLUE if username == current_username else BLACK
+                draw_text(display_name, FONT, name_color, 100, row_y)
+
+                # Points
+                user_points = data.get("points", 0)
+                draw_text(f"{user_points:,}", FONT, GREEN, 350, row_y)
+
+                # Find highest unlocked level
+                user_best_scores = data.get("best_scores", {})
+                levels = ["Easy", "Medium", "Hard", "Impossible", "God Mode", "Creator Mode", "BOSS MODE"]
+                highest_level = "Easy"
+                for level in levels:
+                    if user_best_scores.get(level, 0) > 0:
+                        highest_level = level
+
+                # Shorten level name for display
+                level_short = {
+                    "Easy": "Easy", "Medium": "Med", "Hard": "Hard",
+                    "Impossible": "Imp", "God Mode": "God",
+                    "Creator Mode": "Creator", "BOSS MODE": "BOSS"
+                }
+                level_color = PURPLE if highest_level in ["God Mode", "Creator Mode", "BOSS MODE"] else BLACK
+                draw_text(level_short.get(highest_level, highest_level), SMALL_FONT, level_color, 480, row_y + 3)
+
+                # Current level playing
+                current = data.get("current_level", "Easy")
+                draw_text(level_short.get(current, current), SMALL_FONT, ORANGE, 620, row_y + 3)
+
+            # Scroll indicators
+            if scroll_offset > 0:
+                draw_text_centered("▲ UP for more", SMALL_FONT, BLACK, header_y + 45 + max_display * 40 + 10)
+            if scroll_offset + max_display < total_players:
+                draw_text_centered("▼ DOWN for more", SMALL_FONT, BLACK, header_y + 45 + max_display * 40 + 30)
+
+            # Footer
+            draw_text_centered(f"Total Players: {total_players}", SMALL_FONT, PURPLE, SCREEN_HEIGHT - 70)
+            draw_text_centered("Press B to return", FONT, BLACK, SCREEN_HEIGHT - 40)
+
+        renderer.present()
+
+        for event in frame_scheduler.events():
             if event.type == pygame.QUIT:
                 save_progress()
-                pygame.quit()
-                sys.exit()
+                quit_game()
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_b or event.key == pygame.K_ESCAPE:
                     play_sound(sound_collect)
+                    cloud_task.cancel()
                     return
                 elif event.key == pygame.K_UP:
                     scroll_offset = max(0, scroll_offset - 1)
                 elif event.key == pygame.K_DOWN:
-                    scroll_offset = min(max(0, len(sorted_lb) - max_display), scroll_offset + 1)
+                    scroll_offset = min(max(0, total_players - max_display), scroll_offset + 1)
 
-        await asyncio.sleep(0)
-        clock.tick(60)
+        await frame_scheduler.next_frame(busy=False)
 
 async def pause_menu(game_points, level_name="Easy"):
     """Display pause menu."""
@@ -1128,16 +2868,15 @@ async def pause_menu(game_points, level_name="Easy"):
                 pygame.draw.rect(screen, (80, 80, 100), (box_x + 20, y_pos - 5, box_width - 40, 35), border_radius=8)
             draw_text_centered(option, FONT, color, y_pos)
 
-        pygame.display.flip()
+        flip_display()
 
-        for event in pygame.event.get():
+        for event in frame_scheduler.events():
             if event.type == pygame.QUIT:
                 points += game_points
                 if game_points > best_scores.get(level_name, 0):
                     best_scores[level_name] = game_points
                 save_progress()
-                pygame.quit()
-                sys.exit()
+                quit_game()
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_UP:
                     selected = (selected - 1) % len(options)
@@ -1173,8 +2912,7 @@ async def pause_menu(game_points, level_name="Easy"):
                             save_progress()
                             return "quit"
 
-        await asyncio.sleep(0)
-        clock.tick(60)
+        await frame_scheduler.next_frame(busy=False)
 
 def scale_position(x, y):
     return x * SCREEN_WIDTH // 360, y * SCREEN_HEIGHT // 640
@@ -1192,49 +2930,53 @@ async def main_menu():
     title_offset = 0
     sync_timer = 0
 
-    # Sync to cloud when entering main menu
-    if CLOUD_ENABLED and cloud_sync_pending:
-        await sync_to_cloud()
+    # Sync to cloud when entering main menu (in the background, the menu stays live)
+    if CLOUD_ENABLED and dirty_users:
+        start_cloud_task(sync_to_cloud())
+
+    # The title and particles are redrawn every frame, the rest only when it changes
+    renderer = DirtyRenderer()
+    menu_items = ["1. PLAY", "2. SHOP", "3. UPGRADES", "4. LEADERBOARD", "5. INSTRUCTIONS", "6. CHANGELOG", "7. QUIT"]
 
     while True:
         # Periodic cloud sync every 30 seconds
-        sync_timer += 1
+        sync_timer += frame_scheduler.ticks
         if sync_timer >= 1800 and CLOUD_ENABLED:  # 30 seconds at 60fps
             sync_timer = 0
-            if cloud_sync_pending:
-                asyncio.create_task(sync_to_cloud())
-        update_background()
-        draw_background(screen, False)
+            if dirty_users:
+                start_cloud_task(sync_to_cloud())
+        update_background(frame_scheduler.ticks)
 
         # Animated title
-        title_offset += 0.05
+        title_offset += 0.05 * frame_scheduler.ticks
         title_y = 50 + math.sin(title_offset) * 5
-        draw_text("Dodge the Tejecks", BIG_FONT, BLACK, *scale_position(60, title_y))
+        title = render_text("Dodge the Tejecks", BIG_FONT, BLACK)
 
-        # Show current player
-        draw_text(f"Player: {current_username}", FONT, BLUE, 10, 100)
-        draw_text(f"Points: {points}", SMALL_FONT, GREEN, 10, 130)
+        # Animate menu items sliding in
+        for i in range(len(menu_items)):
+            menu_animation[i] = min(1, menu_animation[i] + 0.1 * frame_scheduler.ticks)
 
-        # Menu items with hover effect
-        menu_items = ["1. PLAY", "2. SHOP", "3. UPGRADES", "4. LEADERBOARD", "5. INSTRUCTIONS", "6. CHANGELOG", "7. QUIT"]
-        for i, item in enumerate(menu_items):
-            y_pos = 175 + i * 40
-            # Animate menu items
-            menu_animation[i] = min(1, menu_animation[i] + 0.1)
-            offset = (1 - menu_animation[i]) * 50
-            color = BLUE if i == menu_hover else BLACK
-            draw_text(item, FONT, color, scale_position(50, y_pos)[0] + offset, scale_position(50, y_pos)[1])
+        if renderer.begin((current_username, points, high_score, menu_hover, tuple(menu_animation))):
+            # Show current player
+            draw_text(f"Player: {current_username}", FONT, BLUE, 10, 100)
+            draw_text(f"Points: {points}", SMALL_FONT, GREEN, 10, 130)
 
-        # High score display
-        draw_text(f"High Score: {high_score}", SMALL_FONT, PURPLE, 10, SCREEN_HEIGHT - 30)
+            # Menu items with hover effect
+            for i, item in enumerate(menu_items):
+                y_pos = 175 + i * 40
+                offset = (1 - menu_animation[i]) * 50
+                color = BLUE if i == menu_hover else BLACK
+                draw_text(item, FONT, color, scale_position(50, y_pos)[0] + offset, scale_position(50, y_pos)[1])
 
-        pygame.display.flip()
+            # High score display
+            draw_text(f"High Score: {high_score}", SMALL_FONT, PURPLE, 10, SCREEN_HEIGHT - 30)
 
-        for event in pygame.event.get():
+        renderer.present([(title, scale_position(60, title_y))])
+
+        for event in frame_scheduler.events():
             if event.type == pygame.QUIT:
                 save_progress()
-                pygame.quit()
-                sys.exit()
+                quit_game()
             elif event.type == pygame.KEYDOWN:
                 play_sound(sound_collect)
                 if event.key == pygame.K_1:
@@ -1252,56 +2994,53 @@ async def main_menu():
                     await changelog_screen()
                 elif event.key == pygame.K_7:
                     save_progress()
-                    pygame.quit()
-                    sys.exit()
+                    quit_game()
 
-        await asyncio.sleep(0)
-        clock.tick(60)
+        await frame_scheduler.next_frame(busy=min(menu_animation) < 1)
 
 async def instructions_screen():
     """Display the instructions screen."""
-    while True:
-        update_background()
-        draw_background(screen, False)
+    renderer = DirtyRenderer()
 
-        draw_text_centered("Instructions", BIG_FONT, BLACK, 50)
-
-        instructions = [
-            "CONTROLS:",
-            "LEFT/RIGHT - Move player",
-            "AUTO-SHOOT - Lasers fire automatically!",
-            "",
-            "POWER-UPS:",
-            "$ Coin - Bonus points",
-            "S Shield - Block one hit",
-            "> Speed - Move faster",
-            "~ Slow-Mo - Slow enemies",
-            "M Magnet - Attract coins",
-            "B Bomb - Clear all enemies!",
-            "R Rapid - Fast shooting",
-            "D Double - Dual lasers",
-            "A Ammo - +10 laser ammo",
-        ]
-
-        for i, line in enumerate(instructions):
-            color = BLUE if line.startswith("POWER") else BLACK
-            draw_text(line, SMALL_FONT, color, 50, 120 + i * 35)
-
-        draw_text_centered("Press B to return", FONT, BLACK, SCREEN_HEIGHT - 80)
-        pygame.display.flip()
-
-        for event in pygame.event.get():
+    while True:
+        update_background(frame_scheduler.ticks)
+        if renderer.begin(()):
+            draw_text_centered("Instructions", BIG_FONT, BLACK, 50)
+
+            instructions = [
+                "CONTROLS:",
+                "LEFT/RIGHT - Move player",
+                "AUTO-SHOOT - Lasers fire automatically!",
+                "",
+                "POWER-UPS:",
+                "$ Coin - Bonus points",
+                "S Shield - Block one hit",
+                "> Speed - Move faster",
+                "~ Slow-Mo - Slow enemies",
+                "M Magnet - Attract coins",
+                "B Bomb - Clear all enemies!",
+                "R Rapid - Fast shooting",
+                "D Double - Dual lasers",
+                "A Ammo - +10 laser ammo",
+            ]
+
+            for i, line in enumerate(instructions):
+                color = BLUE if line.startswith("POWER") else BLACK
+                draw_text(line, SMALL_FONT, color, 50, 120 + i * 35)
+
+            draw_text_centered("Press B to return", FONT, BLACK, SCREEN_HEIGHT - 80)
+        renderer.present()
+
+        for event in frame_scheduler.events():
             if event.type == pygame.QUIT:
                 save_progress()
-                pygame.quit()
-                sys.exit()
+                quit_game()
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_b:
                     play_sound(sound_collect)
                     return
 
-        await asyncio.sleep(0)
-        clock.tick(60)
+        await frame_scheduler.next_frame(busy=False)
 
 async def changelog_screen():
     """Display the changelog screen."""
@@ -1333,26 +3072,26 @@ async def changelog_screen():
 
     scroll_offset = 0
 
-    while True:
-        update_background()
-        draw_background(screen, False)
+    renderer = DirtyRenderer()
 
-        draw_text_centered("Changelog", BIG_FONT, BLACK, 50)
+    while True:
+        update_background(frame_scheduler.ticks)
+        if renderer.begin((scroll_offset,)):
+            draw_text_centered("Changelog", BIG_FONT, BLACK, 50)
 
-        for i, line in enumerate(updates):
-            y_pos = 120 + i * 30 - scroll_offset
-            if 100 < y_pos < SCREEN_HEIGHT - 100:
-                color = BLUE if line.startswith("Version") else BLACK
-                draw_text(line, SMALL_FONT, color, 30, y_pos)
+            for i, line in enumerate(updates):
+                y_pos = 120 + i * 30 - scroll_offset
+                if 100 < y_pos < SCREEN_HEIGHT - 100:
+                    color = BLUE if line.startswith("Version") else BLACK
+                    draw_text(line, SMALL_FONT, color, 30, y_pos)
 
-        draw_text_centered("UP/DOWN to scroll, B to return", FONT, BLACK, SCREEN_HEIGHT - 50)
-        pygame.display.flip()
+            draw_text_centered("UP/DOWN to scroll, B to return", FONT, BLACK, SCREEN_HEIGHT - 50)
+        renderer.present()
 
-        for event in pygame.event.get():
+        for event in frame_scheduler.events():
             if event.type == pygame.QUIT:
                 save_progress()
-                pygame.quit()
-                sys.exit()
+                quit_game()
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_b:
                     play_sound(sound_collect)
@@ -1362,8 +3101,7 @@ async def changelog_screen():
                 elif event.key == pygame.K_DOWN:
                     scroll_offset = min(len(updates) * 30 - 200, scroll_offset + 30)
 
-        await asyncio.sleep(0)
-        clock.tick(60)
+        await frame_scheduler.next_frame(busy=False)
 
 async def choose_difficulty():
     """Choose difficulty screen."""
@@ -1382,44 +3120,44 @@ async def choose_difficulty():
     # Level order for unlock checking
     level_order = ["Easy", "Medium", "Hard", "Impossible", "God Mode", "Creator Mode", "BOSS MODE"]
 
-    while True:
-        update_background()
-        draw_background(screen, False)
+    renderer = DirtyRenderer()
 
-        draw_text_centered("Choose Difficulty", BIG_FONT, BLACK, 50)
+    while True:
+        update_background(frame_scheduler.ticks)
+        if renderer.begin((selected, tuple(best_scores.values()))):
+            draw_text_centered("Choose Difficulty", BIG_FONT, BLACK, 50)
 
-        for i, (name, speed, color) in enumerate(difficulties):
-            y_pos = 130 + i * 55
+            for i, (name, speed, color) in enumerate(difficulties):
+                y_pos = 130 + i * 55
 
-            unlocked = is_level_unlocked(name)
-            display_color = color if unlocked else (150, 150, 150)
+                unlocked = is_level_unlocked(name)
+                display_color = color if unlocked else (150, 150, 150)
 
-            # Highlight selected
-            if i == selected:
-                pygame.draw.rect(screen, (*display_color[:3], 50) if len(display_color) == 3 else display_color, (50, y_pos - 5, SCREEN_WIDTH - 100, 48), border_radius=10)
-                pygame.draw.rect(screen, display_color, (50, y_pos - 5, SCREEN_WIDTH - 100, 48), 3, border_radius=10)
-
-            # Show level name
-            if unlocked:
-                draw_text(f"{i+1}. {name}", FONT, display_color, 80, y_pos + 8)
-                # Show best score for this level
-                if best_scores[name] > 0:
-                    draw_text(f"Best: {best_scores[name]}", SMALL_FONT, GREEN, SCREEN_WIDTH - 120, y_pos + 10)
-            else:
-                draw_text(f"{i+1}. {name} [LOCKED]", FONT, display_color, 80, y_pos + 8)
-                # Show requirement to unlock
-                prev_level = level_order[i - 1] if i > 0 else "Easy"
-                req = level_unlock_requirements[name]
-                draw_text(f"Need {req} in {prev_level}", SMALL_FONT, (100, 100, 100), SCREEN_WIDTH - 180, y_pos + 10)
+                # Highlight selected
+                if i == selected:
+                    pygame.draw.rect(screen, (*display_color[:3], 50) if len(display_color) == 3 else display_color, (50, y_pos - 5, SCREEN_WIDTH - 100, 48), border_radius=10)
+                    pygame.draw.rect(screen, display_color, (50, y_pos - 5, SCREEN_WIDTH - 100, 48), 3, border_radius=10)
+
+                # Show level name
+                if unlocked:
+                    draw_text(f"{i+1}. {name}", FONT, display_color, 80, y_pos + 8)
+                    # Show best score for this level
+                    if best_scores[name] > 0:
+                        draw_text(f"Best: {best_scores[name]}", SMALL_FONT, GREEN, SCREEN_WIDTH - 120, y_pos + 10)
+                else:
+                    draw_text(f"{i+1}. {name} [LOCKED]", FONT, display_color, 80, y_pos + 8)
+                    # Show requirement to unlock
+                    prev_level = level_order[i - 1] if i > 0 else "Easy"
+                    req = level_unlock_requirements[name]
+                    draw_text(f"Need {req} in {prev_level}", SMALL_FONT, (100, 100, 100), SCREEN_WIDTH - 180, y_pos + 10)
 
-        draw_text_centered("UP/DOWN + ENTER or number key, B = back", SMALL_FONT, BLACK, SCREEN_HEIGHT - 40)
-        pygame.display.flip()
+            draw_text_centered("UP/DOWN + ENTER or number key, B = back", SMALL_FONT, BLACK, SCREEN_HEIGHT - 40)
+        renderer.present()
 
-        for event in pygame.event.get():
+        for event in frame_scheduler.events():
             if event.type == pygame.QUIT:
                 save_progress()
-                pygame.quit()
-                sys.exit()
+                quit_game()
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_UP:
                     selected = (selected - 1) % len(difficulties)
@@ -1481,8 +3219,7 @@ async def choose_difficulty():
                     play_sound(sound_collect)
                     return
 
-        await asyncio.sleep(0)
-        clock.tick(60)
+        await frame_scheduler.next_frame(busy=False)
 
 async def shop():
     """Shop screen."""
@@ -1492,60 +3229,63 @@ async def shop():
     error_message = ""
     error_timer = 0
 
+    renderer = DirtyRenderer()
+
     while True:
-        update_background()
-        draw_background(screen, False)
+        update_background(frame_scheduler.ticks)
 
         # Decrement error timer
         if error_timer > 0:
             error_timer -= 1
 
-        draw_text_centered("Shop", BIG_FONT, BLACK, 30)
-        draw_text(f"Points: {points}", FONT, GREEN, 10, 80)
-        draw_text(f"Equipped: {equipped_item}", FONT, BLUE, 10, 110)
-
-        y_offset = 160
-        for idx, (item_name, item_data) in enumerate(shop_items.items()):
-            image = item_data["image"]
-            purchased = item_data["purchased"]
-            cost = item_data["cost"]
-            status = "Equipped" if equipped_item == item_name else ("Purchased" if purchased else f"{cost} Points")
-
-            # Highlight the selected item
-            if idx == selected_item:
-                pygame.draw.rect(screen, (200, 220, 255), (40, y_offset - 10, SCREEN_WIDTH - 80, 55), border_radius=8)
-                pygame.draw.rect(screen, BLUE, (40, y_offset - 10, SCREEN_WIDTH - 80, 55), 2, border_radius=8)
-
-            # Display item image
-            scaled_image = pygame.transform.scale(image, (45, 45))
-            screen.blit(scaled_image, (55, y_offset))
-
-            # Display text
-            status_color = GREEN if equipped_item == item_name else (BLUE if purchased else BLACK)
-            draw_text(f"{item_name}", FONT, BLACK, 115, y_offset + 5)
-            draw_text(status, SMALL_FONT, status_color, 115, y_offset + 30)
-
-            y_offset += 65
-
-        # Display error message popup if active
-        if error_timer > 0 and error_message:
-            # Draw popup box
-            popup_width = 280
-            popup_height = 60
-            popup_x = (SCREEN_WIDTH - popup_width) // 2
-            popup_y = SCREEN_HEIGHT // 2 - popup_height // 2
-            pygame.draw.rect(screen, (50, 50, 50), (popup_x, popup_y, popup_width, popup_height), border_radius=10)
-            pygame.draw.rect(screen, RED, (popup_x, popup_y, popup_width, popup_height), 3, border_radius=10)
-            draw_text_centered(error_message, FONT, RED, popup_y + 18)
-
-        draw_text_centered("UP/DOWN to select, ENTER to buy/equip, B to return", SMALL_FONT, BLACK, SCREEN_HEIGHT - 40)
-        pygame.display.flip()
-
-        for event in pygame.event.get():
+        purchased_items = tuple(item_data["purchased"] for item_data in shop_items.values())
+        popup = error_message if error_timer > 0 else ""
+        if renderer.begin((points, equipped_item, selected_item, purchased_items, popup)):
+            draw_text_centered("Shop", BIG_FONT, BLACK, 30)
+            draw_text(f"Points: {points}", FONT, GREEN, 10, 80)
+            draw_text(f"Equipped: {equipped_item}", FONT, BLUE, 10, 110)
+
+            y_offset = 160
+            for idx, (item_name, item_data) in enumerate(shop_items.items()):
+                image = item_data["image"]
+                purchased = item_data["purchased"]
+                cost = item_data["cost"]
+                status = "Equipped" if equipped_item == item_name else ("Purchased" if purchased else f"{cost} Points")
+
+                # Highlight the selected item
+                if idx == selected_item:
+                    pygame.draw.rect(screen, (200, 220, 255), (40, y_offset - 10, SCREEN_WIDTH - 80, 55), border_radius=8)
+                    pygame.draw.rect(screen, BLUE, (40, y_offset - 10, SCREEN_WIDTH - 80, 55), 2, border_radius=8)
+
+                # Display item image
+                scaled_image = get_scaled_sprite(image, 45)
+                screen.blit(scaled_image, (55, y_offset))
+
+                # Display text
+                status_color = GREEN if equipped_item == item_name else (BLUE if purchased else BLACK)
+                draw_text(f"{item_name}", FONT, BLACK, 115, y_offset + 5)
+                draw_text(status, SMALL_FONT, status_color, 115, y_offset + 30)
+
+                y_offset += 65
+
+            # Display error message popup if active
+            if error_timer > 0 and error_message:
+                # Draw popup box
+                popup_width = 280
+                popup_height = 60
+                popup_x = (SCREEN_WIDTH - popup_width) // 2
+                popup_y = SCREEN_HEIGHT // 2 - popup_height // 2
+                pygame.draw.rect(screen, (50, 50, 50), (popup_x, popup_y, popup_width, popup_height), border_radius=10)
+                pygame.draw.rect(screen, RED, (popup_x, popup_y, popup_width, popup_height), 3, border_radius=10)
+                draw_text_centered(error_message, FONT, RED, popup_y + 18)
+
+            draw_text_centered("UP/DOWN to select, ENTER to buy/equip, B to return", SMALL_FONT, BLACK, SCREEN_HEIGHT - 40)
+        renderer.present()
+
+        for event in frame_scheduler.events():
             if event.type == pygame.QUIT:
                 save_progress()
-                pygame.quit()
-                sys.exit()
+                quit_game()
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_UP:
                     selected_item = (selected_item - 1) % len(shop_items)
@@ -1575,8 +3315,7 @@ async def shop():
                     play_sound(sound_collect)
                     return
 
-        await asyncio.sleep(0)
-        clock.tick(60)
+        await frame_scheduler.next_frame(busy=error_timer > 0)
 
 async def upgrade_shop():
     """Upgrade shop for power-up durations and shooting."""
@@ -1597,129 +3336,137 @@ async def upgrade_shop():
         ("magnet_duration", "Magnet", "@"),
     ]
 
-    while True:
-        update_background()
-        draw_background(screen, False)
-
-        # Title
-        draw_text_centered("UPGRADE SHOP", BIG_FONT, BLACK, 30)
-        draw_text(f"Points: {points}", FONT, GREEN, 10, 80)
-
-        # Category tabs
-        tab_y = 120
-        tab_width = 200
-        # Duration tab
-        if selected_category == 0:
-            pygame.draw.rect(screen, BLUE, (50, tab_y, tab_width, 35), border_radius=8)
-            draw_text("Power-ups", FONT, WHITE, 80, tab_y + 5)
-        else:
-            pygame.draw.rect(screen, (150, 150, 150), (50, tab_y, tab_width, 35), border_radius=8)
-            draw_text("Power-ups", FONT, BLACK, 80, tab_y + 5)
-
-        # Shooting tab
-        if selected_category == 1:
-            pygame.draw.rect(screen, BLUE, (280, tab_y, tab_width, 35), border_radius=8)
-            draw_text("Shooting", FONT, WHITE, 320, tab_y + 5)
-        else:
-            pygame.draw.rect(screen, (150, 150, 150), (280, tab_y, tab_width, 35), border_radius=8)
-            draw_text("Shooting", FONT, BLACK, 320, tab_y + 5)
-
-        content_y = 170
+    renderer = DirtyRenderer()
 
-        if selected_category == 0:
-            # Duration upgrades
-            draw_text("Upgrade power-up durations:", SMALL_FONT, BLACK, 50, content_y)
-            draw_text("(Default: 5 sec)", SMALL_FONT, PURPLE, 300, content_y)
+    while True:
+        update_background(frame_scheduler.ticks)
 
-            for i, (key, name, icon) in enumerate(duration_upgrades):
-                y_pos = content_y + 40 + i * 70
-                current_level = player_upgrades[key]
-                current_duration = duration_upgrade_values[current_level]
+        # Error/success message timers
+        error_shown = error_message if error_timer > 0 else ""
+        success_shown = success_message if success_timer > 0 else ""
+        if error_timer > 0:
+            error_timer -= 1
+        if success_timer > 0:
+            success_timer -= 1
 
-                # Highlight selected
-                if i == selected_upgrade:
-                    pygame.draw.rect(screen, (200, 220, 255), (40, y_pos - 5, SCREEN_WIDTH - 80, 60), border_radius=10)
-                    pygame.draw.rect(screen, BLUE, (40, y_pos - 5, SCREEN_WIDTH - 80, 60), 2, border_radius=10)
-
-                # Icon and name
-                draw_text(f"[{icon}] {name}", FONT, BLACK, 60, y_pos)
-                draw_text(f"Current: {current_duration}s", SMALL_FONT, GREEN, 60, y_pos + 25)
-
-                # Next upgrade info
-                if current_level < 5:
-                    next_duration = duration_upgrade_values[current_level + 1]
-                    cost = duration_upgrade_costs[current_level + 1]
-                    draw_text(f"Next: {next_duration}s", SMALL_FONT, ORANGE, 300, y_pos + 5)
-                    draw_text(f"Cost: {cost}", FONT, RED if points < cost else GREEN, 300, y_pos + 25)
-                else:
-                    draw_text("MAX LEVEL!", FONT, PURPLE, 300, y_pos + 15)
+        state = (points, selected_category, selected_upgrade, tuple(player_upgrades.values()), error_shown, success_shown)
+        if renderer.begin(state):
+            # Title
+            draw_text_centered("UPGRADE SHOP", BIG_FONT, BLACK, 30)
+            draw_text(f"Points: {points}", FONT, GREEN, 10, 80)
+
+            # Category tabs
+            tab_y = 120
+            tab_width = 200
+            # Duration tab
+            if selected_category == 0:
+                pygame.draw.rect(screen, BLUE, (50, tab_y, tab_width, 35), border_radius=8)
+                draw_text("Power-ups", FONT, WHITE, 80, tab_y + 5)
+            else:
+                pygame.draw.rect(screen, (150, 150, 150), (50, tab_y, tab_width, 35), border_radius=8)
+                draw_text("Power-ups", FONT, BLACK, 80, tab_y + 5)
 
-                # Level indicators
-                for lvl in range(6):
-                    indicator_x = 500 + lvl * 25
-                    if lvl <= current_level:
-                        pygame.draw.circle(screen, GREEN, (indicator_x, y_pos + 20), 8)
+            # Shooting tab
+            if selected_category == 1:
+                pygame.draw.rect(screen, BLUE, (280, tab_y, tab_width, 35), border_radius=8)
+                draw_text("Shooting", FONT, WHITE, 320, tab_y + 5)
+            else:
+                pygame.draw.rect(screen, (150, 150, 150), (280, tab_y, tab_width, 35), border_radius=8)
+                draw_text("Shooting", FONT, BLACK, 320, tab_y + 5)
+
+            content_y = 170
+
+            if selected_category == 0:
+                # Duration upgrades
+                draw_text("Upgrade power-up durations:", SMALL_FONT, BLACK, 50, content_y)
+                draw_text("(Default: 5 sec)", SMALL_FONT, PURPLE, 300, content_y)
+
+                for i, (key, name, icon) in enumerate(duration_upgrades):
+                    y_pos = content_y + 40 + i * 70
+                    current_level = player_upgrades[key]
+                    current_duration = duration_upgrade_values[current_level]
+
+                    # Highlight selected
+                    if i == selected_upgrade:
+                        pygame.draw.rect(screen, (200, 220, 255), (40, y_pos - 5, SCREEN_WIDTH - 80, 60), border_radius=10)
+                        pygame.draw.rect(screen, BLUE, (40, y_pos - 5, SCREEN_WIDTH - 80, 60), 2, border_radius=10)
+
+                    # Icon and name
+                    draw_text(f"[{icon}] {name}", FONT, BLACK, 60, y_pos)
+                    draw_text(f"Current: {current_duration}s", SMALL_FONT, GREEN, 60, y_pos + 25)
+
+                    # Next upgrade info
+                    if current_level < 5:
+                        next_duration = duration_upgrade_values[current_level + 1]
+                        cost = duration_upgrade_costs[current_level + 1]
+                        draw_text(f"Next: {next_duration}s", SMALL_FONT, ORANGE, 300, y_pos + 5)
+                        draw_text(f"Cost: {cost}", FONT, RED if points < cost else GREEN, 300, y_pos + 25)
                     else:
-                        pygame.draw.circle(screen, (150, 150, 150), (indicator_x, y_pos + 20), 8, 2)
-
-        else:
-            # Shooting upgrades
-            draw_text("Upgrade your shooting:", SMALL_FONT, BLACK, 50, content_y)
-
-            current_shooting = player_upgrades["shooting"]
-
-            for i in range(3):
-                y_pos = content_y + 50 + i * 80
-                name = shooting_upgrade_names[i]
-                cost = shooting_upgrade_costs[i]
-                is_owned = current_shooting >= i
-                is_equipped = current_shooting == i
+                        draw_text("MAX LEVEL!", FONT, PURPLE, 300, y_pos + 15)
 
-                # Highlight selected
-                if i == selected_upgrade:
-                    pygame.draw.rect(screen, (200, 220, 255), (40, y_pos - 5, SCREEN_WIDTH - 80, 70), border_radius=10)
-                    pygame.draw.rect(screen, BLUE, (40, y_pos - 5, SCREEN_WIDTH - 80, 70), 2, border_radius=10)
-
-                # Name and description
-                draw_text(name, FONT, BLACK, 60, y_pos)
+                    # Level indicators
+                    for lvl in range(6):
+                        indicator_x = 500 + lvl * 25
+                        if lvl <= current_level:
+                            pygame.draw.circle(screen, GREEN, (indicator_x, y_pos + 20), 8)
+                        else:
+                            pygame.draw.circle(screen, (150, 150, 150), (indicator_x, y_pos + 20), 8, 2)
 
-                if i == 0:
-                    desc = "Fire 1 laser at a time"
-                elif i == 1:
-                    desc = "Fire 2 lasers side by side"
-                else:
-                    desc = "Fire 3 lasers in a spread"
-                draw_text(desc, SMALL_FONT, (100, 100, 100), 60, y_pos + 28)
-
-                # Status
-                if is_equipped:
-                    draw_text("EQUIPPED", FONT, GREEN, 450, y_pos + 10)
-                elif is_owned:
-                    draw_text("OWNED", FONT, CYAN, 450, y_pos + 10)
-                else:
-                    draw_text(f"Cost: {cost}", FONT, RED if points < cost else GREEN, 450, y_pos + 10)
+            else:
+                # Shooting upgrades
+                draw_text("Upgrade your shooting:", SMALL_FONT, BLACK, 50, content_y)
+
+                current_shooting = player_upgrades["shooting"]
+
+                for i in range(3):
+                    y_pos = content_y + 50 + i * 80
+                    name = shooting_upgrade_names[i]
+                    cost = shooting_upgrade_costs[i]
+                    is_owned = current_shooting >= i
+                    is_equipped = current_shooting == i
+
+                    # Highlight selected
+                    if i == selected_upgrade:
+                        pygame.draw.rect(screen, (200, 220, 255), (40, y_pos - 5, SCREEN_WIDTH - 80, 70), border_radius=10)
+                        pygame.draw.rect(screen, BLUE, (40, y_pos - 5, SCREEN_WIDTH - 80, 70), 2, border_radius=10)
+
+                    # Name and description
+                    draw_text(name, FONT, BLACK, 60, y_pos)
+
+                    if i == 0:
+                        desc = "Fire 1 laser at a time"
+                    elif i == 1:
+                        desc = "Fire 2 lasers side by side"
+                    else:
+                        desc = "Fire 3 lasers in a spread"
+                    draw_text(desc, SMALL_FONT, (100, 100, 100), 60, y_pos + 28)
+
+                    # Status
+                    if is_equipped:
+                        draw_text("EQUIPPED", FONT, GREEN, 450, y_pos + 10)
+                    elif is_owned:
+                        draw_text("OWNED", FONT, CYAN, 450, y_pos + 10)
+                    else:
+                        draw_text(f"Cost: {cost}", FONT, RED if points < cost else GREEN, 450, y_pos + 10)
 
-        # Error/success messages
-        if error_timer > 0:
-            error_timer -= 1
-            pygame.draw.rect(screen, (255, 200, 200), (100, SCREEN_HEIGHT - 120, SCREEN_WIDTH - 200, 40), border_radius=10)
-            draw_text_centered(error_message, FONT, RED, SCREEN_HEIGHT - 110)
+            # Error/success messages
+            if error_shown:
+                pygame.draw.rect(screen, (255, 200, 200), (100, SCREEN_HEIGHT - 120, SCREEN_WIDTH - 200, 40), border_radius=10)
+                draw_text_centered(error_shown, FONT, RED, SCREEN_HEIGHT - 110)
 
-        if success_timer > 0:
-            success_timer -= 1
-            pygame.draw.rect(screen, (200, 255, 200), (100, SCREEN_HEIGHT - 120, SCREEN_WIDTH - 200, 40), border_radius=10)
-            draw_text_centered(success_message, FONT, GREEN, SCREEN_HEIGHT - 110)
+            if success_shown:
+                pygame.draw.rect(screen, (200, 255, 200), (100, SCREEN_HEIGHT - 120, SCREEN_WIDTH - 200, 40), border_radius=10)
+                draw_text_centered(success_shown, FONT, GREEN, SCREEN_HEIGHT - 110)
 
-        # Instructions
-        draw_text_centered("LEFT/RIGHT: Switch tabs | UP/DOWN: Select | ENTER: Buy | B: Back", SMALL_FONT, BLACK, SCREEN_HEIGHT - 40)
+            # Instructions
+            draw_text_centered("LEFT/RIGHT: Switch tabs | UP/DOWN: Select | ENTER: Buy | B: Back", SMALL_FONT, BLACK, SCREEN_HEIGHT - 40)
 
-        pygame.display.flip()
+        renderer.present()
 
-        for event in pygame.event.get():
+        for event in frame_scheduler.events():
             if event.type == pygame.QUIT:
                 save_progress()
-                pygame.quit()
-                sys.exit()
+                quit_game()
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_LEFT or event.key == pygame.K_RIGHT:
                     selected_category = 1 - selected_category
@@ -1786,385 +3533,639 @@ async def upgrade_shop():
                     play_sound(sound_collect)
                     return
 
-        await asyncio.sleep(0)
-        clock.tick(60)
+        await frame_scheduler.next_frame(busy=error_timer > 0 or success_timer > 0)
+
+# Game simulation: one engine, with a mode object for what differs between endless and boss play
+INPUT_LEFT = 1  # Bits of the per-tick input given to GameEngine.step()
+INPUT_RIGHT = 2
+
+def read_inputs():
+    """Current keyboard and touch state as INPUT_* bits."""
+    touch = get_touch_input()
+    keys = pygame.key.get_pressed()
+    inputs = 0
+    if keys[pygame.K_LEFT] or touch["left"]:
+        inputs |= INPUT_LEFT
+    if keys[pygame.K_RIGHT] or touch["right"]:
+        inputs |= INPUT_RIGHT
+    return inputs
+
+# Lasers fired per volley for each shooting level, without and with the double shot power-up
+DOUBLE_SHOT_COLOR = (255, 100, 100)
+LASER_VOLLEYS = [
+    # Single shot (two lasers with double shot)
+    ([(0, 0, RED)],
+     [(-15, 0, DOUBLE_SHOT_COLOR), (15, 0, DOUBLE_SHOT_COLOR)]),
+    # Double shot upgrade
+    ([(-12, 0, CYAN), (12, 0, CYAN)],
+     [(-12, 0, CYAN), (12, 0, CYAN), (-24, 0, DOUBLE_SHOT_COLOR), (24, 0, DOUBLE_SHOT_COLOR)]),
+    # Triple shot upgrade - spread pattern
+    ([(0, 0, PURPLE), (-20, 5, PURPLE), (20, 5, PURPLE)],
+     [(0, 0, PURPLE), (-20, 5, PURPLE), (20, 5, PURPLE), (-35, 10, DOUBLE_SHOT_COLOR), (35, 10, DOUBLE_SHOT_COLOR)]),
+]
 
-async def game_loop(difficulty, level_name="Easy"):
-    """Main game loop with power-ups, lasers, and effects."""
-    global points, high_score, screen_shake, shake_intensity, best_scores, current_level
+class GameState:
+    """Everything a run of a game mode changes (what used to be game loop locals)."""
+    __slots__ = ("tick", "outcome", "game_points", "player_x", "player_y", "prev_player_x", "base_player_speed",
+                 "shields", "max_shields", "speed_boost_active", "slowmo_active", "magnet_active",
+                 "rapid_fire_active", "double_shot_active", "boosted", "slowed",
+                 "laser_cooldown", "base_cooldown", "laser_ammo", "max_ammo", "enemies_destroyed",
+                 "combo", "combo_timer", "player_bob", "dodge_streak", "auto_save_timer",
+                 "enemies", "power_ups", "lasers", "fires", "explosions", "particles",
+                 "enemy_grid", "fire_grid", "boss")
 
-    # Track current level for leaderboard
-    current_level = level_name
-    save_progress()  # Save that we're playing this level
-
-    game_points = 0
-    player_x = SCREEN_WIDTH // 2 - 25
-    player_y = SCREEN_HEIGHT - 100
-    base_player_speed = 12  # Slightly faster player for easier dodging
-    player_speed = base_player_speed
-    diamond_speed = difficulty
-    enemies = []  # Now using Enemy class with random images/sizes
-    power_ups = []
-    particles = []
-    lasers = []
-    explosions = []
-
-    # Power-up states
-    shields = 0  # Lives system: 0-5 shields (permanent until hit)
-    max_shields = 5
-    speed_boost_active = 0
-    slowmo_active = 0
-    magnet_active = 0
-    rapid_fire_active = 0
-    double_shot_active = 0
-
-    # Laser/shooting system
-    laser_cooldown = 0
-    base_cooldown = 15  # Frames between shots
-    laser_ammo = 10  # Starting ammo
-    max_ammo = 30
-    enemies_destroyed = 0
-
-    # Combo system
-    combo = 0
-    combo_timer = 0
-
-    # Animation
-    player_bob = 0
-    dodge_streak = 0
-
-    # Auto-save timer (save every 30 seconds = 1800 frames at 60fps)
-    auto_save_timer = 0
+    def __init__(self):
+        self.tick = 0
+        self.outcome = None  # "game_over" or "victory" once the run has ended
+        self.game_points = 0
+        self.player_x = SCREEN_WIDTH // 2 - 25
+        self.player_y = SCREEN_HEIGHT - 100
+        self.prev_player_x = self.player_x
+        self.base_player_speed = 12  # Slightly faster player for easier dodging
+
+        # Power-up states
+        self.shields = 0  # Lives system: 0-5 shields (permanent until hit)
+        self.max_shields = 5
+        self.speed_boost_active = 0
+        self.slowmo_active = 0
+        self.magnet_active = 0
+        self.rapid_fire_active = 0
+        self.double_shot_active = 0
+        self.boosted = False  # Speed boost / slow-mo running this tick
+        self.slowed = False
+
+        # Laser/shooting system
+        self.laser_cooldown = 0
+        self.base_cooldown = 15  # Frames between shots
+        self.laser_ammo = 10  # Starting ammo
+        self.max_ammo = 30
+        self.enemies_destroyed = 0
+
+        # Combo system
+        self.combo = 0
+        self.combo_timer = 0
+
+        # Animation
+        self.player_bob = 0
+        self.dodge_streak = 0
+
+        # Auto-save timer (save every 30 seconds of game time)
+        self.auto_save_timer = 0
+
+        # Entity containers, filled in by the mode
+        self.enemies = None
+        self.power_ups = None
+        self.lasers = None
+        self.fires = None
+        self.explosions = None
+        self.particles = None
+        self.enemy_grid = SpatialHash()  # Broadphase for everything that collides with enemies
+        self.fire_grid = None
+        self.boss = None
+
+class GameEngine:
+    """Runs a game mode one fixed tick at a time.
+
+    step(inputs) advances the simulation and returns the outcome once the
+    run ends; draw() renders the current state. The screen loop in
+    play_game() and headless tools drive the same engine. The mode decides
+    what a tick does, using the shared pieces here (timers, movement,
+    shooting, power-ups, hits).
+    """
+    __slots__ = ("mode", "state", "autosave", "hitbox")
+
+    def __init__(self, mode, autosave=True):
+        self.mode = mode
+        self.state = GameState()
+        self.autosave = autosave
+        self.hitbox = pygame.Rect(0, 0, 40, 40)  # The player's, moved by player_rect()
+        mode.setup(self.state)
+
+    def step(self, inputs=0):
+        s = self.state
+        s.tick += 1
+        s.prev_player_x = s.player_x
+        update_screen_shake()
 
-    while True:
         # Auto-save progress periodically
-        auto_save_timer += 1
-        if auto_save_timer >= 1800:  # Every 30 seconds
-            auto_save_timer = 0
-            # Update best score for this level
-            if game_points > best_scores.get(level_name, 0):
-                best_scores[level_name] = game_points
-            save_progress()
-
-        # Update background
-        update_background()
-
-        # Apply screen shake
-        shake_x, shake_y = apply_screen_shake()
+        if self.autosave:
+            s.auto_save_timer += 1
+            if s.auto_save_timer >= 30 * SIM_HZ:  # Every 30 seconds
+                s.auto_save_timer = 0
+                self.record_best()
+                save_progress()
 
-        # Create offset surface for shake effect
-        draw_background(screen, True)
-
-        # Update power-up timers (shields are permanent lives, not timed)
-        if speed_boost_active > 0:
-            speed_boost_active -= 1
-            player_speed = base_player_speed * 1.5
-        else:
-            player_speed = base_player_speed
-        if slowmo_active > 0:
-            slowmo_active -= 1
-            current_diamond_speed = diamond_speed * 0.4
-        else:
-            current_diamond_speed = diamond_speed
-        if magnet_active > 0:
-            magnet_active -= 1
-        if rapid_fire_active > 0:
-            rapid_fire_active -= 1
-        if double_shot_active > 0:
-            double_shot_active -= 1
-        if laser_cooldown > 0:
-            laser_cooldown -= 1
+        self.update_timers()
+        s.player_bob += 0.15  # Player bobbing animation
+        self.mode.tick(self, inputs)
+        return s.outcome
+
+    def record_best(self):
+        """Update the best score for this level."""
+        level_name = self.mode.level_name
+        if self.state.game_points > best_scores.get(level_name, 0):
+            best_scores[level_name] = self.state.game_points
+
+    def update_timers(self):
+        """Count down power-ups, the laser cooldown and the combo (shields are permanent lives, not timed)."""
+        s = self.state
+        s.boosted = s.speed_boost_active > 0
+        if s.boosted:
+            s.speed_boost_active -= 1
+        s.slowed = s.slowmo_active > 0
+        if s.slowed:
+            s.slowmo_active -= 1
+        if s.magnet_active > 0:
+            s.magnet_active -= 1
+        if s.rapid_fire_active > 0:
+            s.rapid_fire_active -= 1
+        if s.double_shot_active > 0:
+            s.double_shot_active -= 1
+        if s.laser_cooldown > 0:
+            s.laser_cooldown -= 1
 
         # Combo timer
-        if combo_timer > 0:
-            combo_timer -= 1
+        if s.combo_timer > 0:
+            s.combo_timer -= 1
         else:
-            combo = 0
-
-        # Player bobbing animation
-        player_bob += 0.15
-        bob_offset = math.sin(player_bob) * 3
+            s.combo = 0
+
+    def spawn_enemy(self, rate):
+        if spawn_random.random() < rate:
+            Enemy(self.state.enemies, spawn_random.randint(50, SCREEN_WIDTH - 50))
+
+    def spawn_power_up(self, rate, store, types, weights):
+        if spawn_random.random() < rate:
+            power_type = spawn_random.choices(types, weights=weights)[0]
+            PowerUp(store, spawn_random.randint(50, SCREEN_WIDTH - 50), -30, power_type)
+
+    def laser_hit(self, laser, skip_power_ups=False):
+        """Destroy the first enemy laser touches, along with the laser. Returns the enemy (or None)."""
+        s = self.state
+        hits = s.enemy_grid.query(laser.get_rect())  # Only nearby enemies are tested
+        if skip_power_ups:
+            hits = [enemy for enemy in hits if not isinstance(enemy, PowerUp)]
+        if not hits:
+            return None
+        enemy = hits[0]
+        s.enemies.remove(enemy)
+        s.enemy_grid.remove(enemy)
+        s.lasers.remove(laser)
+        return enemy
+
+    def absorb_hit(self):
+        """The player was hit: use up a shield, or end the run. Returns False when it was fatal."""
+        s = self.state
+        play_sound(sound_hit)
+        if s.shields > 0:
+            # Shield blocks the hit - lose 1 life
+            s.shields -= 1
+            trigger_screen_shake(5, 5)
+            return True
+        # No shields left - Game over
+        trigger_screen_shake(15, 20)
+        s.particles.emit(s.player_x + 25, s.player_y + 25, RED, 30)
+        s.outcome = "game_over"
+        return False
 
-        # Load and draw the equipped player's image
-        player_image = shop_items[equipped_item]["image"]
-        player_image = pygame.transform.scale(player_image, (50, 50))
-        player_draw_x = player_x + shake_x
-        player_draw_y = player_y + bob_offset + shake_y
-        screen.blit(player_image, (player_draw_x, player_draw_y))
+    def player_rect(self):
+        s = self.state
+        self.hitbox.update(s.player_x + 5, s.player_y + 5, 40, 40)  # Slightly smaller hitbox
+        return self.hitbox
+
+    def collect(self, power):
+        """Apply a power-up the player touched."""
+        s = self.state
+        play_sound(sound_powerup)
+        kind = power.type
+        if kind == 'coin':
+            s.game_points += 5 * (1 + s.combo // 2)
+        elif kind == 'shield':
+            if s.shields < s.max_shields:
+                s.shields += 1  # Add a shield (life), max 5
+        elif kind == 'speed':
+            s.speed_boost_active = get_powerup_duration("speed")  # Uses upgraded duration
+        elif kind == 'slowmo':
+            s.slowmo_active = get_powerup_duration("slowmo")
+        elif kind == 'magnet':
+            s.magnet_active = get_powerup_duration("magnet")
+        elif kind == 'bomb':
+            # Clear all enemies on screen!
+            play_sound(sound_bomb)
+            trigger_screen_shake(20, 15)
+            for enemy in s.enemies:
+                s.explosions.append(Explosion(enemy.x, enemy.y))
+                s.game_points += 2
+                s.particles.emit(enemy.x, enemy.y, RED, 8)
+            s.enemies_destroyed += len(s.enemies)
+            s.enemies.clear()
+            s.enemy_grid.clear()
+        elif kind == 'rapid':
+            s.rapid_fire_active = get_powerup_duration("rapid_fire")
+        elif kind == 'double':
+            s.double_shot_active = get_powerup_duration("rapid_fire")  # Uses rapid fire duration for double shot too
+        elif kind == 'ammo':
+            s.laser_ammo = min(s.max_ammo, s.laser_ammo + 10)
+        color, count = self.mode.collect_burst(kind)
+        s.particles.emit(power.x, power.y, color, count)
+
+    def update_explosions(self):
+        for explosion in self.state.explosions:
+            explosion.update()
+            if not explosion.active:
+                self.state.explosions.remove(explosion)
+
+    def move_player(self, inputs):
+        s = self.state
+        speed = s.base_player_speed * 1.5 if s.boosted else s.base_player_speed
+        if inputs & INPUT_LEFT and s.player_x > 0:
+            s.player_x -= speed
+        if inputs & INPUT_RIGHT and s.player_x < SCREEN_WIDTH - 50:
+            s.player_x += speed
+
+    def auto_shoot(self):
+        """Fire a volley whenever the cooldown is ready and there is ammo."""
+        s = self.state
+        if s.laser_cooldown > 0 or s.laser_ammo <= 0:
+            return
+        play_sound(sound_laser)
+        s.laser_cooldown = s.base_cooldown // 3 if s.rapid_fire_active > 0 else s.base_cooldown
+
+        # Lasers depend on the shooting upgrade level; the double shot power-up adds more
+        laser_x = s.player_x + 25
+        laser_y = s.player_y - 10
+        volley = LASER_VOLLEYS[get_shooting_level()][s.double_shot_active > 0]
+        for dx, dy, color in volley:
+            Laser(s.lasers, laser_x + dx, laser_y + dy, color)
+        s.laser_ammo = max(0, s.laser_ammo - len(volley))
+
+    def draw(self, surface, alpha, shake_x, shake_y, hud):
+        """Draw everything where it is alpha of the way between the last two ticks."""
+        s = self.state
+        self.mode.draw_background(surface)
+
+        # Equipped player's image
+        bob_offset = math.sin(s.player_bob) * 3
+        player_image = get_scaled_sprite(shop_items[equipped_item]["image"], 50)
+        player_draw_x = lerp(s.prev_player_x, s.player_x, alpha)
+        surface.blit(player_image, (player_draw_x + shake_x, s.player_y + bob_offset + shake_y))
 
         # Draw shield effect (permanent shield aura when shields > 0)
-        if shields > 0:
-            pygame.draw.circle(screen, CYAN, (int(player_x + 25), int(player_y + 25 + bob_offset)), 35, 3)
+        if s.shields > 0:
+            center = (int(player_draw_x + 25), int(s.player_y + 25 + bob_offset))
+            pygame.draw.circle(surface, CYAN, center, 35, 3)
             # Pulsing effect
             pulse = int(5 * math.sin(pygame.time.get_ticks() / 150))
-            pygame.draw.circle(screen, CYAN, (int(player_x + 25), int(player_y + 25 + bob_offset)), 38 + pulse, 2)
-
-        # Update and draw enemies (random characters with random sizes)
-        for enemy in enemies[:]:
-            enemy.update(current_diamond_speed)
-            if enemy.is_off_screen():
-                enemies.remove(enemy)
-                game_points += 1 + combo
-                dodge_streak += 1
-                combo = min(combo + 1, 10)
-                combo_timer = 60
-
-                # Play dodge sound occasionally
-                if dodge_streak % 5 == 0:
-                    play_sound(sound_dodge)
-
-                # Spawn particles for successful dodge
-                if dodge_streak % 10 == 0:
-                    for _ in range(5):
-                        particles.append(Particle(player_x + 25, player_y, GREEN))
-            else:
-                enemy.draw(screen, shake_x, shake_y)
+            pygame.draw.circle(surface, CYAN, center, 38 + pulse, 2)
+
+        self.mode.draw_entities(s, surface, alpha, shake_x, shake_y)
+
+        # Draw UI (HUD layer only redraws widgets whose values changed)
+        self.mode.draw_hud(s, hud)
+        # Touch controls for mobile
+        hud.widget("move_buttons", TOUCH_BUTTONS["left"].union(TOUCH_BUTTONS["right"]), (), draw_move_buttons)
+        hud.widget("pause_button", TOUCH_BUTTONS["pause"], (), draw_pause_button)
+        hud.draw(surface)
+
+# Particle burst when a power-up is collected in endless mode
+POWERUP_BURSTS = {
+    'coin': (YELLOW, 10), 'shield': (CYAN, 15), 'speed': (GREEN, 15), 'slowmo': (PURPLE, 15),
+    'magnet': (ORANGE, 15), 'bomb': (RED, 20), 'rapid': (DOUBLE_SHOT_COLOR, 15),
+    'double': ((100, 100, 255), 15), 'ammo': (WHITE, 10),
+}
 
-        # Spawn new enemies (random character, random size)
-        # Easy: ~3 per second (0.05), harder levels spawn more
+class EndlessMode:
+    """Dodge falling enemies for as long as possible; difficulty sets their speed."""
+    def __init__(self, difficulty, level_name="Easy"):
+        self.difficulty = difficulty
+        self.level_name = level_name
+        # Easy: ~3 enemies per second (0.05), harder levels spawn more
         if difficulty <= 3:
-            spawn_rate = 0.05  # Easy: about 3 per second at 60fps
+            self.spawn_rate = 0.05  # Easy: about 3 per second at 60 ticks/s
         elif difficulty <= 6:
-            spawn_rate = 0.06  # Medium
+            self.spawn_rate = 0.06  # Medium
         elif difficulty <= 10:
-            spawn_rate = 0.07  # Hard
+            self.spawn_rate = 0.07  # Hard
         elif difficulty <= 15:
-            spawn_rate = 0.08  # Impossible
+            self.spawn_rate = 0.08  # Impossible
         elif difficulty <= 25:
-            spawn_rate = 0.10  # God Mode
+            self.spawn_rate = 0.10  # God Mode
         else:
-            spawn_rate = 0.12  # Creator Mode
-        if random.random() < spawn_rate:
-            enemy_x = random.randint(50, SCREEN_WIDTH - 50)
-            enemies.append(Enemy(enemy_x))
-
-        # Update and draw lasers
-        for laser in lasers[:]:
-            laser.update()
-            if laser.is_off_screen():
-                lasers.remove(laser)
-                continue
-            laser.draw(screen)
-
-            # Check laser collision with enemies
-            laser_rect = laser.get_rect()
-            for enemy in enemies[:]:
-                if laser_rect.colliderect(enemy.get_rect()):
-                    # Destroy enemy
-                    enemies.remove(enemy)
-                    if laser in lasers:
-                        lasers.remove(laser)
-                    enemies_destroyed += 1
-                    game_points += 3 + combo
-                    play_sound(sound_explosion)
-                    trigger_screen_shake(3, 3)
-                    # Explosion particles
-                    for _ in range(15):
-                        particles.append(Particle(enemy.x, enemy.y, ORANGE))
-                    break
-
-        # Update and draw explosions
-        for explosion in explosions[:]:
-            explosion.update()
-            explosion.draw(screen)
-            if not explosion.active:
-                explosions.remove(explosion)
+            self.spawn_rate = 0.12  # Creator Mode
+
+    def setup(self, s):
+        caps = ENTITY_CAPS["endless"]
+        s.enemies = EntityStore(caps["enemies"], name="enemies")
+        s.power_ups = EntityStore(caps["power_ups"], name="power-ups")
+        s.particles = ParticleSystem(caps["particles"])
+        s.lasers = EntityStore(caps["lasers"], name="lasers")
+        s.explosions = BoundedQueue(caps["explosions"], "explosions")
+
+    def tick(self, engine, inputs):
+        s = engine.state
+        fall_speed = self.difficulty * 0.4 if s.slowed else self.difficulty
+
+        # Move all enemies in one batch; the ones that fell off the bottom were dodged
+        for _ in range(s.enemies.step(fall_speed)):
+            s.game_points += 1 + s.combo
+            s.dodge_streak += 1
+            s.combo = min(s.combo + 1, 10)
+            s.combo_timer = 60
+
+            # Play dodge sound occasionally
+            if s.dodge_streak % 5 == 0:
+                play_sound(sound_dodge)
+
+            # Spawn particles for successful dodge
+            if s.dodge_streak % 10 == 0:
+                s.particles.emit(s.player_x + 25, s.player_y, GREEN, 5)
+
+        engine.spawn_enemy(self.spawn_rate)
+
+        # Enemies have moved, re-bucket them for this tick's collision checks
+        s.enemy_grid.rebuild(s.enemies)
+
+        # Move lasers (ones past the top of the screen are dropped)
+        s.lasers.step()
+        for laser in s.lasers:
+            enemy = engine.laser_hit(laser)
+            if enemy:
+                s.enemies_destroyed += 1
+                s.game_points += 3 + s.combo
+                play_sound(sound_explosion)
+                trigger_screen_shake(3, 3)
+                # Explosion particles
+                s.particles.emit(enemy.x, enemy.y, ORANGE, 15)
+
+        engine.update_explosions()
 
         # Spawn power-ups occasionally
-        if random.random() < 0.01:
-            power_type = random.choices(
-                ['coin', 'shield', 'speed', 'slowmo', 'magnet', 'bomb', 'rapid', 'double', 'ammo'],
-                weights=[40, 12, 12, 8, 8, 5, 5, 5, 5]
-            )[0]
-            power_x = random.randint(50, SCREEN_WIDTH - 50)
-            power_ups.append(PowerUp(power_x, -30, power_type))
-
-        # Update and draw power-ups
-        for power in power_ups[:]:
-            power.update(current_diamond_speed)
-
+        engine.spawn_power_up(0.01, s.power_ups,
+                              ['coin', 'shield', 'speed', 'slowmo', 'magnet', 'bomb', 'rapid', 'double', 'ammo'],
+                              [40, 12, 12, 8, 8, 5, 5, 5, 5])
+
+        # Move power-ups (ones that fell off the bottom are dropped)
+        s.power_ups.step(fall_speed)
+        player_rect = pygame.Rect(s.player_x, s.player_y, 50, 50)
+        for power in s.power_ups:
             # Magnet effect
-            if magnet_active > 0 and power.type == 'coin':
-                dx = (player_x + 25) - power.x
-                dy = (player_y + 25) - power.y
+            if s.magnet_active > 0 and power.type == 'coin':
+                dx = (s.player_x + 25) - power.x
+                dy = (s.player_y + 25) - power.y
                 dist = math.sqrt(dx*dx + dy*dy)
                 if dist > 0 and dist < 200:
                     power.x += dx / dist * 5
                     power.y += dy / dist * 5
 
-            if power.y > SCREEN_HEIGHT:
-                power_ups.remove(power)
-                continue
-
-            power.draw(screen)
-
-            # Check collision with player
-            player_rect = pygame.Rect(player_x, player_y, 50, 50)
             if player_rect.colliderect(power.get_rect()):
-                play_sound(sound_powerup)
-
-                # Apply power-up effect
-                if power.type == 'coin':
-                    game_points += 5 * (1 + combo // 2)
-                    for _ in range(10):
-                        particles.append(Particle(power.x, power.y, YELLOW))
-                elif power.type == 'shield':
-                    if shields < max_shields:
-                        shields += 1  # Add a shield (life), max 5
-                    for _ in range(15):
-                        particles.append(Particle(power.x, power.y, CYAN))
-                elif power.type == 'speed':
-                    speed_boost_active = get_powerup_duration("speed")  # Uses upgraded duration
-                    for _ in range(15):
-                        particles.append(Particle(power.x, power.y, GREEN))
-                elif power.type == 'slowmo':
-                    slowmo_active = get_powerup_duration("slowmo")  # Uses upgraded duration
-                    for _ in range(15):
-                        particles.append(Particle(power.x, power.y, PURPLE))
-                elif power.type == 'magnet':
-                    magnet_active = get_powerup_duration("magnet")  # Uses upgraded duration
-                    for _ in range(15):
-                        particles.append(Particle(power.x, power.y, ORANGE))
-                elif power.type == 'bomb':
-                    # Clear all enemies on screen!
-                    play_sound(sound_bomb)
-                    trigger_screen_shake(20, 15)
-                    for enemy in enemies:
-                        explosions.append(Explosion(enemy.x, enemy.y))
-                        game_points += 2
-                        for _ in range(8):
-                            particles.append(Particle(enemy.x, enemy.y, RED))
-                    enemies_destroyed += len(enemies)
-                    enemies.clear()
-                    for _ in range(20):
-                        particles.append(Particle(power.x, power.y, RED))
-                elif power.type == 'rapid':
-                    rapid_fire_active = get_powerup_duration("rapid_fire")  # Uses upgraded duration
-                    for _ in range(15):
-                        particles.append(Particle(power.x, power.y, (255, 100, 100)))
-                elif power.type == 'double':
-                    double_shot_active = get_powerup_duration("rapid_fire")  # Uses rapid fire duration for double shot too
-                    for _ in range(15):
-                        particles.append(Particle(power.x, power.y, (100, 100, 255)))
-                elif power.type == 'ammo':
-                    laser_ammo = min(max_ammo, laser_ammo + 10)
-                    for _ in range(10):
-                        particles.append(Particle(power.x, power.y, WHITE))
-
-                power_ups.remove(power)
+                engine.collect(power)
+                s.power_ups.remove(power)
 
         # Check for collisions with enemies
-        player_rect = pygame.Rect(player_x + 5, player_y + 5, 40, 40)  # Slightly smaller hitbox
-        for enemy in enemies[:]:
-            if player_rect.colliderect(enemy.get_rect()):
-                if shields > 0:
-                    # Shield blocks the hit - lose 1 life
-                    shields -= 1
-                    enemies.remove(enemy)
-                    trigger_screen_shake(5, 5)
-                    play_sound(sound_hit)
-                    for _ in range(20):
-                        particles.append(Particle(enemy.x, enemy.y, CYAN))
-                else:
-                    # No shields left - Game over
-                    play_sound(sound_hit)
-                    trigger_screen_shake(15, 20)
-
-                    # Explosion particles
-                    for _ in range(30):
-                        particles.append(Particle(player_x + 25, player_y + 25, RED))
-
-                    points += game_points
-                    if game_points > high_score:
-                        high_score = game_points
-                    # Update best score for this level
-                    if game_points > best_scores.get(level_name, 0):
-                        best_scores[level_name] = game_points
-                    save_progress()
-                    await game_over(game_points, combo)
-                    return
-
-        # Update and draw particles
-        for particle in particles[:]:
-            particle.update()
-            particle.draw(screen)
-            if particle.is_dead():
-                particles.remove(particle)
-
-        # Draw UI
-        # Score panel
-        pygame.draw.rect(screen, (0, 0, 0, 100), (5, 5, 200, 115), border_radius=10)
-        pygame.draw.rect(screen, WHITE, (5, 5, 200, 115), 2, border_radius=10)
-        draw_text(f"Score: {game_points}", FONT, WHITE, 15, 15)
-        draw_text(f"Total: {points}", SMALL_FONT, (200, 200, 200), 15, 45)
-        if combo > 0:
-            draw_text(f"Combo: x{combo + 1}", SMALL_FONT, YELLOW, 15, 70)
-
-        # Ammo display
-        ammo_color = RED if laser_ammo <= 3 else (WHITE if laser_ammo < 10 else GREEN)
-        draw_text(f"Ammo: {laser_ammo}/{max_ammo}", SMALL_FONT, ammo_color, 15, 95)
-
-        # Destroyed counter
-        draw_text(f"Destroyed: {enemies_destroyed}", SMALL_FONT, ORANGE, SCREEN_WIDTH - 150, SCREEN_HEIGHT - 30)
+        for enemy in s.enemy_grid.query(engine.player_rect()):
+            if not engine.absorb_hit():
+                return
+            s.particles.emit(enemy.x, enemy.y, CYAN, 20)
+            s.enemies.remove(enemy)
+            s.enemy_grid.remove(enemy)
+
+        s.particles.update()
+        engine.move_player(inputs)
+        engine.auto_shoot()
+
+    def collect_burst(self, kind):
+        return POWERUP_BURSTS[kind]
+
+    def record(self, s, outcome):
+        """Add the run to the player's totals and records."""
+        global points, high_score
+        points += s.game_points
+        if s.game_points > high_score:
+            high_score = s.game_points
+        if s.game_points > best_scores.get(self.level_name, 0):
+            best_scores[self.level_name] = s.game_points
+
+    def draw_background(self, surface):
+        draw_background(surface, True)
+
+    def draw_entities(self, s, surface, alpha, shake_x, shake_y):
+        for enemy in s.enemies:
+            enemy.draw(surface, shake_x, shake_y, alpha)
+        for laser in s.lasers:
+            laser.draw(surface, alpha)
+        for explosion in s.explosions:
+            explosion.draw(surface)
+        for power in s.power_ups:
+            power.draw(surface, alpha=alpha)
+        s.particles.draw(surface, alpha)
+
+    def draw_hud(self, s, hud):
+        hud.widget("score", (5, 5, 200, 115), (s.game_points, points, s.combo, s.laser_ammo, s.max_ammo), draw_score_panel)
+        hud.widget("destroyed", (SCREEN_WIDTH - 150, SCREEN_HEIGHT - 30, 150, 30), (s.enemies_destroyed,), draw_destroyed_counter)
 
         # Shield/Lives display (prominent top center)
-        lives_y = 10
-        # Background box for lives
         lives_box_width = 180
         lives_box_x = (SCREEN_WIDTH - lives_box_width) // 2
-        pygame.draw.rect(screen, (30, 30, 50), (lives_box_x, lives_y - 5, lives_box_width, 40), border_radius=10)
-        pygame.draw.rect(screen, CYAN if shields > 0 else RED, (lives_box_x, lives_y - 5, lives_box_width, 40), 2, border_radius=10)
-
-        # Draw shield/heart icons
-        for i in range(max_shields):
-            icon_x = lives_box_x + 20 + i * 32
-            if i < shields:
-                # Filled heart/shield icon
-                pygame.draw.circle(screen, CYAN, (icon_x, lives_y + 15), 12)
-                pygame.draw.circle(screen, WHITE, (icon_x, lives_y + 15), 8)
-            else:
-                # Empty heart/shield icon
-                pygame.draw.circle(screen, (80, 80, 80), (icon_x, lives_y + 15), 12, 2)
+        lives_box = (lives_box_x, 5, lives_box_width, 40)
+        hud.widget("lives", lives_box, (lives_box, 25, 12, s.shields, s.max_shields), draw_lives_box)
 
         # Power-up status indicators
-        status_x = SCREEN_WIDTH - 120
-        status_y = 60  # Moved down to avoid pause button
-        if speed_boost_active > 0:
-            pygame.draw.rect(screen, GREEN, (status_x, status_y, 110, 25), border_radius=5)
-            draw_text(f"Speed: {speed_boost_active // 60 + 1}s", SMALL_FONT, BLACK, status_x + 5, status_y + 3)
-            status_y += 30
-        if slowmo_active > 0:
-            pygame.draw.rect(screen, PURPLE, (status_x, status_y, 110, 25), border_radius=5)
-            draw_text(f"Slow: {slowmo_active // 60 + 1}s", SMALL_FONT, WHITE, status_x + 5, status_y + 3)
-            status_y += 30
-        if magnet_active > 0:
-            pygame.draw.rect(screen, ORANGE, (status_x, status_y, 110, 25), border_radius=5)
-            draw_text(f"Magnet: {magnet_active // 60 + 1}s", SMALL_FONT, BLACK, status_x + 5, status_y + 3)
-            status_y += 30
-        if rapid_fire_active > 0:
-            pygame.draw.rect(screen, (255, 100, 100), (status_x, status_y, 110, 25), border_radius=5)
-            draw_text(f"Rapid: {rapid_fire_active // 60 + 1}s", SMALL_FONT, WHITE, status_x + 5, status_y + 3)
-            status_y += 30
-        if double_shot_active > 0:
-            pygame.draw.rect(screen, (100, 100, 255), (status_x, status_y, 110, 25), border_radius=5)
-            draw_text(f"Double: {double_shot_active // 60 + 1}s", SMALL_FONT, WHITE, status_x + 5, status_y + 3)
+        pills = (seconds_left(s.speed_boost_active), seconds_left(s.slowmo_active), seconds_left(s.magnet_active),
+                 seconds_left(s.rapid_fire_active), seconds_left(s.double_shot_active))
+        hud.widget("powerups", (SCREEN_WIDTH - 120, 60, 110, 30 * len(POWERUP_PILLS)), pills, draw_powerup_pills)
 
-        # Draw touch controls for mobile
-        draw_touch_controls(screen)
+class BossMode:
+    """BOSS MODE - Fight the FINAL VIRTUAL EMDR TEJECK BOSS!"""
+    level_name = "BOSS MODE"
+
+    def setup(self, s):
+        caps = ENTITY_CAPS["boss"]
+        s.enemies = EntityStore(caps["enemies"], name="boss enemies")  # Also holds the power-ups
+        s.particles = ParticleSystem(caps["particles"], name="boss particles")  # Oldest sparks are overwritten when full
+        s.lasers = EntityStore(caps["lasers"], name="boss lasers")
+        # Boss fire projectiles; a full store drops fires that already left the screen first
+        s.fires = EntityStore(caps["fires"], evict="offscreen", name="fires")
+        s.explosions = BoundedQueue(caps["explosions"], "boss explosions")
+        s.fire_grid = SpatialHash()
+        s.boss = Boss()
+
+        # Laser system - more ammo for boss fight
+        s.base_cooldown = 12
+        s.laser_ammo = 30
+        s.max_ammo = 50
+
+    def tick(self, engine, inputs):
+        s = engine.state
+        boss = s.boss
+        boss.update()
 
-        pygame.display.flip()
+        # Boss fires at player
+        if boss.should_fire():
+            play_sound(sound_explosion)
+            target_x = s.player_x + 25
+            target_y = s.player_y + 25
+            # Fire pattern based on phase
+            if boss.phase == 1:
+                Fire(s.fires, boss.x, boss.y + 75, target_x, target_y)
+            elif boss.phase == 2:
+                # Spread shot
+                Fire(s.fires, boss.x - 30, boss.y + 75, target_x, target_y)
+                Fire(s.fires, boss.x + 30, boss.y + 75, target_x, target_y)
+            else:
+                # Phase 3 - crazy fire
+                for angle in [-30, 0, 30]:
+                    Fire(s.fires, boss.x, boss.y + 75, target_x + angle * 5, target_y, speed=10)
+
+        # Move fires (burnt out or off-screen ones are dropped)
+        s.fires.step()
+        s.fire_grid.rebuild(s.fires)
+
+        # Check fire collision with player
+        for fire in s.fire_grid.query(engine.player_rect()):
+            if not engine.absorb_hit():
+                return
+            s.particles.emit(fire.x, fire.y, CYAN, 15)
+            s.fires.remove(fire)
+
+        # Spawn smaller enemies occasionally
+        engine.spawn_enemy(0.02)
+
+        # Move enemies and power-ups (fixed speed for boss mode)
+        s.game_points += s.enemies.step(8)
+
+        # Enemies have moved, re-bucket them for this tick's collision checks
+        s.enemy_grid.rebuild(s.enemies)
+
+        # Move lasers (ones past the top of the screen are dropped)
+        s.lasers.step()
+        for laser in s.lasers:
+            # Check laser collision with boss
+            if laser.get_rect().colliderect(boss.get_rect()):
+                s.lasers.remove(laser)
+                if boss.take_damage(2):
+                    # Boss defeated!
+                    play_sound(sound_bomb)
+                    trigger_screen_shake(30, 30)
+                    # Big explosion
+                    s.particles.emit(boss.x, boss.y, [RED, ORANGE, YELLOW], 50)
+                    s.game_points += 10000  # Big reward for defeating the boss!
+                    s.outcome = "victory"
+                    return
+                play_sound(sound_hit)
+                trigger_screen_shake(3, 3)
+                s.particles.emit(laser.x, laser.y, ORANGE, 8)
+                continue
+
+            # Check laser collision with enemies (lasers pass through power-ups)
+            enemy = engine.laser_hit(laser, skip_power_ups=True)
+            if enemy:
+                s.game_points += 3
+                play_sound(sound_explosion)
+                s.particles.emit(enemy.x, enemy.y, ORANGE, 10)
+
+        # Check player collision with enemies and power-ups
+        for enemy in s.enemy_grid.query(engine.player_rect()):
+            if isinstance(enemy, PowerUp):
+                engine.collect(enemy)
+                s.enemies.remove(enemy)
+                s.enemy_grid.remove(enemy)
+                continue
+            if not engine.absorb_hit():
+                return
+            s.enemies.remove(enemy)
+            s.enemy_grid.remove(enemy)
+
+        # Spawn power-ups occasionally (they share the enemies store)
+        engine.spawn_power_up(0.015, s.enemies, ['shield', 'speed', 'rapid', 'double', 'ammo'], [20, 15, 20, 20, 25])
+
+        s.particles.update()
+        engine.update_explosions()
+        engine.move_player(inputs)
+        engine.auto_shoot()
+
+    def collect_burst(self, kind):
+        return CYAN, 10
+
+    def record(self, s, outcome):
+        """Add the run to the player's totals and records."""
+        global points, high_score
+        points += s.game_points
+        if outcome == "victory":
+            if s.game_points > high_score:
+                high_score = s.game_points
+        elif s.game_points > best_scores.get(self.level_name, 0):
+            best_scores[self.level_name] = s.game_points
+
+    def draw_background(self, surface):
+        # Dark red tinted background for boss fight
+        surface.blit(get_background("boss"), (0, 0))
+
+    def draw_entities(self, s, surface, alpha, shake_x, shake_y):
+        s.boss.draw(surface, alpha)
+        for fire in s.fires:
+            fire.draw(surface, alpha)
+        for enemy in s.enemies:
+            enemy.draw(surface, shake_x, shake_y, alpha)
+        for laser in s.lasers:
+            laser.draw(surface, alpha)
+        s.particles.draw(surface, alpha)
+        for explosion in s.explosions:
+            explosion.draw(surface)
+
+    def draw_hud(self, s, hud):
+        hud.widget("score", (5, SCREEN_HEIGHT - 80, 200, 75), (s.game_points, s.laser_ammo, s.max_ammo, s.rapid_fire_active > 0), draw_boss_panel)
+
+        # Lives/Shields display (bottom left, next to score panel)
+        lives_box = (220, SCREEN_HEIGHT - 45, 180, 35)
+        hud.widget("lives", lives_box, (lives_box, SCREEN_HEIGHT - 30, 10, s.shields, s.max_shields), draw_lives_box)
+
+async def play_game(mode):
+    """Play a game mode on screen until the player dies, wins, or quits from the pause menu."""
+    global points, current_level, high_score_run
+
+    # Track current level for leaderboard
+    current_level = mode.level_name
+    save_progress()  # Save that we're playing this level
+
+    engine = GameEngine(mode)
+    state = engine.state
+    hud = HudLayer()  # HUD overlay
+    recorder = ReplayRecorder(mode.level_name, seed_streams())
+
+    # Game logic runs in fixed ticks, drawing happens once per display frame
+    sim_clock = SimClock()
+
+    while True:
+        inputs = read_inputs()
+        for _ in range(sim_clock.steps()):
+            outcome = engine.step(inputs)
+            recorder.record(inputs)
+            if outcome:
+                run = recorder.finish(state)
+                mode.record(state, outcome)
+                if state.game_points and state.game_points == high_score:
+                    high_score_run = base64.b64encode(run).decode("ascii")  # Proof of the new high score
+                save_progress()
+                if outcome == "victory":
+                    await victory_screen(state.game_points)
+                else:
+                    await game_over(state.game_points, state.combo)
+                return
+
+        update_background(frame_scheduler.ticks)
+        shake_x, shake_y = apply_screen_shake()
+        engine.draw(screen, sim_clock.alpha, shake_x, shake_y, hud)
+        flip_display()
 
         # Handle pause button click
         pause_clicked = False
-        for event in pygame.event.get():
+        for event in frame_scheduler.events():
             if event.type == pygame.QUIT:
-                points += game_points
-                # Update best score for this level
-                if game_points > best_scores.get(level_name, 0):
-                    best_scores[level_name] = game_points
+                recorder.finish(state)
+                points += state.game_points
+                engine.record_best()
                 save_progress()
-                pygame.quit()
-                sys.exit()
+                quit_game()
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     pause_clicked = True
@@ -2174,89 +4175,36 @@ async def game_loop(difficulty, level_name="Easy"):
 
         # Handle pause
         if pause_clicked:
-            result = await pause_menu(game_points, level_name)
+            result = await pause_menu(state.game_points, mode.level_name)
             if result == "quit":
+                recorder.finish(state)
                 return
+            sim_clock.reset()  # Don't fast-forward through the pause
 
-        # Get touch input
-        touch = get_touch_input()
-
-        # Handle player movement and shooting (keyboard + touch)
-        keys = pygame.key.get_pressed()
-        if (keys[pygame.K_LEFT] or touch["left"]) and player_x > 0:
-            player_x -= player_speed
-        if (keys[pygame.K_RIGHT] or touch["right"]) and player_x < SCREEN_WIDTH - 50:
-            player_x += player_speed
-
-        # Auto-shoot - automatically fires when cooldown is ready and has ammo
-        if laser_cooldown <= 0 and laser_ammo > 0:
-            play_sound(sound_laser)
+        await frame_scheduler.next_frame()
 
-            # Determine cooldown based on rapid fire
-            if rapid_fire_active > 0:
-                laser_cooldown = base_cooldown // 3
-            else:
-                laser_cooldown = base_cooldown
-
-            # Create laser(s) based on shooting upgrade level
-            laser_x = player_x + 25
-            laser_y = player_y - 10
-            shooting_level = get_shooting_level()  # 0=single, 1=double, 2=triple
-
-            # Double shot power-up doubles the lasers
-            multiplier = 2 if double_shot_active > 0 else 1
-
-            if shooting_level == 0:
-                # Single shot (or double with power-up)
-                if multiplier == 2:
-                    lasers.append(Laser(laser_x - 15, laser_y, (255, 100, 100)))
-                    lasers.append(Laser(laser_x + 15, laser_y, (255, 100, 100)))
-                    laser_ammo -= 2
-                else:
-                    lasers.append(Laser(laser_x, laser_y, RED))
-                    laser_ammo -= 1
-            elif shooting_level == 1:
-                # Double shot upgrade
-                lasers.append(Laser(laser_x - 12, laser_y, CYAN))
-                lasers.append(Laser(laser_x + 12, laser_y, CYAN))
-                laser_ammo -= 2
-                if multiplier == 2:
-                    lasers.append(Laser(laser_x - 24, laser_y, (255, 100, 100)))
-                    lasers.append(Laser(laser_x + 24, laser_y, (255, 100, 100)))
-                    laser_ammo -= 2
-            else:
-                # Triple shot upgrade - spread pattern
-                lasers.append(Laser(laser_x, laser_y, PURPLE))  # Center
-                lasers.append(Laser(laser_x - 20, laser_y + 5, PURPLE))  # Left
-                lasers.append(Laser(laser_x + 20, laser_y + 5, PURPLE))  # Right
-                laser_ammo -= 3
-                if multiplier == 2:
-                    lasers.append(Laser(laser_x - 35, laser_y + 10, (255, 100, 100)))
-                    lasers.append(Laser(laser_x + 35, laser_y + 10, (255, 100, 100)))
-                    laser_ammo -= 2
-
-            # Ensure ammo doesn't go negative
-            laser_ammo = max(0, laser_ammo)
-
-        clock.tick(60)
-        await asyncio.sleep(0)
+async def game_loop(difficulty, level_name="Easy"):
+    """Main game loop with power-ups, lasers, and effects."""
+    await play_game(EndlessMode(difficulty, level_name))
 
 async def game_over(score, max_combo):
     """Display the game over screen with stats."""
     global high_score
 
+    if DEBUG:
+        print("\n".join((rotation_cache.report(), cap_report())))
+
     # Load the game over image
     try:
-        game_over_image = pygame.image.load("game_over.jpeg")
-        game_over_image = pygame.transform.scale(game_over_image, (200, 200))
+        game_over_image = get_scaled_sprite(load_image("game_over.jpeg"), 200)
     except pygame.error:
         game_over_image = None
 
     animation_timer = 0
 
     while True:
-        animation_timer += 1
-        update_background()
+        animation_timer += frame_scheduler.ticks
+        update_background(frame_scheduler.ticks)
         draw_background(screen, False)
 
         # Animated title
@@ -2284,432 +4232,482 @@ async def game_over(score, max_combo):
             screen.blit(game_over_image, (img_x, 290))
 
         draw_text_centered("Press ENTER to continue", FONT, BLACK, SCREEN_HEIGHT - 60)
-        pygame.display.flip()
+        flip_display()
 
-        for event in pygame.event.get():
+        for event in frame_scheduler.events():
             if event.type == pygame.QUIT:
                 save_progress()
-                pygame.quit()
-                sys.exit()
+                quit_game()
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_RETURN:
                     play_sound(sound_collect)
                     return
 
-        await asyncio.sleep(0)
-        clock.tick(60)
+        await frame_scheduler.next_frame()
 
 async def boss_game_loop():
     """BOSS MODE - Fight the FINAL VIRTUAL EMDR TEJECK BOSS!"""
-    global points, high_score, screen_shake, shake_intensity, best_scores, current_level
-
-    # Track current level for leaderboard
-    current_level = "BOSS MODE"
-    save_progress()  # Save that we're playing boss mode
-
-    game_points = 0
-    player_x = SCREEN_WIDTH // 2 - 25
-    player_y = SCREEN_HEIGHT - 100
-    player_speed = 12  # Faster movement for boss fight
-    enemies = []
-    particles = []
-    lasers = []
-    fires = []  # Boss fire projectiles
-    explosions = []
-
-    # Create the boss
-    boss = Boss()
-
-    # Player states
-    shields = 0  # Lives system: 0-5 shields
-    max_shields = 5
-    speed_boost_active = 0
-    rapid_fire_active = 0
-    double_shot_active = 0
-
-    # Laser system - more ammo for boss fight
-    laser_cooldown = 0
-    base_cooldown = 12
-    laser_ammo = 30
-    max_ammo = 50
-
-    # Animation
-    player_bob = 0
-    boss_defeated = False
-
-    # Auto-save timer (save every 30 seconds = 1800 frames at 60fps)
-    auto_save_timer = 0
-
-    while True:
-        # Auto-save progress periodically
-        auto_save_timer += 1
-        if auto_save_timer >= 1800:  # Every 30 seconds
-            auto_save_timer = 0
-            # Update best score for boss mode
-            if game_points > best_scores.get("BOSS MODE", 0):
-                best_scores["BOSS MODE"] = game_points
-            save_progress()
-
-        update_background()
-        shake_x, shake_y = apply_screen_shake()
+    await play_game(BossMode())
 
-        # Limit list sizes to prevent memory issues
-        while len(particles) > 100:
-            particles.pop(0)
-        while len(fires) > 50:
-            fires.pop(0)
-        while len(enemies) > 30:
-            enemies.pop(0)
-        while len(lasers) > 20:
-            lasers.pop(0)
-        while len(explosions) > 10:
-            explosions.pop(0)
-
-        # Dark red tinted background for boss fight
-        for y in range(0, SCREEN_HEIGHT, 4):
-            ratio = y / SCREEN_HEIGHT
-            color = (int(80 + 40 * ratio), int(20 + 20 * ratio), int(40 + 30 * ratio))
-            pygame.draw.rect(screen, color, (0, y, SCREEN_WIDTH, 4))
-
-        # Update power-up timers (shields are permanent lives, not timed)
-        if speed_boost_active > 0:
-            speed_boost_active -= 1
-        if rapid_fire_active > 0:
-            rapid_fire_active -= 1
-        if double_shot_active > 0:
-            double_shot_active -= 1
-        if laser_cooldown > 0:
-            laser_cooldown -= 1
-
-        current_speed = player_speed * 1.5 if speed_boost_active > 0 else player_speed
-
-        # Player bobbing
-        player_bob += 0.15
-        bob_offset = math.sin(player_bob) * 3
-
-        # Draw player
-        player_image = shop_items[equipped_item]["image"]
-        player_image = pygame.transform.scale(player_image, (50, 50))
-        screen.blit(player_image, (player_x + shake_x, player_y + bob_offset + shake_y))
-
-        # Draw shield effect (permanent shield aura when shields > 0)
-        if shields > 0:
-            pygame.draw.circle(screen, CYAN, (int(player_x + 25), int(player_y + 25 + bob_offset)), 35, 3)
-            pulse = int(5 * math.sin(pygame.time.get_ticks() / 150))
-            pygame.draw.circle(screen, CYAN, (int(player_x + 25), int(player_y + 25 + bob_offset)), 38 + pulse, 2)
-
-        # Update and draw boss
-        boss.update()
-        boss.draw(screen)
-
-        # Boss fires at player
-        if boss.should_fire() and not boss_defeated:
-            play_sound(sound_explosion)
-            # Fire pattern based on phase
-            if boss.phase == 1:
-                fires.append(Fire(boss.x, boss.y + 75, player_x + 25, player_y + 25))
-            elif boss.phase == 2:
-                # Spread shot
-                fires.append(Fire(boss.x - 30, boss.y + 75, player_x + 25, player_y + 25))
-                fires.append(Fire(boss.x + 30, boss.y + 75, player_x + 25, player_y + 25))
-            else:
-                # Phase 3 - crazy fire
-                for angle in [-30, 0, 30]:
-                    target_x = player_x + 25 + angle * 5
-                    fires.append(Fire(boss.x, boss.y + 75, target_x, player_y + 25, speed=10))
-
-        # Update and draw fires
-        for fire in fires[:]:
-            fire.update()
-            if fire.is_dead():
-                fires.remove(fire)
-                continue
-            fire.draw(screen)
-
-            # Check fire collision with player
-            player_rect = pygame.Rect(player_x + 5, player_y + 5, 40, 40)
-            if player_rect.colliderect(fire.get_rect()):
-                if shields > 0:
-                    # Shield blocks the hit - lose 1 life
-                    shields -= 1
-                    fires.remove(fire)
-                    trigger_screen_shake(5, 5)
-                    play_sound(sound_hit)
-                    for _ in range(15):
-                        particles.append(Particle(fire.x, fire.y, CYAN))
-                else:
-                    # No shields left - Game over
-                    play_sound(sound_hit)
-                    trigger_screen_shake(15, 20)
-                    for _ in range(30):
-                        particles.append(Particle(player_x + 25, player_y + 25, RED))
-                    points += game_points
-                    # Update best score for boss mode
-                    if game_points > best_scores.get("BOSS MODE", 0):
-                        best_scores["BOSS MODE"] = game_points
-                    save_progress()
-                    await game_over(game_points, 0)
-                    return
-
-        # Spawn smaller enemies occasionally
-        if random.random() < 0.02:
-            enemy_x = random.randint(50, SCREEN_WIDTH - 50)
-            enemies.append(Enemy(enemy_x))
-
-        # Update and draw enemies
-        for enemy in enemies[:]:
-            enemy.update(8)  # Fixed speed for boss mode
-            if enemy.is_off_screen():
-                enemies.remove(enemy)
-                game_points += 1
-            else:
-                enemy.draw(screen, shake_x, shake_y)
+# Headless turbo mode: the simulation as fast as the CPU allows, nothing drawn
+HEADLESS_LEVELS = {  # --level= name -> (level name, difficulty)
+    "easy": ("Easy", 3), "medium": ("Medium", 6), "hard": ("Hard", 10), "impossible": ("Impossible", 15),
+    "god": ("God Mode", 25), "creator": ("Creator Mode", 35), "boss": ("BOSS MODE", None),
+}
 
-        # Update and draw lasers
-        for laser in lasers[:]:
-            laser.update()
-            if laser.is_off_screen():
-                lasers.remove(laser)
-                continue
-            laser.draw(screen)
+def make_mode(level):
+    """Game mode for a level name like "hard", "God Mode" or "boss"."""
+    key = level.lower().split()[0].split("-")[0]
+    if key not in HEADLESS_LEVELS:
+        raise ValueError(f"unknown level {level!r} (choose from {', '.join(HEADLESS_LEVELS)})")
+    level_name, difficulty = HEADLESS_LEVELS[key]
+    return BossMode() if difficulty is None else EndlessMode(difficulty, level_name)
+
+def idle_bot(state):
+    return 0
+
+def dodge_bot(state):
+    """Head for the spot along the bottom with the least coming down on it."""
+    threats = [(thing.x, state.player_y - thing.y, thing.size / 2 + 30)
+               for thing in state.enemies if not isinstance(thing, PowerUp)]
+    if state.fires is not None:
+        threats += [(fire.x, state.player_y - fire.y, fire.size + 30) for fire in state.fires]
+    threats = [threat for threat in threats if -50 < threat[1] < 300]
+
+    def danger(x):
+        total = abs(x - state.player_x) * 2  # Rather not run across the screen for nothing
+        for tx, height, reach in threats:
+            overlap = reach - abs(tx - (x + 25))
+            if overlap > 0:
+                total += overlap * (300 - height)
+        return total
+
+    target = min(range(0, SCREEN_WIDTH - 49, 12), key=danger)
+    if target < state.player_x - 6:
+        return INPUT_LEFT
+    if target > state.player_x + 6:
+        return INPUT_RIGHT
+    return 0
+
+def sweep_bot(state):
+    """Run from wall to wall (shoots across the whole screen)."""
+    if state.tick % 120 < 60:
+        return INPUT_LEFT
+    return INPUT_RIGHT
+
+BOTS = {"idle": idle_bot, "dodge": dodge_bot, "sweep": sweep_bot}
+
+def run_headless(mode, max_ticks=5 * 60 * SIM_HZ, inputs=dodge_bot, seed=None, record=None):
+    """Run a game mode without drawing or frame pacing and report how fast it simulated.
+
+    inputs is a bot (called with the GameState each tick, returns INPUT_*
+    bits) or a sequence of input bits, one per tick. Runs until the game
+    ends or max_ticks have passed. The random streams are seeded from seed
+    (a fresh one if None). With record=FILE the run is saved there as a
+    replay, and with record=True it is only returned, as result["replay"].
+    Nothing else is saved. Time spent in the bot is left out of
+    ticks_per_second, so it measures the engine alone.
+    """
+    seed = seed_streams(seed)
+    recorder = ReplayRecorder(mode.level_name, seed, None if record is True else record) if record else None
+    engine = GameEngine(mode, autosave=False)
+    state = engine.state
+    script = None if callable(inputs) else iter(inputs)
+    outcome = None
+    clock = time.perf_counter
+    bot_seconds = 0.0
+    start = clock()
+    while state.tick < max_ticks and not outcome:
+        if script is None:
+            asked = clock()
+            bits = inputs(state)
+            bot_seconds += clock() - asked
+        else:
+            bits = next(script, None)
+            if bits is None:
+                break  # Ran out of recorded input
+        outcome = engine.step(bits)
+        if recorder:
+            recorder.record(bits)
+    elapsed = clock() - start - bot_seconds
+    replay = recorder.finish(state) if recorder else None
+    digest = state_digest(state)
+    return {
+        "level": mode.level_name,
+        "seed": seed,
+        "ticks": state.tick,
+        "outcome": outcome or "time",
+        "score": state.game_points,
+        "digest": digest,
+        "replay": replay,
+        "seconds": elapsed,
+        "bot_seconds": bot_seconds,
+        "ticks_per_second": state.tick / elapsed if elapsed > 0 else float("inf"),
+    }
 
-            # Check laser collision with boss
-            if laser.get_rect().colliderect(boss.get_rect()):
-                lasers.remove(laser)
-                if boss.take_damage(2):
-                    # Boss defeated!
-                    boss_defeated = True
-                    play_sound(sound_bomb)
-                    trigger_screen_shake(30, 30)
-                    # Big explosion
-                    for _ in range(50):
-                        particles.append(Particle(boss.x, boss.y, random.choice([RED, ORANGE, YELLOW])))
-                    game_points += 10000  # Big reward for defeating the boss!
-                    points += game_points
-                    if game_points > high_score:
-                        high_score = game_points
-                    save_progress()
-                    await victory_screen(game_points)
-                    return
-                else:
-                    play_sound(sound_hit)
-                    trigger_screen_shake(3, 3)
-                    for _ in range(8):
-                        particles.append(Particle(laser.x, laser.y, ORANGE))
-                continue
+def headless_report(result):
+    speedup = result["ticks_per_second"] / SIM_HZ
+    return (f"{result['level']}: {result['ticks']} ticks ({result['ticks'] / SIM_HZ:.0f} s of play) "
+            f"in {result['seconds']:.2f} s (+{result['bot_seconds']:.2f} s bot) = "
+            f"{result['ticks_per_second']:.0f} sim FPS ({speedup:.0f}x real time), "
+            f"ended by {result['outcome']}, score {result['score']}")
+
+def headless_main(args):
+    """python main.py --headless[=TICKS] [--level=NAME] [--bot=NAME] [--seed=N] [--runs=N] [--record=FILE]
+    python main.py --replay=FILE
+    python main.py --verify=URL [--workers=N]"""
+    options = dict(arg[2:].split("=", 1) if "=" in arg else (arg[2:], "") for arg in args if arg.startswith("--"))
+    if options.get("replay"):
+        result = play_replay(load_replay(options["replay"]))
+        print(headless_report(result))
+        print("Replay matches the recording" if result["matches"] else "Replay DIVERGED from the recording")
+        return
+    if options.get("verify"):
+        submissions = submissions_from_leaderboard(fetch_leaderboard(options["verify"]))
+        verdicts, stats = verify_submissions(submissions, int(options["workers"]) if options.get("workers") else None)
+        for verdict in verdicts:
+            if not verdict["ok"]:
+                print(f"REJECTED {verdict['user']}: {verdict['reason']}")
+        print("Verified high scores (points are not checked):")
+        for rank, (username, score) in enumerate(verified_ranking(verdicts)[:10], 1):
+            print(f"  #{rank} {username}: {score}")
+        print(verify_report(stats))
+        return
+    max_ticks = int(options["headless"]) if options.get("headless") else 5 * 60 * SIM_HZ
+    bot = BOTS[options.get("bot", "dodge")]
+    seed = int(options["seed"]) if "seed" in options else None
+    runs = int(options.get("runs", 1))
+    total_ticks = total_seconds = 0
+    for run in range(runs):
+        record = options.get("record")
+        if record and runs > 1:
+            root, ext = os.path.splitext(record)
+            record = f"{root}-{run + 1}{ext}"
+        result = run_headless(make_mode(options.get("level", "easy")), max_ticks, bot,
+                              None if seed is None else seed + run, record)
+        print(headless_report(result) + f", seed {result['seed']}")
+        total_ticks += result["ticks"]
+        total_seconds += result["seconds"]
+    if total_seconds:
+        print(f"Average: {total_ticks / total_seconds:.0f} sim FPS")
+
+# Replays: the run seed, the upgrades that shape the game and the input bits of
+# every tick. The simulation only draws on the seeded streams, so playing the
+# inputs back from the same seed ends in exactly the same state.
+#
+# File layout (little-endian): header, level/upgrades JSON, then the inputs
+# packed four ticks to a byte and zlib-compressed (idle stretches shrink to
+# almost nothing).
+REPLAY_MAGIC = b"TJRP"
+REPLAY_VERSION = 2  # Bumped when the simulation changes (2: entity positions are full-precision floats)
+REPLAY_HEADER = struct.Struct("<4sBQIBqIH")  # magic, version, seed, ticks, outcome, score, state digest, JSON length
+REPLAY_OUTCOMES = ("time", "game_over", "victory")  # "time" = stopped before the game ended
+replay_record_path = None  # Set by --record=FILE: games played on screen are saved there
+
+def state_digest(state):
+    """CRC32 of the score, the player and where every entity is, to catch replays that drift."""
+    crc = zlib.crc32(struct.pack("<qffiii", state.game_points, state.player_x, state.player_y,
+                                 state.shields, state.laser_ammo, state.combo))
+    for store in (state.enemies, state.power_ups, state.lasers, state.fires):
+        if store is not None:
+            for thing in store:
+                crc = zlib.crc32(struct.pack("<ff", thing.x, thing.y), crc)
+    if state.boss is not None:
+        crc = zlib.crc32(struct.pack("<fi", state.boss.x, state.boss.health), crc)
+    return crc
+
+def pack_inputs(inputs):
+    packed = bytearray((len(inputs) + 3) // 4)
+    for tick, bits in enumerate(inputs):
+        packed[tick >> 2] |= (bits & 3) << ((tick & 3) * 2)
+    return zlib.compress(bytes(packed), 9)
+
+def unpack_inputs(data, ticks):
+    size = (ticks + 3) // 4
+    inflater = zlib.decompressobj()
+    packed = inflater.decompress(data, size)  # Never more than the ticks need, however the data inflates
+    if len(packed) != size or inflater.unconsumed_tail:
+        raise ValueError(f"input bits are not {ticks} ticks long")
+    return bytes((packed[tick >> 2] >> ((tick & 3) * 2)) & 3 for tick in range(ticks))
+
+def check_upgrades(upgrades):
+    """Raise ValueError unless upgrades is {upgrade: level} with known upgrades at levels there are."""
+    if not isinstance(upgrades, dict):
+        raise ValueError("upgrades are not a table")
+    for key, level in upgrades.items():
+        levels = len(shooting_upgrade_names) if key == "shooting" else len(duration_upgrade_values)
+        if key not in player_upgrades or type(level) is not int or not 0 <= level < levels:
+            raise ValueError(f"no upgrade {key!r} at level {level!r}")
+
+class ReplayRecorder:
+    """Collects the input bits of a run and writes them out as a replay once it ends."""
+    __slots__ = ("level_name", "seed", "path", "upgrades", "inputs")
+
+    def __init__(self, level_name, seed, path=None):
+        self.level_name = level_name
+        self.seed = seed
+        self.path = path
+        self.upgrades = dict(player_upgrades)
+        self.inputs = bytearray()  # One byte per tick while recording
+
+    def record(self, bits):
+        self.inputs.append(bits)
+
+    def finish(self, state):
+        """Return the replay as bytes, also saving it to path (or wherever --record= points) if set."""
+        meta = json.dumps({"level": self.level_name, "upgrades": self.upgrades}).encode()
+        outcome = REPLAY_OUTCOMES.index(state.outcome or "time")
+        data = (REPLAY_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, self.seed, len(self.inputs), outcome,
+                                   state.game_points, state_digest(state), len(meta))
+                + meta + pack_inputs(self.inputs))
+        path = self.path or replay_record_path
+        if path:
+            try:
+                with open(path, "wb") as f:
+                    f.write(data)
+            except OSError as e:
+                print(f"Replay save error: {e}")
+        return data
+
+def load_replay(path):
+    """Read a replay file into a dict (level, upgrades, seed, inputs and how the run ended)."""
+    with open(path, "rb") as f:
+        return parse_replay(f.read())
+
+def parse_replay(data, max_ticks=None):
+    """Decode replay bytes; raises ValueError if they are not a replay (or run over max_ticks)."""
+    try:
+        magic, version, seed, ticks, outcome, score, digest, meta_length = REPLAY_HEADER.unpack_from(data)
+    except struct.error:
+        raise ValueError("too short for a replay")
+    if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+        raise ValueError(f"not a version {REPLAY_VERSION} replay")
+    if outcome >= len(REPLAY_OUTCOMES):
+        raise ValueError(f"unknown outcome {outcome}")
+    if max_ticks is not None and ticks > max_ticks:
+        raise ValueError(f"too long: {ticks} ticks")
+    start = REPLAY_HEADER.size
+    meta = json.loads(data[start:start + meta_length])
+    if not isinstance(meta, dict) or not isinstance(meta.get("level"), str):
+        raise ValueError("no level")
+    check_upgrades(meta.get("upgrades"))
+    try:
+        inputs = unpack_inputs(data[start + meta_length:], ticks)
+    except zlib.error:
+        raise ValueError("damaged input bits")
+    return {
+        "level": meta["level"],
+        "upgrades": meta["upgrades"],
+        "seed": seed,
+        "inputs": inputs,
+        "ticks": ticks,
+        "outcome": REPLAY_OUTCOMES[outcome],
+        "score": score,
+        "digest": digest,
+    }
 
-            # Check laser collision with enemies (skip PowerUps)
-            for enemy in enemies[:]:
-                if isinstance(enemy, PowerUp):
-                    continue  # Lasers pass through power-ups
-                if laser.get_rect().colliderect(enemy.get_rect()):
-                    enemies.remove(enemy)
-                    if laser in lasers:
-                        lasers.remove(laser)
-                    game_points += 3
-                    play_sound(sound_explosion)
-                    for _ in range(10):
-                        particles.append(Particle(enemy.x, enemy.y, ORANGE))
-                    break
+def play_replay(replay):
+    """Play a loaded replay back headless at full speed.
 
-        # Check player collision with enemies and power-ups
-        player_rect = pygame.Rect(player_x + 5, player_y + 5, 40, 40)
-        for enemy in enemies[:]:
-            if player_rect.colliderect(enemy.get_rect()):
-                # Check if it's a power-up
-                if isinstance(enemy, PowerUp):
-                    enemies.remove(enemy)
-                    play_sound(sound_powerup)
-                    # Apply power-up effect
-                    if enemy.type == 'shield':
-                        if shields < max_shields:
-                            shields += 1  # Add a shield (life), max 5
-                    elif enemy.type == 'speed':
-                        speed_boost_active = get_powerup_duration("speed")
-                    elif enemy.type == 'rapid':
-                        rapid_fire_active = get_powerup_duration("rapid_fire")
-                    elif enemy.type == 'double':
-                        double_shot_active = get_powerup_duration("rapid_fire")
-                    elif enemy.type == 'ammo':
-                        laser_ammo = min(max_ammo, laser_ammo + 10)
-                    for _ in range(10):
-                        particles.append(Particle(enemy.x, enemy.y, CYAN))
-                elif shields > 0:
-                    # Shield blocks the hit - lose 1 life
-                    shields -= 1
-                    enemies.remove(enemy)
-                    trigger_screen_shake(5, 5)
-                    play_sound(sound_hit)
+    Returns the run_headless() result, with "matches" telling whether it
+    ended in exactly the recorded state.
+    """
+    saved_upgrades = dict(player_upgrades)
+    player_upgrades.update(replay["upgrades"])
+    try:
+        result = run_headless(make_mode(replay["level"]), replay["ticks"], replay["inputs"], replay["seed"])
+    finally:
+        player_upgrades.clear()
+        player_upgrades.update(saved_upgrades)
+    result["matches"] = all(result[key] == replay[key] for key in ("ticks", "outcome", "score", "digest"))
+    return result
+
+# Score verification. Every leaderboard entry carries the replay of the run
+# that set its high score; re-simulating it headless shows whether the score
+# was really played. Runs are independent, so a backlog of them is spread
+# over a process pool.
+#
+# Only what a run can prove is checked: the high score, and that the run's
+# upgrades are ones the player owns. "points" (the leaderboard's order) is a
+# balance earned over many runs and spent in the shops, which no replay can
+# back, so verified rankings go by verified high score instead.
+VERIFY_MAX_TICKS = 60 * 60 * SIM_HZ  # Longer runs are refused rather than simulated (an hour of play)
+
+def fetch_leaderboard(url):
+    """GET a leaderboard document (the jsonblob API, or serve_leaderboard() in tests)."""
+    import urllib.request
+    with urllib.request.urlopen(url, timeout=10) as response:
+        return json.loads(response.read().decode("utf-8"))
+
+def serve_leaderboard(data, port=0, patch=True):
+    """Serve data as a JSON document on localhost from a background thread, standing in for jsonblob.
+
+    GET answers 304 to a matching If-None-Match, PUT replaces the document
+    and PATCH replaces or (with null) deletes the top-level keys it is given,
+    a JSON merge patch one level deep (405 with patch=False, as jsonblob
+    does). Writes with a stale If-Match get 412. Returns the server; its
+    URL is http://127.0.0.1:<server.server_address[1]>/ and server.document
+    is the current data. Call server.shutdown() when done.
+    """
+    import http.server
+    import threading
+    lock = threading.Lock()
+    version = itertools.count(1)
+    etag = f'"{next(version)}"'
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def answer(self, status, body=b""):
+            self.send_response(status)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            with lock:
+                if self.headers.get("If-None-Match") == etag:
+                    self.answer(304)
                 else:
-                    # No shields left - Game over
-                    play_sound(sound_hit)
-                    trigger_screen_shake(15, 20)
-                    for _ in range(30):
-                        particles.append(Particle(player_x + 25, player_y + 25, RED))
-                    points += game_points
-                    # Update best score for boss mode
-                    if game_points > best_scores.get("BOSS MODE", 0):
-                        best_scores["BOSS MODE"] = game_points
-                    save_progress()
-                    await game_over(game_points, 0)
+                    self.answer(200, json.dumps(server.document).encode("utf-8"))
+
+        def write(self, apply):
+            nonlocal etag
+            update = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            with lock:
+                if self.headers.get("If-Match", etag) != etag:
+                    self.answer(412)
                     return
+                apply(update)
+                etag = f'"{next(version)}"'
+                self.answer(204)
 
-        # Spawn power-ups occasionally
-        if random.random() < 0.015:
-            power_type = random.choices(
-                ['shield', 'speed', 'rapid', 'double', 'ammo'],
-                weights=[20, 15, 20, 20, 25]
-            )[0]
-            power_x = random.randint(50, SCREEN_WIDTH - 50)
-            # Create a simple power-up (reusing PowerUp class)
-            power = PowerUp(power_x, -30, power_type)
-            enemies.append(power)  # Using enemies list for simplicity
-
-        # Update and draw particles
-        for particle in particles[:]:
-            particle.update()
-            particle.draw(screen)
-            if particle.is_dead():
-                particles.remove(particle)
-
-        # Update explosions
-        for explosion in explosions[:]:
-            explosion.update()
-            explosion.draw(screen)
-            if not explosion.active:
-                explosions.remove(explosion)
-
-        # Draw UI
-        pygame.draw.rect(screen, (30, 30, 30), (5, SCREEN_HEIGHT - 80, 200, 75), border_radius=10)
-        draw_text(f"Score: {game_points}", FONT, WHITE, 15, SCREEN_HEIGHT - 75)
-        ammo_color = RED if laser_ammo <= 5 else GREEN
-        draw_text(f"Ammo: {laser_ammo}/{max_ammo}", SMALL_FONT, ammo_color, 15, SCREEN_HEIGHT - 45)
-
-        # Lives/Shields display (bottom left, below score)
-        lives_y = SCREEN_HEIGHT - 35
-        lives_box_width = 180
-        lives_box_x = 220  # Next to score panel
-        pygame.draw.rect(screen, (30, 30, 50), (lives_box_x, lives_y - 10, lives_box_width, 35), border_radius=8)
-        pygame.draw.rect(screen, CYAN if shields > 0 else RED, (lives_box_x, lives_y - 10, lives_box_width, 35), 2, border_radius=8)
-
-        for i in range(max_shields):
-            icon_x = lives_box_x + 20 + i * 32
-            if i < shields:
-                pygame.draw.circle(screen, CYAN, (icon_x, lives_y + 5), 10)
-                pygame.draw.circle(screen, WHITE, (icon_x, lives_y + 5), 6)
-            else:
-                pygame.draw.circle(screen, (80, 80, 80), (icon_x, lives_y + 5), 10, 2)
-
-        # Power-up indicators
-        status_y = SCREEN_HEIGHT - 75
-        if rapid_fire_active > 0:
-            draw_text(f"Rapid!", SMALL_FONT, (255, 100, 100), 120, status_y)
-
-        # Draw touch controls for mobile
-        draw_touch_controls(screen)
-
-        pygame.display.flip()
+        def do_PUT(self):
+            self.write(lambda update: setattr(server, "document", update))
 
-        # Event handling
-        pause_clicked = False
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                points += game_points
-                # Update best score for boss mode
-                if game_points > best_scores.get("BOSS MODE", 0):
-                    best_scores["BOSS MODE"] = game_points
-                save_progress()
-                pygame.quit()
-                sys.exit()
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    pause_clicked = True
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                if TOUCH_BUTTONS["pause"].collidepoint(event.pos):
-                    pause_clicked = True
-
-        # Handle pause
-        if pause_clicked:
-            result = await pause_menu(game_points, "BOSS MODE")
-            if result == "quit":
+        def do_PATCH(self):
+            if not patch:
+                self.rfile.read(int(self.headers["Content-Length"]))
+                self.answer(405)
                 return
 
-        # Get touch input
-        touch = get_touch_input()
-
-        # Movement (keyboard + touch)
-        keys = pygame.key.get_pressed()
-        if (keys[pygame.K_LEFT] or touch["left"]) and player_x > 0:
-            player_x -= current_speed
-        if (keys[pygame.K_RIGHT] or touch["right"]) and player_x < SCREEN_WIDTH - 50:
-            player_x += current_speed
-
-        # Auto-shoot - automatically fires when cooldown is ready and has ammo
-        if laser_cooldown <= 0 and laser_ammo > 0:
-            play_sound(sound_laser)
-            laser_cooldown = base_cooldown // 3 if rapid_fire_active > 0 else base_cooldown
-
-            laser_x = player_x + 25
-            laser_y = player_y - 10
-            shooting_level = get_shooting_level()
-
-            multiplier = 2 if double_shot_active > 0 else 1
-
-            if shooting_level == 0:
-                if multiplier == 2:
-                    lasers.append(Laser(laser_x - 15, laser_y, (255, 100, 100)))
-                    lasers.append(Laser(laser_x + 15, laser_y, (255, 100, 100)))
-                    laser_ammo -= 2
-                else:
-                    lasers.append(Laser(laser_x, laser_y, RED))
-                    laser_ammo -= 1
-            elif shooting_level == 1:
-                lasers.append(Laser(laser_x - 12, laser_y, CYAN))
-                lasers.append(Laser(laser_x + 12, laser_y, CYAN))
-                laser_ammo -= 2
-                if multiplier == 2:
-                    lasers.append(Laser(laser_x - 24, laser_y, (255, 100, 100)))
-                    lasers.append(Laser(laser_x + 24, laser_y, (255, 100, 100)))
-                    laser_ammo -= 2
-            else:
-                lasers.append(Laser(laser_x, laser_y, PURPLE))
-                lasers.append(Laser(laser_x - 20, laser_y + 5, PURPLE))
-                lasers.append(Laser(laser_x + 20, laser_y + 5, PURPLE))
-                laser_ammo -= 3
-                if multiplier == 2:
-                    lasers.append(Laser(laser_x - 35, laser_y + 10, (255, 100, 100)))
-                    lasers.append(Laser(laser_x + 35, laser_y + 10, (255, 100, 100)))
-                    laser_ammo -= 2
-
-            laser_ammo = max(0, laser_ammo)
+            def merge(update):
+                for key, value in update.items():
+                    if value is None:
+                        server.document.pop(key, None)
+                    else:
+                        server.document[key] = value
+            self.write(merge)
+
+        def log_message(self, format, *args):
+            pass  # Quiet
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.document = data
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def submissions_from_leaderboard(data):
+    """(username, claimed high score, upgrades, base64 run) for every entry claiming a high score."""
+    return [(username, entry.get("high_score"), entry.get("upgrades", {}), entry.get("high_score_run"))
+            for username, entry in data.items() if isinstance(entry, dict) and entry.get("high_score") not in (None, 0)]
+
+def verify_submission(submission):
+    """Re-simulate one submission and say whether its high score holds up. Runs in a pool worker.
+
+    Whatever is wrong with a submission, even something that raises, only
+    rejects that submission.
+    """
+    username, claimed, upgrades, run = submission
+    verdict = {"user": username, "claimed": claimed, "score": None, "ticks": 0, "ok": False, "reason": ""}
+    try:
+        verdict["reason"] = judge_submission(claimed, upgrades, run, verdict)
+    except Exception as e:
+        verdict["reason"] = f"could not be checked ({type(e).__name__}: {e})"
+    verdict["ok"] = not verdict["reason"]
+    return verdict
+
+def judge_submission(claimed, upgrades, run, verdict):
+    """Why the submission is rejected ("" if it holds up), filling in the verdict's score and ticks."""
+    if not run:
+        return "no run submitted"
+    if type(claimed) is not int:
+        return f"claimed high score {claimed!r} is not a number"
+    try:
+        check_upgrades(upgrades)
+    except ValueError as e:
+        return f"bad upgrades ({e})"
+    try:
+        replay = parse_replay(base64.b64decode(run), VERIFY_MAX_TICKS)
+        make_mode(replay["level"])
+    except (ValueError, KeyError, TypeError) as e:
+        return f"unreadable run ({e})"
+    if any(level > upgrades.get(key, 0) for key, level in replay["upgrades"].items()):
+        return "run used upgrades the player does not own"
+    result = play_replay(replay)
+    verdict["score"] = result["score"]
+    verdict["ticks"] = result["ticks"]
+    if not result["matches"]:
+        return "run does not replay to its recorded end"
+    if result["score"] != claimed:
+        return f"claims {claimed}, run scores {result['score']}"
+    return ""
+
+def verified_ranking(verdicts):
+    """(username, high score) of the verified submissions, best first."""
+    return sorted(((verdict["user"], verdict["score"]) for verdict in verdicts if verdict["ok"]),
+                  key=lambda entry: entry[1], reverse=True)
+
+def verify_submissions(submissions, workers=None):
+    """Verify submissions over a pool of worker processes (one per CPU by default; 1 = in this process).
+
+    Returns the verdicts, in submission order, and throughput stats.
+    """
+    start = time.perf_counter()
+    if workers == 1:
+        verdicts = [verify_submission(submission) for submission in submissions]
+    else:
+        import concurrent.futures
+        workers = workers or os.cpu_count() or 1
+        chunksize = max(1, len(submissions) // (workers * 4))  # Few round trips, still balanced
+        with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+            verdicts = list(pool.map(verify_submission, submissions, chunksize=chunksize))
+    seconds = time.perf_counter() - start
+    ticks = sum(verdict["ticks"] for verdict in verdicts)
+    return verdicts, {
+        "runs": len(verdicts),
+        "rejected": sum(not verdict["ok"] for verdict in verdicts),
+        "workers": workers or 1,
+        "ticks": ticks,
+        "seconds": seconds,
+        "runs_per_second": len(verdicts) / seconds if seconds > 0 else float("inf"),
+        "ticks_per_second": ticks / seconds if seconds > 0 else float("inf"),
+    }
 
-        clock.tick(60)
-        await asyncio.sleep(0)
+def verify_report(stats):
+    return (f"Verified {stats['runs']} runs ({stats['rejected']} rejected) with {stats['workers']} workers "
+            f"in {stats['seconds']:.2f} s: {stats['runs_per_second']:.1f} runs/s, "
+            f"{stats['ticks_per_second']:.0f} sim ticks/s")
 
 async def victory_screen(score):
     """Display victory screen after defeating the boss!"""
     animation_timer = 0
 
     while True:
-        animation_timer += 1
-        update_background()
+        animation_timer += frame_scheduler.ticks
+        update_background(frame_scheduler.ticks)
 
         # Victory background - golden
-        for y in range(0, SCREEN_HEIGHT, 4):
-            ratio = y / SCREEN_HEIGHT
-            r = int(255 - 50 * ratio)
-            g = int(215 - 50 * ratio)
-            b = int(0 + 50 * ratio)
-            pygame.draw.rect(screen, (r, g, b), (0, y, SCREEN_WIDTH, 4))
+        screen.blit(get_background("victory"), (0, 0))
 
         # Fireworks particles
-        if animation_timer % 10 == 0:
+        if animation_timer % 10 < frame_scheduler.ticks:
             for _ in range(5):
-                x = random.randint(50, SCREEN_WIDTH - 50)
-                y = random.randint(50, SCREEN_HEIGHT - 200)
-                color = random.choice([RED, YELLOW, GREEN, CYAN, PURPLE, ORANGE])
+                x = effect_random.randint(50, SCREEN_WIDTH - 50)
+                y = effect_random.randint(50, SCREEN_HEIGHT - 200)
+                color = effect_random.choice([RED, YELLOW, GREEN, CYAN, PURPLE, ORANGE])
                 # We'd need to maintain a particle list here, but for simplicity:
-                pygame.draw.circle(screen, color, (x, y), random.randint(5, 15))
+                pygame.draw.circle(screen, color, (x, y), effect_random.randint(5, 15))
 
         # Victory text with animation
         scale = 1 + 0.1 * math.sin(animation_timer * 0.1)
@@ -2743,36 +4741,53 @@ async def victory_screen(score):
             ])
 
         draw_text_centered("Press ENTER to continue", FONT, WHITE, SCREEN_HEIGHT - 60)
-        pygame.display.flip()
+        flip_display()
 
-        for event in pygame.event.get():
+        for event in frame_scheduler.events():
             if event.type == pygame.QUIT:
                 save_progress()
-                pygame.quit()
-                sys.exit()
+                quit_game()
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_RETURN:
                     play_sound(sound_powerup)
                     return
 
-        await asyncio.sleep(0)
-        clock.tick(60)
+        await frame_scheduler.next_frame()
 
 async def main():
     """Main entry point for the game."""
+    global replay_record_path
+
+    if HEADLESS:
+        build_sprite_bank()
+        headless_main(sys.argv[1:])
+        return
+
+    # Optional render rate cap for slow machines, e.g. "python main.py --fps=30",
+    # and "--record=FILE" to save each game as a replay
+    for arg in sys.argv[1:]:
+        if arg.startswith("--fps="):
+            set_render_rate(int(arg.split("=", 1)[1]))
+        elif arg.startswith("--record="):
+            replay_record_path = arg.split("=", 1)[1]
+
     # Load local leaderboard data first
     load_leaderboard()
 
-    # Also load from cloud to get latest data
-    if CLOUD_ENABLED:
-        await load_leaderboard_from_cloud()
+    # Scale all enemy sprites up front so spawning never has to
+    build_sprite_bank()
+    if DEBUG:
+        print(asset_report())
+
+    # Also load from cloud to get latest data, while the name is being typed
+    cloud_task = start_cloud_task(load_leaderboard_from_cloud()) if CLOUD_ENABLED else None
 
     # Show username entry screen
-    await username_entry_screen()
+    await username_entry_screen(cloud_task)
 
     # Sync current user's data to cloud after login
     if CLOUD_ENABLED:
-        await sync_to_cloud()
+        start_cloud_task(sync_to_cloud())
 
     # Now user is logged in, show main menu
     await main_menu()
@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+# The game opens a window and sound card on import; tests need neither
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ["SDL_AUDIODRIVER"] = "dummy"
+
+# script.py loads its images from the working directory
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+
+@pytest.fixture
+def fresh_storage(tmp_path, monkeypatch):
+    """File storage in an empty folder, with no players loaded, queued or signed in."""
+    import script
+    monkeypatch.chdir(tmp_path)
+    storage = script.FileStorage()
+    storage.load()
+    monkeypatch.setattr(script, "local_storage", storage)
+    monkeypatch.setattr(script, "leaderboard_data", {})
+    monkeypatch.setattr(script, "local_saves", script.SaveQueue())
+    monkeypatch.setattr(script, "dirty_users", set())
+    monkeypatch.setattr(script, "current_username", "")
+    return storage
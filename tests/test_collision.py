@@ -0,0 +1,59 @@
+"""The spatial hash finds exactly what a scan of every object finds, in the same order."""
+import random
+
+import pygame
+
+import script
+
+
+class Thing:
+    def __init__(self, rect):
+        self.rect = rect
+
+    def get_rect(self):
+        return self.rect
+
+
+def random_rect(rng):
+    # Off-screen (negative) positions and rects spanning several cells included
+    return pygame.Rect(rng.randint(-150, 900), rng.randint(-150, 700), rng.randint(1, 200), rng.randint(1, 200))
+
+
+def scan(things, rect):
+    return [thing for thing in things if rect.colliderect(thing.rect)]
+
+
+def test_query_finds_what_a_scan_finds():
+    rng = random.Random(3)
+    things = [Thing(random_rect(rng)) for _ in range(200)]
+    grid = script.SpatialHash(64)
+    grid.rebuild(things)
+    for _ in range(500):
+        rect = random_rect(rng)
+        assert grid.query(rect) == scan(things, rect)
+    assert grid.tests < 500 * len(things)
+
+
+def test_removed_objects_are_not_found():
+    rng = random.Random(4)
+    things = [Thing(random_rect(rng)) for _ in range(100)]
+    grid = script.SpatialHash(64)
+    grid.rebuild(things)
+    for thing in things[::3]:
+        grid.remove(thing)
+    kept = [thing for index, thing in enumerate(things) if index % 3]
+    for _ in range(200):
+        rect = random_rect(rng)
+        assert grid.query(rect) == scan(kept, rect)
+
+
+def test_hits_come_back_in_insertion_order():
+    grid = script.SpatialHash(10)
+    things = [Thing(pygame.Rect(x, 0, 40, 10)) for x in (30, 20, 10, 0, -10)]  # Later ones in earlier cells
+    for thing in things:
+        grid.insert(thing, thing.rect)
+    assert grid.query(pygame.Rect(-20, 0, 100, 10)) == things
+    assert grid.query(pygame.Rect(25, 5, 1, 1)) == things[1:]
+    grid.rebuild(things[::-1])
+    assert grid.query(pygame.Rect(-20, 0, 100, 10)) == things[::-1]
+    assert grid.query(pygame.Rect(500, 500, 10, 10)) == []
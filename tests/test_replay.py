@@ -0,0 +1,42 @@
+"""Replays: a seeded run plays out the same every time, so its recorded inputs bring back the same end."""
+import pytest
+
+import script
+
+TICKS = 600
+
+
+@pytest.mark.parametrize("level", ["easy", "boss"])
+def test_same_seed_same_run(level):
+    first = script.run_headless(script.make_mode(level), TICKS, seed=11)
+    again = script.run_headless(script.make_mode(level), TICKS, seed=11)
+    assert (again["score"], again["digest"], again["outcome"]) == (first["score"], first["digest"], first["outcome"])
+
+
+def test_other_seed_other_run():
+    digests = {script.run_headless(script.make_mode("easy"), TICKS, seed=seed)["digest"] for seed in (1, 2, 3)}
+    assert len(digests) == 3
+
+
+@pytest.mark.parametrize("level, bot", [("easy", script.dodge_bot), ("hard", script.sweep_bot), ("boss", script.dodge_bot)])
+def test_recorded_run_plays_back_exactly(tmp_path, level, bot):
+    path = str(tmp_path / "run.tjrp")
+    result = script.run_headless(script.make_mode(level), TICKS, bot, seed=5, record=path)
+    replay = script.load_replay(path)
+    assert script.parse_replay(result["replay"]) == replay
+    assert (replay["score"], replay["digest"], replay["ticks"]) == (result["score"], result["digest"], result["ticks"])
+
+    played = script.play_replay(replay)
+    assert played["matches"]
+
+
+def test_replay_with_other_inputs_does_not_match():
+    replay = script.parse_replay(script.run_headless(script.make_mode("easy"), TICKS, seed=5, record=True)["replay"])
+    replay["inputs"] = bytes(replay["ticks"])  # Standing still instead
+    assert not script.play_replay(replay)["matches"]
+
+
+@pytest.mark.parametrize("data", [b"", b"TJRP", b"XXXX" + bytes(40)])
+def test_garbage_is_not_a_replay(data):
+    with pytest.raises(ValueError):
+        script.parse_replay(data)
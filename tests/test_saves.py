@@ -0,0 +1,137 @@
+"""Write-behind saves: bursts become one write, and the browser page writes what the tab leaves behind."""
+import asyncio
+import json
+import shutil
+import subprocess
+import sys
+import types
+
+import pytest
+
+import script
+
+
+def record(version, points):
+    return {"version": version, "points": points, "best_scores": {}, "upgrades": {}}
+
+
+@pytest.fixture
+def browser(fresh_storage, monkeypatch):
+    """Pretend to be the browser build: a fake `platform` whose window records what is eval()ed."""
+    items = {}
+    window = types.SimpleNamespace(
+        evals=[],
+        localStorage=types.SimpleNamespace(setItem=items.__setitem__, getItem=items.get,
+                                           removeItem=lambda key: items.pop(key, None)))
+    window.eval = window.evals.append
+    monkeypatch.setitem(sys.modules, "platform", types.SimpleNamespace(window=window))
+    monkeypatch.setattr(script, "is_browser", lambda: True)
+    monkeypatch.setattr(script, "local_storage", script.FileStorage())
+    monkeypatch.setattr(script, "current_username", "ann")
+    window.items = items
+    return window
+
+
+def test_burst_of_saves_is_one_write(fresh_storage, monkeypatch):
+    monkeypatch.setattr(script, "SAVE_DELAY", 0.05)
+    monkeypatch.setattr(script, "current_username", "ann")
+
+    async def play():
+        for points in range(1, 6):
+            monkeypatch.setattr(script, "points", points)
+            script.save_progress()
+            await asyncio.sleep(0.01)
+        assert script.local_saves.writes == 0
+        await script.local_saves.task
+
+    asyncio.run(play())
+    assert script.local_saves.writes == 1
+    assert fresh_storage.record("ann")["points"] == 5
+    assert fresh_storage.last_user() == "ann"
+
+
+def test_saves_never_wait_past_the_max_delay(fresh_storage, monkeypatch):
+    monkeypatch.setattr(script, "SAVE_DELAY", 0.05)
+    monkeypatch.setattr(script, "SAVE_MAX_DELAY", 0.1)
+    monkeypatch.setattr(script, "current_username", "ann")
+
+    async def play():
+        for _ in range(20):  # Never a pause of SAVE_DELAY
+            script.save_progress()
+            await asyncio.sleep(0.02)
+        assert script.local_saves.writes >= 2
+        await script.local_saves.task
+
+    asyncio.run(play())
+    assert fresh_storage.record("ann")["version"] == 20
+
+
+def test_without_an_event_loop_saves_write_at_once(fresh_storage, monkeypatch):
+    monkeypatch.setattr(script, "current_username", "ann")
+    script.save_progress()
+    assert script.local_saves.writes == 1
+    assert fresh_storage.record("ann")["version"] == 1
+    script.local_saves.flush()  # Nothing left to write
+    assert script.local_saves.writes == 1
+
+
+def test_older_snapshot_never_overwrites_a_newer_one(fresh_storage):
+    queue = script.local_saves
+    script.leaderboard_data["ann"] = record(1, 10)
+    queue.users.add("ann")
+    queue.dirty_since = 0.0
+    older = queue.take()
+    script.leaderboard_data["ann"] = record(2, 20)
+    queue.users.add("ann")
+    newer = queue.take()
+
+    queue.write(*newer)
+    queue.write(*older)  # A slow writer finishing late
+    assert fresh_storage.record("ann") == record(2, 20)
+
+
+def test_browser_stages_each_save_and_clears_once_written(browser, monkeypatch):
+    monkeypatch.setattr(script, "SAVE_DELAY", 0.01)
+
+    async def play():
+        script.save_progress()
+        script.save_progress()
+        await script.local_saves.task
+
+    asyncio.run(play())
+    assert browser.evals.count(script.PAGE_SAVES_SCRIPT) == 1
+    staged = [js for js in browser.evals if js.startswith("window.dodgeSaves.stage(")]
+    assert len(staged) == 2
+    assert json.dumps(script.leaderboard_data["ann"]) in staged[-1]
+    assert browser.evals[-1] == "window.dodgeSaves.clear()"
+    assert json.loads(browser.items[script.user_key("ann")])["version"] == 2
+
+
+def run_page(evals, steps):
+    """Run PAGE_SAVES_SCRIPT and the staged calls in node, then `steps`; returns localStorage."""
+    page = """
+        var items = {"dodge_index": JSON.stringify({bob: {points: 70}})};
+        var listeners = {};
+        var localStorage = {
+            setItem: function(key, value) { items[key] = String(value); },
+            getItem: function(key) { return key in items ? items[key] : null; }
+        };
+        var document = {visibilityState: "visible", addEventListener: function(type, f) { listeners[type] = f; }};
+        var window = {addEventListener: function(type, f) { listeners[type] = f; }};
+    """.replace("dodge_index", script.INDEX_KEY)
+    page += "\n".join(evals) + "\n" + steps + "\nconsole.log(JSON.stringify(items));"
+    return json.loads(subprocess.run(["node", "-e", page], capture_output=True, text=True, check=True).stdout)
+
+
+@pytest.mark.skipif(not shutil.which("node"), reason="needs node to run the page script")
+def test_hiding_the_tab_writes_staged_saves(browser):
+    script.leaderboard_data["ann"] = record(3, 40)
+    script.local_saves.stage("ann")
+    hidden = 'document.visibilityState = "hidden"; listeners.visibilitychange();'
+    items = run_page(browser.evals, hidden)
+    assert json.loads(items[script.user_key("ann")]) == record(3, 40)
+    assert json.loads(items[script.INDEX_KEY]) == {"bob": {"points": 70}, "ann": script.index_entry(record(3, 40))}
+    assert items["dodge_lastuser"] == "ann"
+
+    items = run_page(browser.evals, "window.dodgeSaves.clear();" + hidden)  # The queue got there first
+    assert script.user_key("ann") not in items
@@ -0,0 +1,122 @@
+"""Local storage: the old one-blob save is split into per-player keys and an index without losing anyone."""
+import json
+import os
+
+import script
+
+LEGACY = {
+    "ann": {"points": 120, "current_level": "Hard", "best_scores": {"Easy": 9, "Hard": 40}, "upgrades": {"shooting": 1}},
+    "Ann": {"points": 5, "current_level": "Easy", "best_scores": {"Easy": 5}, "upgrades": {}},
+    "bo b": {"version": 2, "points": 300, "best_scores": {}, "purchased_items": {"EMDR Tejeck": True}},
+}
+BLOB = script.storage_path(script.LEGACY_LEADERBOARD_KEY)
+
+
+def write_blob(records):
+    with open(BLOB, "w") as f:
+        json.dump(records, f)
+
+
+def test_blob_is_split_into_records_and_an_index(fresh_storage):
+    write_blob(LEGACY)
+    storage = script.FileStorage()
+    assert storage.load() == 3
+    assert not os.path.exists(BLOB)
+    for username, record in LEGACY.items():
+        assert storage.record(username) == record
+        assert storage.entry(username) == script.index_entry(record)
+
+    reopened = script.FileStorage()  # From the index and per-player keys alone
+    assert reopened.load() == 3
+    assert reopened.record("Ann") == LEGACY["Ann"]
+    assert reopened.entry("bo b") == {"version": 2, "points": 300, "best_scores": {}}
+
+
+def test_failed_migration_keeps_the_blob(fresh_storage, monkeypatch):
+    write_blob(LEGACY)
+    storage_set = script.storage_set
+    monkeypatch.setattr(script, "storage_set", lambda key, value: key != script.INDEX_KEY and storage_set(key, value))
+    storage = script.FileStorage()
+    assert storage.load() == 3
+    assert os.path.exists(BLOB)
+    assert storage.record("ann") == LEGACY["ann"]  # Read from the blob kept in memory
+
+    monkeypatch.setattr(script, "storage_set", storage_set)
+    retried = script.FileStorage()
+    assert retried.load() == 3
+    assert not os.path.exists(BLOB)
+    assert retried.record("ann") == LEGACY["ann"]
+
+
+def test_names_that_differ_only_in_case_or_punctuation_keep_their_own_keys():
+    names = ["ann", "Ann", "a.nn", "a_nn", "a/nn"]
+    assert len({script.user_key(name) for name in names}) == len(names)
+    assert all(os.path.dirname(script.storage_path(script.user_key(name))) == "dodge_users" for name in names)
+
+
+def test_writes_update_records_index_and_ranking(fresh_storage):
+    fresh_storage.write({"ann": {"points": 10}, "bob": {"points": 30}}, "ann")
+    revision = fresh_storage.revision
+    fresh_storage.write({"ann": {"version": 1, "points": 50}})
+    assert fresh_storage.revision > revision
+    assert [username for username, _ in fresh_storage.top()] == ["ann", "bob"]
+    assert fresh_storage.rank("bob") == 2
+    assert fresh_storage.last_user() == "ann"
+
+    reopened = script.FileStorage()
+    assert reopened.load() == 2
+    assert reopened.record("ann") == {"version": 1, "points": 50}
+    assert reopened.versions() == {"ann": (1, 50), "bob": (0, 30)}
+
+
+PLAYERS = {
+    "ann": {"version": 3, "points": 50, "high_score": 12, "current_level": "Hard", "updated": 1700000000,
+            "best_scores": {"Easy": 4, "Hard": 12}, "upgrades": {"shooting": 2}, "purchased_items": {"Alvin": True}},
+    "bob": {"version": 1, "points": 80, "best_scores": {}, "upgrades": {}},
+    "cy": {"points": 50, "best_scores": {"Easy": 50}, "upgrades": {}},  # Ties with ann, saved after her
+}
+
+
+def test_sqlite_stores_what_files_store(fresh_storage):
+    sqlite = script.SQLiteStorage("test.db")
+    sqlite.load()
+    for storage in (fresh_storage, sqlite):
+        storage.write(PLAYERS, "cy")
+    assert sqlite.count() == fresh_storage.count() == 3
+    assert sqlite.record("ann") == PLAYERS["ann"]
+    assert sqlite.top() == fresh_storage.top()
+    assert sqlite.top(1, 1) == fresh_storage.top(1, 1) == [("ann", script.index_entry(PLAYERS["ann"]))]
+    assert [sqlite.rank(name) for name in PLAYERS] == [fresh_storage.rank(name) for name in PLAYERS] == [2, 1, 3]
+    assert sqlite.versions() == fresh_storage.versions()
+    assert sqlite.last_user() == "cy"
+    assert sqlite.record("nobody") is None and sqlite.rank("nobody") is None
+
+
+def test_sqlite_write_replaces_a_whole_record(fresh_storage):
+    sqlite = script.SQLiteStorage("test.db")
+    sqlite.load()
+    sqlite.write(PLAYERS)
+    revision = sqlite.revision
+    sqlite.write({"ann": {"version": 4, "points": 90, "best_scores": {"Easy": 7}, "upgrades": {}}})
+    assert sqlite.revision > revision
+    assert sqlite.record("ann") == {"version": 4, "points": 90, "best_scores": {"Easy": 7}, "upgrades": {}}
+    assert sqlite.rank("ann") == 1
+
+
+def test_sqlite_takes_in_saves_made_as_files(fresh_storage):
+    write_blob(LEGACY)
+    sqlite = script.SQLiteStorage("test.db")
+    assert sqlite.load() == 3
+    assert {username: sqlite.record(username)["points"] for username in LEGACY} == {"ann": 120, "Ann": 5, "bo b": 300}
+
+
+def test_storage_falls_back_to_files(fresh_storage, monkeypatch):
+    import importlib.util
+    assert isinstance(script.make_storage(), script.SQLiteStorage)
+    monkeypatch.setattr(importlib.util, "find_spec", lambda name: None)
+    assert isinstance(script.make_storage(), script.FileStorage)
+
+    os.mkdir("unusable.db")  # A folder: SQLite can't open it
+    monkeypatch.setattr(script, "local_storage", script.SQLiteStorage("unusable.db"))
+    script.load_leaderboard()
+    assert isinstance(script.local_storage, script.FileStorage)
@@ -0,0 +1,110 @@
+"""Cloud sync: which copy of a record wins, and conflicts between two players saving at once."""
+import asyncio
+
+import pytest
+
+import script
+
+
+@pytest.fixture
+def cloud(fresh_storage, monkeypatch):
+    """The stand-in jsonblob server, empty, with the game pointed at it."""
+    server = script.serve_leaderboard({})
+    monkeypatch.setattr(script, "CLOUD_ENABLED", True)
+    monkeypatch.setattr(script, "cloud_url", lambda: f"http://127.0.0.1:{server.server_address[1]}/")
+    monkeypatch.setattr(script, "cloud_etag", None)
+    monkeypatch.setattr(script, "cloud_document", {})
+    monkeypatch.setattr(script, "cloud_patch_supported", True)
+    monkeypatch.setattr(script, "cloud_sync_running", False)
+    monkeypatch.setattr(script, "cloud_status", script.CloudStatus())
+    yield server
+    server.shutdown()
+
+
+def sign_in(monkeypatch, username, points):
+    monkeypatch.setattr(script, "current_username", username)
+    monkeypatch.setattr(script, "points", points)
+    script.save_progress()
+
+
+@pytest.mark.parametrize("cloud_record, taken", [
+    ({"points": 500}, True),  # From before versions, but more points
+    ({"points": 5}, False),
+    ({"version": 2, "points": 5}, True),  # Newer version, even with fewer points
+    ({"version": 1, "points": 500}, True),  # Same version: more points wins
+    ({"version": 1, "points": 10}, False),
+])
+def test_newer_cloud_records_are_taken(fresh_storage, cloud_record, taken):
+    script.leaderboard_data["ann"] = {"version": 1, "points": 10}
+    assert script.merge_cloud_records({"ann": cloud_record}) == taken
+    assert script.leaderboard_data["ann"] == (cloud_record if taken else {"version": 1, "points": 10})
+
+
+def test_legacy_records_go_by_points_against_stored_ones_too(fresh_storage):
+    fresh_storage.write({"ann": {"version": 3, "points": 10}, "bob": {"points": 70}})
+    taken = script.merge_cloud_records({"ann": {"points": 40}, "bob": {"version": 1, "points": 20}, "cy": {"points": 1}})
+    assert taken == 2
+    assert sorted(script.leaderboard_data) == ["ann", "cy"]
+
+
+def test_signed_in_players_own_record_is_never_replaced(fresh_storage, monkeypatch):
+    sign_in(monkeypatch, "ann", 10)
+    assert script.merge_cloud_records({"ann": {"version": 99, "points": 9999}}) == 0
+    assert script.leaderboard_data["ann"]["points"] == 10
+
+
+def test_sync_sends_only_changed_records(cloud, monkeypatch):
+    cloud.document = {"bob": {"version": 1, "points": 70}}
+    sign_in(monkeypatch, "ann", 10)
+    asyncio.run(script.sync_to_cloud())
+    assert cloud.document == {"bob": {"version": 1, "points": 70}, "ann": script.leaderboard_data["ann"]}
+    assert script.leaderboard_data["bob"] == {"version": 1, "points": 70}
+    assert not script.dirty_users
+
+
+def test_conflicting_save_is_merged_and_retried(cloud, monkeypatch):
+    sign_in(monkeypatch, "ann", 10)
+    cloud_request = script.cloud_request
+    statuses = []
+
+    async def someone_else_saves_first(method, url, body=None, **kwargs):
+        if method == "PATCH" and "bob" not in cloud.document:
+            await cloud_request("PATCH", url, '{"bob": {"version": 1, "points": 70}}')
+        response = await cloud_request(method, url, body, **kwargs)
+        statuses.append((method, response[0]))
+        return response
+
+    monkeypatch.setattr(script, "cloud_request", someone_else_saves_first)
+    asyncio.run(script.sync_to_cloud())
+    assert ("PATCH", 412) in statuses
+    assert sorted(cloud.document) == ["ann", "bob"]  # Neither save overwrote the other
+    assert script.leaderboard_data["bob"] == {"version": 1, "points": 70}
+    assert not script.dirty_users
+
+
+def test_whole_document_put_where_patch_is_refused(cloud, monkeypatch):
+    cloud.shutdown()
+    server = script.serve_leaderboard({"bob": {"version": 1, "points": 70}}, patch=False)
+    monkeypatch.setattr(script, "cloud_url", lambda: f"http://127.0.0.1:{server.server_address[1]}/")
+    try:
+        sign_in(monkeypatch, "ann", 10)
+        asyncio.run(script.sync_to_cloud())
+        assert not script.cloud_patch_supported
+        assert sorted(server.document) == ["ann", "bob"]
+    finally:
+        server.shutdown()
+
+
+def test_failed_sync_keeps_records_queued(cloud, monkeypatch):
+    sign_in(monkeypatch, "ann", 10)
+    cloud.shutdown()
+    cloud.server_close()
+    asyncio.run(script.sync_to_cloud())
+    assert script.dirty_users == {"ann"}
+    assert script.cloud_status.state == "offline"
+
+
+def test_document_that_is_not_a_leaderboard_is_a_failed_load(cloud):
+    cloud.document = ["ann", "bob"]
+    assert asyncio.run(script.cloud_load()) is None
+    assert script.cloud_status.error == "not a leaderboard"
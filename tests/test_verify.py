@@ -0,0 +1,141 @@
+"""Leaderboard verification: honest runs pass, tampered ones are rejected one by one."""
+import base64
+import json
+import zlib
+
+import pytest
+
+import script
+
+
+def record_run(shooting=0, ticks=600, seed=7):
+    """Play a headless run with the given shooting upgrade; returns (score, replay bytes)."""
+    saved = dict(script.player_upgrades)
+    script.player_upgrades["shooting"] = shooting
+    try:
+        result = script.run_headless(script.make_mode("easy"), ticks, script.sweep_bot, seed=seed, record=True)
+    finally:
+        script.player_upgrades.update(saved)
+    return result["score"], result["replay"]
+
+
+def rebuild(data, upgrades=None, inputs=None, ticks=None):
+    """The replay with its upgrades, packed inputs or tick count swapped out."""
+    header = list(script.REPLAY_HEADER.unpack_from(data))
+    start = script.REPLAY_HEADER.size
+    meta = json.loads(data[start:start + header[-1]])
+    if upgrades is not None:
+        meta["upgrades"] = upgrades
+    if ticks is not None:
+        header[3] = ticks
+    meta = json.dumps(meta).encode()
+    header[-1] = len(meta)
+    packed = data[start + script.REPLAY_HEADER.unpack_from(data)[-1]:] if inputs is None else inputs
+    return script.REPLAY_HEADER.pack(*header) + meta + packed
+
+
+def submit(score, data, upgrades=None, user="player"):
+    return (user, score, {} if upgrades is None else upgrades, base64.b64encode(data).decode("ascii"))
+
+
+@pytest.fixture(scope="module")
+def honest():
+    return record_run(shooting=1)
+
+
+def test_honest_run_is_accepted(honest):
+    score, data = honest
+    verdict = script.verify_submission(submit(score, data, {"shooting": 1}))
+    assert verdict["ok"], verdict["reason"]
+    assert verdict["score"] == score
+
+
+def test_inflated_score_is_rejected(honest):
+    score, data = honest
+    verdict = script.verify_submission(submit(score + 500, data, {"shooting": 1}))
+    assert not verdict["ok"]
+    assert verdict["score"] == score
+
+
+def test_tampered_inputs_are_rejected(honest):
+    score, data = honest
+    ticks = script.REPLAY_HEADER.unpack_from(data)[3]
+    always_left = script.pack_inputs(bytes([script.INPUT_LEFT]) * ticks)
+    verdict = script.verify_submission(submit(score, rebuild(data, inputs=always_left), {"shooting": 1}))
+    assert not verdict["ok"]
+    assert "replay" in verdict["reason"]
+
+
+def test_unowned_upgrades_are_rejected(honest):
+    score, data = honest
+    verdict = script.verify_submission(submit(score, data, {"shooting": 0}))
+    assert not verdict["ok"]
+    assert "does not own" in verdict["reason"]
+
+
+@pytest.mark.parametrize("upgrades", [{"shooting": -1}, {"shooting": 9}, {"shooting": "2"}, {"shooting": True},
+                                      {"laser_eyes": 1}, [1, 2], "all"])
+def test_forged_run_upgrades_are_rejected(honest, upgrades):
+    score, data = honest
+    verdict = script.verify_submission(submit(score, rebuild(data, upgrades=upgrades)))
+    assert not verdict["ok"]
+    assert "unreadable run" in verdict["reason"]
+
+
+@pytest.mark.parametrize("upgrades", [{"shooting": -1}, {"shooting": 9}, "all", None])
+def test_forged_claimed_upgrades_are_rejected(honest, upgrades):
+    score, data = honest
+    verdict = script.verify_submission(("player", score, upgrades, base64.b64encode(data).decode("ascii")))
+    assert not verdict["ok"]
+
+
+def test_oversized_inputs_are_not_inflated(honest):
+    score, data = honest
+    bomb = zlib.compress(bytes(200 * 1024 * 1024), 9)  # Inflates to 200 MB
+    verdict = script.verify_submission(submit(score, rebuild(data, inputs=bomb), {"shooting": 1}))
+    assert not verdict["ok"]
+    assert "ticks long" in verdict["reason"]
+
+
+def test_overlong_runs_are_refused_unplayed(honest):
+    score, data = honest
+    verdict = script.verify_submission(submit(score, rebuild(data, ticks=script.VERIFY_MAX_TICKS + 1), {"shooting": 1}))
+    assert not verdict["ok"]
+    assert verdict["ticks"] == 0
+
+
+@pytest.mark.parametrize("run", ["", "not base64!", base64.b64encode(b"TJRP junk").decode("ascii")])
+def test_garbage_runs_are_rejected(run):
+    verdict = script.verify_submission(("player", 100, {}, run))
+    assert not verdict["ok"]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_bad_submissions_only_reject_themselves(honest, workers):
+    score, data = honest
+    submissions = [submit(score, data, {"shooting": 1}, "honest"),
+                   submit(score, rebuild(data, upgrades={"shooting": 9}), {"shooting": 2}, "forged"),
+                   ("odd", score, "all", base64.b64encode(data).decode("ascii")),
+                   submit(score + 1, data, {"shooting": 1}, "inflated")]
+    verdicts, stats = script.verify_submissions(submissions, workers)
+    assert [verdict["ok"] for verdict in verdicts] == [True, False, False, False]
+    assert stats["rejected"] == 3
+    assert script.verified_ranking(verdicts) == [("honest", score)]
+
+
+def test_leaderboard_from_stand_in_server(honest):
+    score, data = honest
+    run = base64.b64encode(data).decode("ascii")
+    server = script.serve_leaderboard({
+        "honest": {"points": 10, "high_score": score, "upgrades": {"shooting": 1}, "high_score_run": run},
+        "inflated": {"points": 99999, "high_score": score * 10, "upgrades": {"shooting": 1}, "high_score_run": run},
+        "no run": {"points": 5, "high_score": 50},
+        "never played": {"points": 0, "high_score": 0},
+        "broken": "not an entry",
+    })
+    try:
+        document = script.fetch_leaderboard(f"http://127.0.0.1:{server.server_address[1]}/")
+    finally:
+        server.shutdown()
+    verdicts, _ = script.verify_submissions(script.submissions_from_leaderboard(document), workers=1)
+    assert {verdict["user"]: verdict["ok"] for verdict in verdicts} == {"honest": True, "inflated": False, "no run": False}